@@ -1,199 +1,600 @@
+import argparse
+import hashlib
 import json
-from flask import Flask, jsonify, request
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from flask import Flask, Response, g, has_request_context, jsonify, request, stream_with_context
 from flask_cors import CORS
+import numpy as np
 import pandas as pd
-from datetime import datetime
+from datetime import date, datetime
 import os
 
+from nts_core.currency import currency_columns
+from nts_core.history_export import XLSX_MIME, HistoryFilter, iter_csv, iter_filtered, iter_xlsx
+from nts_core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, registry
+from nts_core.loaders import price_index, pricing_store
+from nts_core.query import SortedView, decode_cursor, parse_fields, parse_limit
+from nts_core.pricing import PricingError, calculate, calculation_result
+from nts_core.quote import quote_batch
+from nts_core.rates import rate_cache
+from nts_core.rollups import DIMENSIONS as ROLLUP_DIMENSIONS, rollups
+from nts_core.route_matrix import RouteMatrixStore
+from nts_core.search import DEFAULT_LIMIT as SEARCH_DEFAULT_LIMIT, KINDS as SEARCH_KINDS, MAX_LIMIT as SEARCH_MAX_LIMIT, search_index
+from nts_core.serving import serve
+from nts_core.serialization import JSON, compress, encode, frame_payload, negotiate_encoding, negotiate_media_type
+from nts_core.storage import get_storage
+
 # --- Flask App Setup ---
 app = Flask(__name__)
 CORS(app)  # CORS'u aktif et
 
-# --- DOSYALAR ---
-PRODUCT_FILE = 'urun_fiyat_db.csv'
-SHIPPING_FILE = 'lokasyonlar.csv'
-EXCHANGE_RATES_FILE = 'exchange_rates.json'
+# Tek batch isteğinde kabul edilen en fazla satır
+MAX_BATCH_SIZE = 20000
 
-# --- Helper Functions ---
-def load_products():
-    try:
-        df = pd.read_csv(PRODUCT_FILE)
-        df['Kayit_Tarihi'] = pd.to_datetime(df['Kayit_Tarihi'], format='%d.%m.%Y', errors='coerce')
-        return df
-    except Exception:
-        return pd.DataFrame(columns=['Urun_Adi', 'Fabrika', 'NTS_Maliyet_TL', 'Kayit_Tarihi'])
+# --- Metrikler ---
+# Bu süreyi aşan istekler aşama dökümüyle loglanır (ms)
+SLOW_REQUEST_MS = float(os.environ.get('NTS_SLOW_REQUEST_MS', '500'))
+slow_request_log = logging.getLogger('nts.slow_requests')
+
+REQUEST_LATENCY = registry.histogram('nts_http_request_duration_seconds', 'HTTP istek süresi', ['method', 'endpoint'])
+REQUEST_COUNT = registry.counter('nts_http_requests_total', 'HTTP istek sayısı', ['method', 'endpoint', 'status'])
+REQUEST_ERRORS = registry.counter('nts_http_request_errors_total', '5xx ile sonuçlanan istek sayısı', ['method', 'endpoint'])
+STAGE_LATENCY = registry.histogram('nts_request_stage_duration_seconds', 'İstek içi aşama süreleri', ['endpoint', 'stage'])
+DATA_LOAD_LATENCY = registry.histogram('nts_data_load_duration_seconds', 'Veri yükleme adımlarının süresi', ['step'])
+SNAPSHOT_GENERATION = registry.gauge('nts_snapshot_generation', 'Yüklenen veri snapshot nesli')
+SNAPSHOT_LOAD_SECONDS = registry.gauge('nts_snapshot_load_seconds', 'Son snapshot yükleme süresi')
 
-def load_shipping():
+def endpoint_label():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+@contextmanager
+def stage(name):
+    """İstek içindeki bir aşamanın süresini ölç (histogram + yavaş istek dökümü)"""
+    started = time.perf_counter()
     try:
-        return pd.read_csv(SHIPPING_FILE)
-    except Exception:
-        return pd.DataFrame(columns=['Sehir', 'Firma', 'Fabrika', 'Arac_Tipi', 'Fiyat_TL_KG'])
-
-def load_exchange_rates():
-    if os.path.exists(EXCHANGE_RATES_FILE):
-        with open(EXCHANGE_RATES_FILE, 'r', encoding='utf-8') as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                pass
-    return {'TL': 1.0, 'USD': 36.50, 'EUR': 38.20, 'CHF': 41.10}
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        if has_request_context():
+            stages = g.setdefault('stages', {})
+            stages[name] = stages.get(name, 0.0) + elapsed
+            STAGE_LATENCY.observe(elapsed, endpoint=endpoint_label(), stage=name)
+
+# --- Paylaşılan Veri Snapshot'ı ---
+# Veriler değişmedikçe (CSV: mtime/boyut, SQLite: veri kümesi sürümü) tüm istekler aynı bellek içi snapshot'ı kullanır
+def data_load_timer(step):
+    return DATA_LOAD_LATENCY.time(step=step)
+
+snapshot_store = pricing_store(timer=data_load_timer)
+
+def current_snapshot():
+    """İstek boyunca tek bir tutarlı snapshot kullan"""
+    if 'snapshot' not in g:
+        g.snapshot = snapshot_store.get()
+    return g.snapshot
+
+def current_price_index():
+    """Snapshot başına bir kez kurulan ürün fiyat indeksi"""
+    return price_index(current_snapshot())
+
+# Ürün × şehir en ucuz rota matrisi; veri değişince yalnızca etkilenen satır/kolonlar yenilenir
+route_matrix_store = RouteMatrixStore()
+
+def current_route_matrix():
+    snapshot = current_snapshot()
+    return route_matrix_store.get(snapshot.version, current_price_index, snapshot.shipping)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.stages = {}
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    method, endpoint = request.method, endpoint_label()
+    REQUEST_LATENCY.observe(elapsed, method=method, endpoint=endpoint)
+    REQUEST_COUNT.inc(method=method, endpoint=endpoint, status=response.status_code)
+    if response.status_code >= 500:
+        REQUEST_ERRORS.inc(method=method, endpoint=endpoint)
+    if elapsed * 1000 >= SLOW_REQUEST_MS:
+        stages = ', '.join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in g.get('stages', {}).items())
+        slow_request_log.warning("Yavaş istek: %s %s → %s %.1fms [%s]",
+                                 method, request.full_path.rstrip('?'), response.status_code, elapsed * 1000, stages)
+    # Çok süreçli modda bu işçinin değerleri ortak klasöre yazılır (aralıklı)
+    registry.flush()
+    return response
+
+@app.after_request
+def add_data_version_header(response):
+    snapshot = g.get('snapshot')
+    if snapshot is not None:
+        response.headers['X-Data-Version'] = snapshot.version
+        response.headers['X-Data-Generation'] = str(snapshot.generation)
+    return response
+
+# --- Koşullu GET (ETag / Last-Modified) ---
+def snapshot_last_modified(snapshot):
+    """İzlenen dosyaların en son mtime'ı; dosya imzası yoksa (SQLite) snapshot yükleme zamanı"""
+    mtimes = [mtime for _, mtime, size in snapshot.signatures if mtime is not None and size is not None]
+    if not mtimes:
+        return datetime.fromtimestamp(snapshot.loaded_at)
+    return datetime.fromtimestamp(max(mtimes) / 1e9)
+
+def cached_response(name, build, variant='', memoize=True):
+    """
+    Snapshot sürümü başına bir kez serileştirilen (ve sıkıştırılan) yanıt.
+
+    Gövde `Accept` ile JSON veya MessagePack, `Accept-Encoding` ile br/gzip
+    olarak seçilir; her temsil güçlü ETag'iyle birlikte `snapshot.memo` içinde
+    tutulur. Tekrar eden isteklerde yalnızca başlık karşılaştırılır,
+    If-None-Match eşleşirse 304 döner. `memoize=False` (sınırsız değişkenli
+    sorgular) gövdeyi saklamaz, yalnızca ETag/sıkıştırma uygular.
+    """
+    snapshot = current_snapshot()
+    remember = snapshot.memo if memoize else (lambda key, factory: factory())
+    media_type = negotiate_media_type(request.accept_mimetypes)
+
+    def serialize():
+        with stage('serialize'):
+            body = encode(build(snapshot), media_type)
+        return body, hashlib.sha1(body).hexdigest()[:20]
+
+    body, etag = remember(('body', name, variant, media_type), serialize)
+    encoding = negotiate_encoding(request.accept_encodings, len(body))
+    if encoding is not None:
+        body = remember(('body', name, variant, media_type, encoding), lambda: compress(body, encoding))
+        etag = f"{etag}-{encoding}"
+
+    response = Response(body, mimetype=media_type)
+    if encoding is not None:
+        response.content_encoding = encoding
+    response.vary.update(('Accept', 'Accept-Encoding'))
+    response.set_etag(etag)
+    response.last_modified = snapshot_last_modified(snapshot)
+    response.cache_control.no_cache = True  # İstemci her seferinde doğrulasın (304 ucuz)
+    return response.make_conditional(request)
+
+@app.after_request
+def compress_response(response):
+    """Büyük JSON yanıtlarını istemci destekliyorsa sıkıştır (akış yanıtları hariç)"""
+    if (response.direct_passthrough or response.is_streamed or response.content_encoding
+            or response.mimetype != JSON or response.status_code < 200 or response.status_code >= 300):
+        return response
+    body = response.get_data()
+    encoding = negotiate_encoding(request.accept_encodings, len(body))
+    response.vary.add('Accept-Encoding')
+    if encoding is not None:
+        response.set_data(compress(body, encoding))
+        response.content_encoding = encoding
+    return response
 
 # --- API Endpoints ---
 
+# --- Listeleme: filtre, kolon seçimi, imleçli sayfalama ---
+PRODUCT_QUERY_PARAMS = ('limit', 'cursor', 'fields', 'factory', 'prefix', 'latest', 'since', 'until', 'currency')
+SHIPPING_QUERY_PARAMS = ('limit', 'cursor', 'fields', 'factory', 'company', 'vehicle_type')
+
+def query_orient():
+    orient = request.args.get('orient', 'records')
+    if orient not in ('records', 'columns'):
+        raise ValueError('orient must be records or columns')
+    return orient
+
+def query_values(name):
+    """Virgülle ayrılmış çoklu değer parametresi (factory=TR16,TR17)"""
+    value = request.args.get(name)
+    return [item.strip() for item in value.split(',') if item.strip()] if value else None
+
+def list_payload(view, mask, orient, extend=None):
+    """
+    Görünümden filtre + sayfa + kolon seçimi uygulanmış yanıt gövdesi.
+
+    `extend(sayfa)` verilirse sayfaya eklenecek türetilmiş kolonları döndürür
+    (yalnızca dönen satırlar için hesaplanır).
+    """
+    args = request.args
+    fields = parse_fields(args.get('fields'), view.frame.columns)
+    paged = 'limit' in args or 'cursor' in args
+    limit = parse_limit(args.get('limit')) if paged else None
+    after = decode_cursor(args['cursor']) if args.get('cursor') else None
+    page, next_cursor = view.page(mask, limit, after)
+    extra = extend(page) if extend is not None else {}
+    if fields is not None:
+        page = page[fields]
+    if extra:
+        page = page.assign(**extra)
+    if 'Kayit_Tarihi' in page.columns:
+        page = page.assign(Kayit_Tarihi=page['Kayit_Tarihi'].astype(str))
+    items = frame_payload(page, orient)
+    if not paged:
+        return items
+    return {'data_version': current_snapshot().version, 'count': len(page), 'next_cursor': next_cursor, 'items': items}
+
+def product_view(snapshot, latest_only):
+    """Ürün × fabrika, en yeni önce sıralı görünüm; latest_only → fiyat indeksinden son kayıtlar"""
+    # İndeks memo dışında alınır: snapshot.memo kilidi yeniden girişli değil
+    frame = current_price_index().latest_rows() if latest_only else snapshot.products
+    return snapshot.memo(('view', 'products', latest_only),
+                         lambda: SortedView(frame, ['Urun_Adi', 'Fabrika'], date_column='Kayit_Tarihi'))
+
+def product_mask(frame):
+    args = request.args
+    mask = np.ones(len(frame), dtype=bool)
+    factories = query_values('factory')
+    if factories:
+        mask &= frame['Fabrika'].isin(factories).to_numpy()
+    if args.get('prefix'):
+        mask &= frame['Urun_Adi'].str.casefold().str.startswith(args['prefix'].casefold()).to_numpy()
+    if args.get('since'):
+        mask &= (frame['Kayit_Tarihi'] >= pd.Timestamp(date.fromisoformat(args['since']))).to_numpy()
+    if args.get('until'):
+        mask &= (frame['Kayit_Tarihi'] < pd.Timestamp(date.fromisoformat(args['until'])) + pd.Timedelta(days=1)).to_numpy()
+    return mask
+
 @app.route('/api/products', methods=['GET'])
 def get_products():
-    """Tüm ürünleri döndür"""
-    df = load_products()
-    if not df.empty:
-        df['Kayit_Tarihi'] = df['Kayit_Tarihi'].astype(str)
-        return jsonify(df.to_dict('records'))
-    return jsonify([])
+    """
+    Tüm ürünleri döndür.
+
+    `?orient=columns` ile kolon bazlı ({kolon: [değerler]}) daha küçük yanıt alınır.
+    Filtreler: factory=TR16,TR17, prefix=<ad başı>, latest=1 (yalnızca son fiyatlar),
+    since/until=YYYY-MM-DD, fields=Urun_Adi,NTS_Maliyet_TL, currency=1 (kayıtlı kurla
+    USD_Kg/EUR_Kg/CHF_Kg; kur yoksa güncel kur). limit/cursor verilirse
+    {items, next_cursor} zarfıyla sayfalı döner.
+    """
+    try:
+        orient = query_orient()
+        if not any(name in request.args for name in PRODUCT_QUERY_PARAMS):
+            return cached_response('products', lambda snapshot: products_payload(snapshot, orient), orient)
+        snapshot = current_snapshot()
+        view = product_view(snapshot, request.args.get('latest') in ('1', 'true'))
+        with stage('filter'):
+            mask = product_mask(view.frame)
+            extend = None
+            if request.args.get('currency') in ('1', 'true'):
+                extend = lambda page: currency_columns(page, snapshot.rates, suffix='_Kg')
+            payload = list_payload(view, mask, orient, extend)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return cached_response('products', lambda snapshot: payload, memoize=False)
+
+def products_payload(snapshot, orient='records'):
+    df = snapshot.products
+    if df.empty:
+        return [] if orient == 'records' else {}
+    return frame_payload(df.assign(Kayit_Tarihi=df['Kayit_Tarihi'].astype(str)), orient)
 
 @app.route('/api/cities', methods=['GET'])
 def get_cities():
     """Tüm şehirleri döndür"""
-    df = load_shipping()
-    if not df.empty:
-        cities = sorted(df['Sehir'].unique().tolist())
-        return jsonify(cities)
-    return jsonify([])
+    return cached_response('cities', cities_payload)
+
+def cities_payload(snapshot):
+    df = snapshot.shipping
+    return sorted(df['Sehir'].unique().tolist()) if not df.empty else []
+
+@app.route('/api/search', methods=['GET'])
+def search_suggestions():
+    """
+    Ürün ve şehir adlarında otomatik tamamlama.
+
+    Parametreler: q (zorunlu), kind=product|city, limit (varsayılan 10, en fazla 100),
+    fuzzy=0 (yazım hatası toleransını kapat). Türkçe harf ve aksan duyarsızdır.
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'q parameter required'}), 400
+    kind = request.args.get('kind') or None
+    if kind is not None and kind not in SEARCH_KINDS:
+        return jsonify({'error': f"kind must be one of {', '.join(SEARCH_KINDS)}"}), 400
+    try:
+        limit = min(int(request.args.get('limit', SEARCH_DEFAULT_LIMIT)), SEARCH_MAX_LIMIT)
+    except ValueError:
+        return jsonify({'error': 'Invalid limit'}), 400
+    fuzzy = request.args.get('fuzzy') not in ('0', 'false')
+
+    def build(snapshot):
+        with stage('search'):
+            results = search_index(snapshot).search(query, kind, max(limit, 1), fuzzy)
+        return {
+            'data_version': snapshot.version,
+            'query': query,
+            'items': [dict(extra, text=text, kind=entry_kind) for text, entry_kind, extra in results],
+        }
+    return cached_response('search', build, memoize=False)
+
+def shipping_view(snapshot):
+    return snapshot.memo(('view', 'shipping'), lambda: SortedView(snapshot.shipping, ['Sehir', 'Fabrika', 'Firma', 'Arac_Tipi']))
 
 @app.route('/api/shipping', methods=['GET'])
 def get_shipping():
-    """Belirli bir şehir için nakliye seçeneklerini döndür"""
+    """
+    Belirli bir şehir için nakliye seçeneklerini döndür.
+
+    Filtreler: factory, company, vehicle_type (virgülle çoklu), fields; limit/cursor ile sayfalı.
+    """
     city = request.args.get('city')
     if not city:
         return jsonify({'error': 'City parameter required'}), 400
     
-    df = load_shipping()
-    filtered = df[df['Sehir'] == city]
-    
-    if not filtered.empty:
-        return jsonify(filtered.to_dict('records'))
-    return jsonify([])
+    try:
+        orient = query_orient()
+        snapshot = current_snapshot()
+        view = shipping_view(snapshot)
+        with stage('filter'):
+            frame = view.frame
+            mask = (frame['Sehir'] == city).to_numpy(copy=True)
+            for param, column in (('factory', 'Fabrika'), ('company', 'Firma'), ('vehicle_type', 'Arac_Tipi')):
+                values = query_values(param)
+                if values:
+                    mask &= frame[column].isin(values).to_numpy()
+            payload = list_payload(view, mask, orient)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    # Yalnızca şehir filtresi ve hattı olan bir şehir: şehir başına bir gövde saklanır
+    # (bilinen şehir sayısıyla sınırlı); bilinmeyen şehirler memo'yu büyütmez
+    plain = not any(name in request.args for name in SHIPPING_QUERY_PARAMS)
+    return cached_response('shipping', lambda snapshot: payload, variant=(city, orient),
+                           memoize=plain and bool(mask.any()))
 
 @app.route('/api/rates', methods=['GET'])
 def get_rates():
     """Güncel döviz kurlarını döndür"""
-    rates = load_exchange_rates()
-    return jsonify(rates)
+    return cached_response('rates', lambda snapshot: dict(snapshot.rates))
+
+@app.route('/api/rates/backfill', methods=['POST'])
+def backfill_rates():
+    """
+    TCMB kur geçmişini tarih aralığı için doldur.
+
+    Gövde: {"start": "YYYY-MM-DD", "end": "YYYY-MM-DD", "workers": 8, "force": false}
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        start = date.fromisoformat(data['start'])
+        end = date.fromisoformat(data['end']) if data.get('end') else date.today()
+        workers = int(data.get('workers', 8))
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'start (YYYY-MM-DD) required; end optional'}), 400
+    try:
+        summary = rate_cache.backfill(start, end, workers=max(1, min(workers, 16)), force=bool(data.get('force')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(summary)
 
 @app.route('/api/calculate', methods=['POST'])
 def calculate_price():
     """Fiyat hesaplama"""
-    data = request.json
-    
-    product = data.get('product')
-    city = data.get('city')
-    profit_margin = data.get('profit_margin', 15.0)
-    factory = data.get('factory')
-    shipping_company = data.get('shipping_company')
-    vehicle_type = data.get('vehicle_type')
+    with stage('parse'):
+        data = request.json
     
-    if not product or not city:
-        return jsonify({'error': 'Product and city are required'}), 400
-    
-    df_products = load_products()
-    df_shipping = load_shipping()
-    rates = load_exchange_rates()
-    
-    # Manuel seçim varsa
-    if factory and shipping_company and vehicle_type:
-        # Ürün maliyeti
-        product_data = df_products[
-            (df_products['Urun_Adi'] == product) & 
-            (df_products['Fabrika'] == factory)
-        ].sort_values('Kayit_Tarihi', ascending=False)
-        
-        if product_data.empty:
-            return jsonify({'error': 'Product not found'}), 404
-        
-        nts_cost = product_data.iloc[0]['NTS_Maliyet_TL']
-        
-        # Nakliye maliyeti
-        shipping_data = df_shipping[
-            (df_shipping['Sehir'] == city) &
-            (df_shipping['Fabrika'] == factory) &
-            (df_shipping['Firma'] == shipping_company) &
-            (df_shipping['Arac_Tipi'] == vehicle_type)
-        ]
-        
-        if shipping_data.empty:
-            return jsonify({'error': 'Shipping option not found'}), 404
-        
-        shipping_cost = shipping_data.iloc[0]['Fiyat_TL_KG']
-        
-        # Hesaplama
-        total_cost = nts_cost + shipping_cost
-        sale_price_tl = total_cost * (1 + profit_margin / 100)
-        
-        result = {
-            'Fabrika': factory,
-            'Firma': shipping_company,
-            'Arac': vehicle_type,
-            'NTS_TL': float(nts_cost),
-            'Nakliye_TL': float(shipping_cost),
-            'Toplam_Maliyet_TL': float(total_cost),
-            'Satis_TL': float(sale_price_tl),
-            'Satis_USD_KG': float(sale_price_tl / rates.get('USD', 36.50)),
-            'Satis_EUR_KG': float(sale_price_tl / rates.get('EUR', 38.20)),
-            'Satis_CHF_KG': float(sale_price_tl / rates.get('CHF', 41.10)),
-            'is_cheapest': True
-        }
-        
+    with stage('snapshot'):
+        snapshot = current_snapshot()
+    try:
+        result = calculate(
+            snapshot, data.get('product'), data.get('city'), data.get('profit_margin'),
+            data.get('factory'), data.get('shipping_company'), data.get('vehicle_type'),
+            route_matrix=current_route_matrix, stage=stage,
+        )
+    except PricingError as e:
+        return jsonify({'error': str(e)}), e.status
+    with stage('serialize'):
         return jsonify(result)
+
+@app.route('/api/calculate/batch', methods=['POST'])
+def calculate_batch():
+    """
+    Toplu fiyat hesaplama.
+
+    Gövde: {"items": [{"product", "city", "profit_margin", "factory", "shipping_company", "vehicle_type"}, ...]}
+    veya doğrudan liste. Sonuçlar girdi sırasında döner; hatalı satırlar `error`/`status` içerir.
+    `Accept: application/x-ndjson` veya `?format=ndjson` ile satır satır akış yapılır.
+    """
+    data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return jsonify({'error': 'items list required'}), 400
+    if len(items) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'Batch size limit is {MAX_BATCH_SIZE}'}), 413
+    
+    default_margin = data.get('profit_margin', 15.0) if isinstance(data, dict) else 15.0
+    with stage('snapshot'):
+        snapshot = current_snapshot()
+    with stage('index'):
+        urun_index = current_price_index()
+    with stage('quote'):
+        results = quote_batch(urun_index, snapshot.shipping, items, snapshot.rates, default_margin)
+    records = (batch_result_record(row, snapshot) for row in results.to_dict('records'))
     
-    # Otomatik - en ucuz seçeneği bul
-    all_factories = ['TR14', 'TR15', 'TR16']
-    cheapest = None
-    min_price = float('inf')
+    wants_ndjson = (
+        request.args.get('format') == 'ndjson' or
+        request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson']) == 'application/x-ndjson'
+    )
+    if wants_ndjson:
+        def generate():
+            for record in records:
+                yield json.dumps(record, ensure_ascii=False) + '\n'
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
     
-    for fab in all_factories:
-        product_data = df_products[
-            (df_products['Urun_Adi'] == product) & 
-            (df_products['Fabrika'] == fab)
-        ].sort_values('Kayit_Tarihi', ascending=False)
-        
-        if product_data.empty:
-            continue
-        
-        nts_cost = product_data.iloc[0]['NTS_Maliyet_TL']
-        
-        shipping_options = df_shipping[
-            (df_shipping['Sehir'] == city) &
-            (df_shipping['Fabrika'] == fab)
-        ]
-        
-        for _, shipping in shipping_options.iterrows():
-            shipping_cost = shipping['Fiyat_TL_KG']
-            total_cost = nts_cost + shipping_cost
-            sale_price_tl = total_cost * (1 + profit_margin / 100)
-            
-            if sale_price_tl < min_price:
-                min_price = sale_price_tl
-                cheapest = {
-                    'Fabrika': fab,
-                    'Firma': shipping['Firma'],
-                    'Arac': shipping['Arac_Tipi'],
-                    'NTS_TL': float(nts_cost),
-                    'Nakliye_TL': float(shipping_cost),
-                    'Toplam_Maliyet_TL': float(total_cost),
-                    'Satis_TL': float(sale_price_tl),
-                    'Satis_USD_KG': float(sale_price_tl / rates.get('USD', 36.50)),
-                    'Satis_EUR_KG': float(sale_price_tl / rates.get('EUR', 38.20)),
-                    'Satis_CHF_KG': float(sale_price_tl / rates.get('CHF', 41.10)),
-                    'is_cheapest': True
-                }
+    with stage('serialize'):
+        records = list(records)
+        return jsonify({
+            'data_version': snapshot.version,
+            'count': len(records),
+            'error_count': int((results['error'].notna()).sum()),
+            'results': records
+        })
+
+def batch_result_record(row, snapshot):
+    if row['error'] is not None:
+        return {'index': row['index'], 'error': row['error'], 'status': row['status']}
+    record = {'index': row['index']}
+    record.update(calculation_result(row, snapshot))
+    return record
+
+def matrix_query_margin():
+    try:
+        return float(request.args.get('profit_margin', 15.0))
+    except ValueError:
+        return None
+
+@app.route('/api/matrix/product', methods=['GET'])
+def get_product_matrix():
+    """Bir ürünün tüm şehirler için en ucuz rotaları"""
+    product = request.args.get('product')
+    profit_margin = matrix_query_margin()
+    if not product:
+        return jsonify({'error': 'Product parameter required'}), 400
+    if profit_margin is None:
+        return jsonify({'error': 'Invalid profit_margin'}), 400
     
-    if cheapest:
-        return jsonify(cheapest)
+    matrix = current_route_matrix()
+    factories = request.args.get('factories') in ('1', 'true')
+    return jsonify({
+        'data_version': matrix.version,
+        'product': product,
+        'profit_margin': profit_margin,
+        'routes': matrix.product_routes(product, profit_margin, current_snapshot().rates, factories)
+    })
+
+@app.route('/api/matrix/city', methods=['GET'])
+def get_city_matrix():
+    """Bir şehir için tüm ürünlerin en ucuz rotaları"""
+    city = request.args.get('city')
+    profit_margin = matrix_query_margin()
+    if not city:
+        return jsonify({'error': 'City parameter required'}), 400
+    if profit_margin is None:
+        return jsonify({'error': 'Invalid profit_margin'}), 400
     
-    return jsonify({'error': 'No valid calculation found'}), 404
+    matrix = current_route_matrix()
+    factories = request.args.get('factories') in ('1', 'true')
+    return jsonify({
+        'data_version': matrix.version,
+        'city': city,
+        'profit_margin': profit_margin,
+        'routes': matrix.city_routes(city, profit_margin, current_snapshot().rates, factories)
+    })
+
+@app.route('/api/history/export', methods=['GET'])
+def export_history():
+    """
+    Hesaplama geçmişini parça parça filtreleyip akışla indir.
+
+    Parametreler: format=csv|xlsx, musteri, bayi_musteri, urun, username,
+    start/end=YYYY-MM-DD. Geçmiş belleğe tümüyle alınmaz.
+    """
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'xlsx'):
+        return jsonify({'error': 'format must be csv or xlsx'}), 400
+    try:
+        filters = HistoryFilter.from_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    chunks = iter_filtered(filters)
+    if fmt == 'xlsx':
+        body, mimetype = iter_xlsx(chunks), XLSX_MIME
+    else:
+        body, mimetype = iter_csv(chunks), 'text/csv'
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=hesaplama_gecmisi.{fmt}'
+    return response
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """
+    Hesaplama geçmişi özetleri (adet, ortalama kâr marjı, ortalama satış TL/kg).
+
+    Parametreler: dimension (musteri, bayi_musteri, urun, sehir, username, gun,
+    kullanici_bayi_musteri), limit; key verilirse yalnızca o değerin özeti döner.
+    """
+    dimension = request.args.get('dimension', 'urun')
+    if dimension not in ROLLUP_DIMENSIONS:
+        return jsonify({'error': f"dimension must be one of {', '.join(ROLLUP_DIMENSIONS)}"}), 400
+    key = request.args.get('key')
+    if key is not None:
+        value = tuple(key.split(',')) if len(ROLLUP_DIMENSIONS[dimension]) > 1 else key
+        return jsonify(dict(rollups.get(dimension, value), dimension=dimension, key=key))
+    try:
+        limit = int(request.args['limit']) if 'limit' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'Invalid limit'}), 400
+    return jsonify({'dimension': dimension, 'items': rollups.top(dimension, limit)})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metin biçiminde metrikler"""
+    snapshot = snapshot_store.peek()
+    if snapshot is not None:
+        SNAPSHOT_GENERATION.set(snapshot.generation)
+        SNAPSHOT_LOAD_SECONDS.set(snapshot.load_seconds)
+    return Response(registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+# --- Isıtma ve hazır olma ---
+# Üretim modunda ana süreçte fork'tan önce çağrılır; işçiler hazır yapıları paylaşır
+_warm_up_lock = threading.Lock()
+readiness = {'ready': False, 'pid': None, 'warmed_at': None, 'warm_up_ms': None}
+
+def warm_up():
+    """Snapshot, fiyat indeksi, rota matrisi, liste görünümleri, arama indeksi ve geçmiş özetlerini önceden kur"""
+    with _warm_up_lock:
+        started = time.perf_counter()
+        with app.app_context():
+            snapshot = current_snapshot()
+            current_route_matrix()
+            product_view(snapshot, latest_only=False)
+            product_view(snapshot, latest_only=True)
+            shipping_view(snapshot)
+            search_index(snapshot)
+        rollups.top('musteri', 0)
+        readiness.update(
+            ready=True, pid=os.getpid(),
+            warmed_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            warm_up_ms=round((time.perf_counter() - started) * 1000, 2),
+        )
+        return readiness
 
 @app.route('/health', methods=['GET'])
 def health():
-    """Health check endpoint"""
-    return jsonify({'status': 'ok', 'service': 'NTS Backend API'})
+    """Hazır olma kontrolü; ısıtma sürerken 503 döner"""
+    if not readiness['ready']:
+        if _warm_up_lock.locked():
+            return jsonify({'status': 'starting', 'service': 'NTS Backend API'}), 503
+        warm_up()
+    snapshot = current_snapshot()
+    matrix = route_matrix_store.peek()
+    return jsonify({
+        'status': 'ok',
+        'service': 'NTS Backend API',
+        'pid': os.getpid(),
+        'warm_up': dict(readiness),
+        'data': snapshot.info(),
+        'route_matrix_version': matrix.version if matrix is not None else None,
+        'rates_date': snapshot.rates.get('date'),
+    })
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='NTS REST API sunucusu')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--production', action='store_true',
+                        help='Üretim modu: gunicorn prefork (Windows: waitress), veriler fork öncesi yüklenir')
+    parser.add_argument('--workers', type=int, default=None, help='İşçi süreç sayısı (varsayılan: NTS_WORKERS veya çekirdek sayısı)')
+    parser.add_argument('--threads', type=int, default=None, help='İşçi başına thread (varsayılan: NTS_THREADS veya 4)')
+    args = parser.parse_args(argv)
+
+    if args.production:
+        serve(app, args.host, args.port, workers=args.workers, threads=args.threads, warm_up=warm_up)
+    else:
+        app.run(host=args.host, port=args.port, debug=True)
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    main()
@@ -1,11 +1,18 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
 import hashlib
-import json
-import os
-import requests
-import xml.etree.ElementTree as ET
+
+from nts_core.changeset import ChangeConflict, apply_checked, diff_frames, record_changes
+from nts_core.currency import currency_columns
+from nts_core.history_export import XLSX_MIME, HistoryFilter, collect, export_bytes, filter_options, iter_filtered
+from nts_core.loaders import prepare_products, price_index, pricing_store
+from nts_core.quote import find_cheapest_route
+from nts_core.rates import get_current_rates, get_tcmb_rates
+from nts_core.repricing import bulk_reprice
+from nts_core.rollups import record_calculation, rollups
+from nts_core.search import PRODUCT, search_index
+from nts_core.storage import SHIPPING_COLUMNS, drop_history_records, get_storage
 
 # --- SAYFA AYARLARI ---
 st.set_page_config(page_title="NTS Mobil - Fiyat Hesaplama", page_icon="🚛", layout="wide")
@@ -21,151 +28,23 @@ div.stButton > button:first-child {
 """, unsafe_allow_html=True)
 
 # --- DOSYALAR ---
-PRODUCT_FILE = 'urun_fiyat_db.csv'
-SHIPPING_FILE = 'lokasyonlar.csv'
-USERS_FILE = 'users.json'
-EXCHANGE_RATES_FILE = 'exchange_rates.json'
-TCMB_HISTORY_FILE = 'tcmb_kur_gecmisi.json'
-CALC_HISTORY_FILE = 'hesaplama_gecmisi.csv'
+# Ürün, nakliye, kullanıcı, bayi ve geçmiş verileri nts_core.storage üzerinden okunur/yazılır
+# Döviz kurları: nts_core.rates (exchange_rates.json + TCMB geçmişi)
 OWNER_NAME = "Göksel Çapkın"
 ADMIN_USERNAME = "goksel"
 ADMIN_DEFAULT_PASSWORD = "NTS2025!"
-
-# --- DÖVİZ KURU FONKSİYONLARI ---
-
-def load_tcmb_history():
-    if os.path.exists(TCMB_HISTORY_FILE):
-        with open(TCMB_HISTORY_FILE, 'r', encoding='utf-8') as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return {}
-    return {}
-
-
-def save_tcmb_history(date_key, rates):
-    history = load_tcmb_history()
-    history[date_key] = rates
-    with open(TCMB_HISTORY_FILE, 'w', encoding='utf-8') as f:
-        json.dump(history, f, ensure_ascii=False, indent=2)
-
-
-def fetch_tcmb_for_date(date_obj):
-    date_str = date_obj.strftime('%d%m%Y')
-    year = date_obj.year
-    month = f"{date_obj.month:02d}"
-    url = f"https://www.tcmb.gov.tr/kurlar/{year}{month}/{date_str}.xml"
-    try:
-        response = requests.get(url, timeout=10)
-    except Exception:
-        return None
-    if response.status_code != 200:
-        return None
-    try:
-        root = ET.fromstring(response.content)
-    except Exception:
-        return None
-    rates = {}
-    for currency in root.findall('Currency'):
-        code = currency.get('CurrencyCode')
-        if code in ['USD', 'EUR', 'CHF']:
-            forex_selling = currency.find('ForexSelling')
-            if forex_selling is not None and forex_selling.text:
-                rates[code] = float(forex_selling.text)
-    if not rates:
-        return None
-    rates['TL'] = 1.0
-    rates['date'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    rates['source_date'] = date_obj.strftime('%Y-%m-%d')
-    return rates
-
-
-def get_tcmb_rates(target_date=None):
-    """
-    TCMB'den döviz satış kurlarını çek.
-    
-    Args:
-        target_date: datetime.date veya None. None ise bugünün tarihi kullanılır.
-    
-    Returns:
-        dict: Kurlar ve tarih bilgisi
-    """
-    if target_date is None:
-        target_date = datetime.now().date()
-    elif isinstance(target_date, datetime):
-        target_date = target_date.date()
-    
-    attempts = 0
-    for back in range(0, 15):  # 15 güne kadar geriye git
-        candidate = target_date - timedelta(days=back)
-        if candidate.weekday() >= 5:  # Hafta sonu ise atla
-            continue
-        attempts += 1
-        if attempts > 10:  # Maksimum 10 iş günü dene
-            break
-        fetched = fetch_tcmb_for_date(candidate)
-        if fetched:
-            fetched['is_fallback'] = back > 0
-            fetched['fallback_days'] = back
-            fetched['target_date'] = target_date.strftime('%Y-%m-%d')
-            if back > 0:
-                fetched['used_date'] = candidate.strftime('%Y-%m-%d')
-            save_exchange_rates(fetched)
-            save_tcmb_history(candidate.strftime('%Y-%m-%d'), fetched)
-            return fetched
-    fallback = load_exchange_rates()
-    fallback['is_fallback'] = True
-    fallback.setdefault('source_date', 'Varsayılan')
-    return fallback
-
-
-def save_exchange_rates(rates):
-    """Döviz kurlarını kaydet"""
-    with open(EXCHANGE_RATES_FILE, 'w', encoding='utf-8') as f:
-        json.dump(rates, f, ensure_ascii=False, indent=2)
-
-
-def load_exchange_rates():
-    """Kayıtlı döviz kurlarını yükle"""
-    if os.path.exists(EXCHANGE_RATES_FILE):
-        with open(EXCHANGE_RATES_FILE, 'r', encoding='utf-8') as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                pass
-    # Varsayılan kurlar
-    return {'TL': 1.0, 'USD': 36.50, 'EUR': 38.20, 'CHF': 41.10, 'date': 'Varsayılan', 'source_date': 'Varsayılan', 'is_fallback': True}
-
-
-def get_rates_for_date(date_obj):
-    """Kaydedilmiş TCMB geçmişinde verilen tarih için kur arar."""
-    history = load_tcmb_history()
-    key = date_obj.strftime('%Y-%m-%d')
-    return history.get(key)
-
+# Ürün tablosu düzenleyicisinde kaydedilen (düzenlenebilir) kolonlar
+PRODUCT_EDIT_COLUMNS = ['Urun_Adi', 'Fabrika', 'Giris_Para_Birimi', 'Giris_Fiyat', 'NTS_Maliyet_TL', 'Kayit_Tarihi']
 
 # --- HESAPLAMA GEÇMİŞİ ---
 
-CALC_COLUMNS = [
-    'timestamp', 'username', 'musteri', 'urun', 'sehir', 'fabrika', 'firma', 'arac',
-    'kar_marji', 'nts_tl', 'nakliye_tl', 'toplam_maliyet_tl',
-    'satis_tl_kg', 'satis_usd_kg', 'satis_eur_kg', 'satis_chf_kg',
-    'satis_tl_ton', 'satis_usd_ton', 'satis_eur_ton', 'satis_chf_ton',
-    'usd_kur', 'eur_kur', 'chf_kur', 'kur_tarihi', 'urun_kayit_tarihi'
-]
-
-
 def ensure_calc_history_file():
-    if not os.path.exists(CALC_HISTORY_FILE):
-        df = pd.DataFrame(columns=CALC_COLUMNS)
-        df.to_csv(CALC_HISTORY_FILE, index=False)
+    get_storage().ensure_history()
 
 
 def append_calc_record(record):
-    ensure_calc_history_file()
-    df = pd.read_csv(CALC_HISTORY_FILE) if os.path.exists(CALC_HISTORY_FILE) else pd.DataFrame(columns=CALC_COLUMNS)
-    df = pd.concat([df, pd.DataFrame([record])], ignore_index=True)
-    df.to_csv(CALC_HISTORY_FILE, index=False)
+    # Geçmişe ekler ve müşteri/ürün/kullanıcı özetlerini artımlı günceller
+    record_calculation(record)
 
 # --- KULLANICI YÖNETİMİ ---
 
@@ -175,15 +54,11 @@ def hash_password(password):
 
 def load_users():
     """Kullanıcıları yükle"""
-    if os.path.exists(USERS_FILE):
-        with open(USERS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+    return get_storage().read_json('users')
 
 def save_users(users):
-    """Kullanıcıları kaydet"""
-    with open(USERS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(users, f, ensure_ascii=False, indent=2)
+    """Kullanıcıları kaydet (güncel dosyaya upsert; aynı anda eklenen kullanıcılar korunur)"""
+    get_storage().put_json_items('users', users)
 
 
 def ensure_owner_user():
@@ -237,212 +112,28 @@ def user_accepted_agreement(username):
 
 # --- FONKSİYONLAR ---
 
-def load_products():
-    try:
-        df = pd.read_csv(PRODUCT_FILE)
-        df['Kayit_Tarihi'] = pd.to_datetime(df['Kayit_Tarihi'], format='%d.%m.%Y', errors='coerce')
-        return df
-    except Exception:
-        return pd.DataFrame(columns=['Urun_Adi', 'Fabrika', 'NTS_Maliyet_TL', 'Kayit_Tarihi'])
-
-def load_shipping():
-    try:
-        return pd.read_csv(SHIPPING_FILE)
-    except Exception:
-        return pd.DataFrame(columns=['Sehir', 'Firma', 'Fabrika', 'Arac_Tipi', 'Fiyat_TL_KG'])
-
-def get_latest_product_price(df_products, urun_adi, fabrika):
-    filtered = df_products[(df_products['Urun_Adi'] == urun_adi) & (df_products['Fabrika'] == fabrika)]
-    if filtered.empty:
-        return None
-    latest = filtered.sort_values('Kayit_Tarihi', ascending=False).iloc[0]
-    return latest['NTS_Maliyet_TL']
-
-
-def get_selected_product_price(df_products, urun_adi, fabrika, secili_fiyatlar):
-    """Kullanıcının seçtiği fiyatı döndür, yoksa en son fiyatı kullan"""
-    if fabrika in secili_fiyatlar:
-        return secili_fiyatlar[fabrika]
-    return get_latest_product_price(df_products, urun_adi, fabrika)
-
-def get_all_product_prices(df_products, urun_adi, fabrika):
-    filtered = df_products[(df_products['Urun_Adi'] == urun_adi) & (df_products['Fabrika'] == fabrika)]
-    return filtered.sort_values('Kayit_Tarihi', ascending=False)
-
-def find_cheapest_route(df_products, df_shipping, urun_adi, sehir, kar_marji, exchange_rates, secili_fiyatlar=None, manuel_nakliye=None):
-    if secili_fiyatlar is None:
-        secili_fiyatlar = {}
-    calculated_rows = []
-    display_rows = []
-    usd_rate = exchange_rates.get('USD', 36.50) or 36.50
-    eur_rate = exchange_rates.get('EUR', 38.20) or 38.20
-    chf_rate = exchange_rates.get('CHF', 41.10) or 41.10
-
-    ilgili_nakliye = df_shipping[(df_shipping['Sehir'] == sehir)]
-    tum_fabrikalar = ['TR14', 'TR15', 'TR16']
-    
-    # Manuel nakliye seçimi varsa, sadece o seçeneği hesapla
-    if manuel_nakliye:
-        fabrika = manuel_nakliye['fabrika']
-        nts_tl = get_selected_product_price(df_products, urun_adi, fabrika, secili_fiyatlar)
-        
-        if nts_tl is not None:
-            nakliye_tl = manuel_nakliye['fiyat']
-            toplam_maliyet_tl = nts_tl + nakliye_tl
-            satis_tl = toplam_maliyet_tl * (1 + kar_marji / 100)
-            
-            satis_usd_kg = satis_tl / usd_rate
-            satis_eur_kg = satis_tl / eur_rate
-            satis_chf_kg = satis_tl / chf_rate
-            
-            manuel_row = {
-                'Fabrika': fabrika,
-                'Firma': manuel_nakliye['firma'],
-                'Arac': manuel_nakliye['arac'],
-                'NTS_TL': nts_tl,
-                'Nakliye_TL': nakliye_tl,
-                'Toplam_Maliyet_TL': toplam_maliyet_tl,
-                'Satis_USD_KG': satis_usd_kg,
-                'Satis_EUR_KG': satis_eur_kg,
-                'Satis_CHF_KG': satis_chf_kg,
-                'Satis_TL_TON': satis_tl * 1000,
-                'Satis_USD_TON': satis_usd_kg * 1000,
-                'Satis_EUR_TON': satis_eur_kg * 1000,
-                'Satis_CHF_TON': satis_chf_kg * 1000,
-                'Satis_TL': satis_tl,
-                'HasPrice': True
-            }
-            
-            # Tüm fabrikalar için display göster ama sadece seçili manuel hesaplama
-            for fab in tum_fabrikalar:
-                if fab == fabrika:
-                    display_rows.append(manuel_row)
-                    calculated_rows.append(manuel_row)
-                else:
-                    # Diğer fabrikalar için boş gösterim
-                    fab_nts = get_selected_product_price(df_products, urun_adi, fab, secili_fiyatlar)
-                    display_rows.append({
-                        'Fabrika': fab,
-                        'Firma': '-',
-                        'Arac': '-',
-                        'NTS_TL': fab_nts if fab_nts is not None else '-',
-                        'Nakliye_TL': '-',
-                        'Toplam_Maliyet_TL': '-',
-                        'Satis_USD_KG': '-',
-                        'Satis_EUR_KG': '-',
-                        'Satis_CHF_KG': '-',
-                        'Satis_TL_TON': '-',
-                        'Satis_USD_TON': '-',
-                        'Satis_EUR_TON': '-',
-                        'Satis_CHF_TON': '-',
-                        'Satis_TL': None,
-                        'HasPrice': False
-                    })
-            
-            return manuel_row, display_rows, exchange_rates
-
-    # Otomatik mod - tüm seçenekleri hesapla
-
-    for fabrika in tum_fabrikalar:
-        nts_tl = get_selected_product_price(df_products, urun_adi, fabrika, secili_fiyatlar)
-        nakliye_options = ilgili_nakliye[ilgili_nakliye['Fabrika'] == fabrika]
-
-        # Eğer nakliye kaydı yoksa bile satır ekle (boş gösterim)
-        if nakliye_options.empty:
-            display_rows.append({
-                'Fabrika': fabrika,
-                'Firma': '-',
-                'Arac': '-',
-                'NTS_TL': nts_tl if nts_tl is not None else '-',
-                'Nakliye_TL': '-',
-                'Toplam_Maliyet_TL': '-',
-                'Satis_USD_KG': '-',
-                'Satis_EUR_KG': '-',
-                'Satis_CHF_KG': '-',
-                'Satis_TL_TON': '-',
-                'Satis_USD_TON': '-',
-                'Satis_EUR_TON': '-',
-                'Satis_CHF_TON': '-',
-                'Satis_TL': None,
-                'HasPrice': False
-            })
-            continue
-
-        if nts_tl is None:
-            for _, nakliye in nakliye_options.iterrows():
-                display_rows.append({
-                    'Fabrika': fabrika,
-                    'Firma': nakliye['Firma'],
-                    'Arac': nakliye['Arac_Tipi'],
-                    'NTS_TL': '-',
-                    'Nakliye_TL': '-',
-                    'Toplam_Maliyet_TL': '-',
-                    'Satis_USD_KG': '-',
-                    'Satis_EUR_KG': '-',
-                    'Satis_CHF_KG': '-',
-                    'Satis_TL_TON': '-',
-                    'Satis_USD_TON': '-',
-                    'Satis_EUR_TON': '-',
-                    'Satis_CHF_TON': '-',
-                    'Satis_TL': None,
-                    'HasPrice': False
-                })
-            continue
-
-        for _, nakliye in nakliye_options.iterrows():
-            nakliye_tl = nakliye['Fiyat_TL_KG']
-            toplam_maliyet_tl = nts_tl + nakliye_tl
-            satis_tl = toplam_maliyet_tl * (1 + kar_marji / 100)
-
-            satis_usd_kg = satis_tl / usd_rate
-            satis_eur_kg = satis_tl / eur_rate
-            satis_chf_kg = satis_tl / chf_rate
+@st.cache_data(max_entries=1)
+def history_filter_options(signature):
+    """Geçmiş filtre seçenekleri; geçmiş değişince (imza) yeniden hesaplanır"""
+    return filter_options()
 
-            display_rows.append({
-                'Fabrika': fabrika,
-                'Firma': nakliye['Firma'],
-                'Arac': nakliye['Arac_Tipi'],
-                'NTS_TL': nts_tl,
-                'Nakliye_TL': nakliye_tl,
-                'Toplam_Maliyet_TL': toplam_maliyet_tl,
-                'Satis_USD_KG': satis_usd_kg,
-                'Satis_EUR_KG': satis_eur_kg,
-                'Satis_CHF_KG': satis_chf_kg,
-                'Satis_TL_TON': satis_tl * 1000,
-                'Satis_USD_TON': satis_usd_kg * 1000,
-                'Satis_EUR_TON': satis_eur_kg * 1000,
-                'Satis_CHF_TON': satis_chf_kg * 1000,
-                'Satis_TL': satis_tl,
-                'HasPrice': True
-            })
-
-            calculated_rows.append({
-                'Fabrika': fabrika,
-                'Firma': nakliye['Firma'],
-                'Arac': nakliye['Arac_Tipi'],
-                'NTS_TL': nts_tl,
-                'Nakliye_TL': nakliye_tl,
-                'Toplam_Maliyet_TL': toplam_maliyet_tl,
-                'Satis_TL': satis_tl,
-                'Satis_USD_KG': satis_usd_kg,
-                'Satis_EUR_KG': satis_eur_kg,
-                'Satis_CHF_KG': satis_chf_kg,
-                'Satis_USD_TON': satis_usd_kg * 1000,
-                'Satis_EUR_TON': satis_eur_kg * 1000,
-                'Satis_CHF_TON': satis_chf_kg * 1000,
-                'Satis_TL_TON': satis_tl * 1000
-            })
+@st.cache_resource(max_entries=1)
+def app_data_store():
+    """
+    Tüm oturumların paylaştığı ürün/nakliye snapshot'ı.
 
-    en_ucuz = None
-    if calculated_rows:
-        en_ucuz = min(calculated_rows, key=lambda x: x['Satis_TL'])
+    Depolama imzası (CSV: mtime/boyut, SQLite: veri kümesi sürümü) değişmedikçe
+    yeniden çalıştırmalar diske dokunmaz; uygulama içindeki her yazma önbelleği
+    ayrıca açıkça geçersiz kılar. Bellekte tek bir veri sürümü tutulur.
+    Paylaşılan DataFrame'ler yerinde değiştirilmemelidir.
+    """
+    return pricing_store(with_rates=False)
 
-    return en_ucuz, display_rows, exchange_rates
+def get_all_product_prices(urun_index, urun_adi, fabrika):
+    return urun_index.history(urun_adi, fabrika)
 
 def save_new_product(urun_adi, fabrika, nts_maliyet, tarih, para_birimi='TL', giris_fiyat=None, kur_usd=None, kur_eur=None, kur_chf=None, kur_tarihi=None):
     """Ürün kaydını genişletilmiş bilgilerle kaydet"""
-    df = load_products()
-    
     # Yeni kayıt
     new_row_data = {
         'Urun_Adi': urun_adi,
@@ -457,9 +148,7 @@ def save_new_product(urun_adi, fabrika, nts_maliyet, tarih, para_birimi='TL', gi
         'Kur_Tarihi': kur_tarihi if kur_tarihi else ''
     }
     
-    new_row = pd.DataFrame([new_row_data])
-    df = pd.concat([df, new_row], ignore_index=True)
-    df.to_csv(PRODUCT_FILE, index=False)
+    get_storage().append_products(pd.DataFrame([new_row_data]))
 
 # --- SESSION STATE KONTROLÜ ---
 if 'logged_in' not in st.session_state:
@@ -571,9 +260,11 @@ if not user_accepted_agreement(st.session_state.username):
     st.stop()
 
 # --- ANA UYGULAMA ---
-df_products = load_products()
-df_shipping = load_shipping()
-kurlar = get_tcmb_rates()
+data = app_data_store().get()
+df_products = data.products
+urun_index = price_index(data)
+df_shipping = data.shipping
+kurlar = get_current_rates()
 
 with st.sidebar:
     st.title("📊 NTS Mobil v7.5")
@@ -611,13 +302,10 @@ if page == "Fiyat Hesaplama":
         
         # 2. Bayi Müşteri Seçimi
         st.markdown("#### 🏢 Bayi Müşteri Seçimi")
-        BAYI_MUSTERI_FILE = "bayi_musterileri.json"
         bayi_musteri_adi = ""
         
-        if os.path.exists(BAYI_MUSTERI_FILE):
-            with open(BAYI_MUSTERI_FILE, 'r', encoding='utf-8') as f:
-                bayi_musteriler = json.load(f)
-            
+        bayi_musteriler = get_storage().read_json('bayi_musterileri')
+        if bayi_musteriler:
             current_user = st.session_state.username
             if current_user in bayi_musteriler and bayi_musteriler[current_user]:
                 col_bayi1, col_bayi2 = st.columns([1, 1])
@@ -705,16 +393,13 @@ if page == "Fiyat Hesaplama":
                     st.error("❌ Müşteri adı zorunludur.")
                 else:
                     musteri_adi_clean = musteri_adi.strip()
-                    urun_kayit_tarih = None
-                    urun_gecmis = df_products[df_products['Urun_Adi'] == secili_urun]
-                    if not urun_gecmis.empty:
-                        urun_kayit_tarih = urun_gecmis.sort_values('Kayit_Tarihi', ascending=False).iloc[0]['Kayit_Tarihi']
+                    urun_kayit_tarih = urun_index.latest_product_date(secili_urun)
 
                     # Manuel nakliye seçimi varsa kullan
                     manuel_nakliye = st.session_state.get('manuel_nakliye')
                     
                     en_ucuz, tum_secenekler, kullanilan_kurlar = find_cheapest_route(
-                        df_products, df_shipping, secili_urun, secili_sehir, st.session_state.kar_marji, kurlar,
+                        urun_index, df_shipping, secili_urun, secili_sehir, st.session_state.kar_marji, kurlar,
                         st.session_state.get('secili_fiyatlar', {}),
                         manuel_nakliye
                     )
@@ -752,7 +437,7 @@ if page == "Fiyat Hesaplama":
                     st.markdown(f"### {fab_emoji} {fab_adi}")
                     
                     # Bu fabrika için tüm fiyatları getir
-                    gecmis = get_all_product_prices(df_products, secili_urun, fabrika)
+                    gecmis = get_all_product_prices(urun_index, secili_urun, fabrika)
                     
                     if not gecmis.empty:
                         # Birden fazla fiyat varsa dropdown ile seçim
@@ -938,24 +623,6 @@ if page == "Fiyat Hesaplama":
                 }
                 append_calc_record(record)
                 
-                # Bayi müşteri hesaplama sayısını güncelle
-                BAYI_MUSTERI_FILE = "bayi_musterileri.json"
-                if os.path.exists(BAYI_MUSTERI_FILE):
-                    with open(BAYI_MUSTERI_FILE, 'r', encoding='utf-8') as f:
-                        bayi_musteriler = json.load(f)
-                    
-                    current_user = st.session_state.username
-                    bayi_musteri_kayit = st.session_state.get('bayi_musteri_kayit', '')
-                    
-                    if current_user in bayi_musteriler and bayi_musteri_kayit:
-                        for musteri in bayi_musteriler[current_user]:
-                            if musteri['adi'] == bayi_musteri_kayit:
-                                musteri['toplam_hesaplama'] = musteri.get('toplam_hesaplama', 0) + 1
-                                break
-                        
-                        with open(BAYI_MUSTERI_FILE, 'w', encoding='utf-8') as f:
-                            json.dump(bayi_musteriler, f, indent=2, ensure_ascii=False)
-                
                 st.success("📜 Hesaplama kaydedildi!")
                 st.balloons()
 
@@ -1254,9 +921,8 @@ elif page == "Yeni Ürün Ekle":
                         # Sadece gerekli kolonları al
                         new_products = uploaded_df[['Urun_Adi', 'Fabrika', 'NTS_Maliyet_TL', 'Kayit_Tarihi']].copy()
                         
-                        # Mevcut verilere ekle
-                        df_products = pd.concat([df_products, new_products], ignore_index=True)
-                        df_products.to_csv(PRODUCT_FILE, index=False)
+                        # Güncel dosyaya ekle (aradaki başka yazmalar korunur)
+                        get_storage().append_products(new_products)
                         
                         st.success(f"🎉 {len(new_products)} ürün başarıyla eklendi!")
                         st.balloons()
@@ -1279,7 +945,13 @@ elif page == "Yeni Ürün Ekle":
     # Filtreleme uygula
     display_products = df_products.copy()
     if search_term:
-        display_products = display_products[display_products['Urun_Adi'].str.contains(search_term, case=False, na=False)]
+        # Türkçe harf/aksan duyarsız indeks (veri sürümü başına bir kez kurulur)
+        urun_arama = search_index(data)
+        display_products = display_products[display_products['Urun_Adi'].isin(urun_arama.matching_texts(search_term, PRODUCT))]
+        if display_products.empty:
+            oneriler = [text for text, _, _ in urun_arama.search(search_term, PRODUCT, limit=5)]
+            if oneriler:
+                st.caption("🔎 Bunu mu demek istediniz: " + ", ".join(oneriler))
     if fab_filter != "Tümü":
         display_products = display_products[display_products['Fabrika'] == fab_filter]
     
@@ -1302,15 +974,14 @@ elif page == "Yeni Ürün Ekle":
                 st.write("")
                 if delete_fabrika == "Tümü":
                     if st.button("🗑️ TÜM FABRİKALARDAN SİL", type="secondary"):
-                        df_products = df_products[df_products['Urun_Adi'] != delete_urun]
-                        df_products.to_csv(PRODUCT_FILE, index=False)
+                        get_storage().update_products(lambda df: df[df['Urun_Adi'] != delete_urun])
                         st.success(f"✅ '{delete_urun}' tüm fabrikalardan silindi!")
                         st.balloons()
                         st.rerun()
                 else:
                     if st.button(f"🗑️ {delete_fabrika}'dan SİL", type="secondary"):
-                        df_products = df_products[~((df_products['Urun_Adi'] == delete_urun) & (df_products['Fabrika'] == delete_fabrika))]
-                        df_products.to_csv(PRODUCT_FILE, index=False)
+                        get_storage().update_products(
+                            lambda df: df[~((df['Urun_Adi'] == delete_urun) & (df['Fabrika'] == delete_fabrika))])
                         st.success(f"✅ '{delete_urun}' ({delete_fabrika}) silindi!")
                         st.balloons()
                         st.rerun()
@@ -1327,9 +998,15 @@ elif page == "Yeni Ürün Ekle":
                 st.write("")
                 st.write("")
                 if st.button(f"🗑️ {toplu_fabrika} FABRİKADAKİ TÜM ÜRÜNLERİ SİL", type="secondary"):
-                    etkilenen = len(df_products[df_products['Fabrika'] == toplu_fabrika])
-                    df_products = df_products[df_products['Fabrika'] != toplu_fabrika]
-                    df_products.to_csv(PRODUCT_FILE, index=False)
+                    silinen = []
+
+                    def fabrikayi_sil(df):
+                        mask = df['Fabrika'] == toplu_fabrika
+                        silinen.append(int(mask.sum()))
+                        return df[~mask]
+
+                    get_storage().update_products(fabrikayi_sil)
+                    etkilenen = silinen[-1]
                     st.success(f"✅ {toplu_fabrika} fabrikasından {etkilenen} kayıt silindi!")
                     st.rerun()
     
@@ -1353,49 +1030,13 @@ elif page == "Yeni Ürün Ekle":
         display_products_with_currencies['Giris_Para_Birimi'] = 'TL'
     if 'Giris_Fiyat' not in display_products_with_currencies.columns:
         display_products_with_currencies['Giris_Fiyat'] = display_products_with_currencies['NTS_Maliyet_TL']
-    if 'Kur_USD' not in display_products_with_currencies.columns:
-        display_products_with_currencies['Kur_USD'] = ''
-    if 'Kur_EUR' not in display_products_with_currencies.columns:
-        display_products_with_currencies['Kur_EUR'] = ''
-    if 'Kur_CHF' not in display_products_with_currencies.columns:
-        display_products_with_currencies['Kur_CHF'] = ''
     if 'Kur_Tarihi' not in display_products_with_currencies.columns:
         display_products_with_currencies['Kur_Tarihi'] = ''
     
-    # Döviz karşılıklarını hesapla - KAYDEDİLEN KURLARA GÖRE
-    # Eğer kayıtlı kur varsa onu kullan, yoksa güncel kuru kullan (eski kayıtlar için)
-    def calculate_currency(row):
-        tl_value = row['NTS_Maliyet_TL']
-        
-        # Kayıtlı kurları kontrol et
-        try:
-            saved_usd = float(row['Kur_USD']) if row['Kur_USD'] and str(row['Kur_USD']).strip() else None
-            saved_eur = float(row['Kur_EUR']) if row['Kur_EUR'] and str(row['Kur_EUR']).strip() else None
-            saved_chf = float(row['Kur_CHF']) if row['Kur_CHF'] and str(row['Kur_CHF']).strip() else None
-        except:
-            saved_usd = None
-            saved_eur = None
-            saved_chf = None
-        
-        # Güncel kurlar (fallback)
-        current_usd = kurlar.get('USD', 1)
-        current_eur = kurlar.get('EUR', 1)
-        current_chf = kurlar.get('CHF', 1)
-        
-        # Kurları seç (kayıtlı varsa onu, yoksa güncel)
-        use_usd = saved_usd if saved_usd else current_usd
-        use_eur = saved_eur if saved_eur else current_eur
-        use_chf = saved_chf if saved_chf else current_chf
-        
-        return pd.Series({
-            'USD/Kg': round(tl_value / use_usd, 4) if use_usd > 0 else 0,
-            'EUR/Kg': round(tl_value / use_eur, 4) if use_eur > 0 else 0,
-            'CHF/Kg': round(tl_value / use_chf, 4) if use_chf > 0 else 0
-        })
-    
-    # Döviz karşılıklarını hesapla
-    currency_cols = display_products_with_currencies.apply(calculate_currency, axis=1)
-    display_products_with_currencies[['USD/Kg', 'EUR/Kg', 'CHF/Kg']] = currency_cols
+    # Döviz karşılıkları - KAYDEDİLEN KURLARA GÖRE (kayıtlı kur yoksa güncel kur, eski kayıtlar için)
+    display_products_with_currencies = display_products_with_currencies.assign(
+        **currency_columns(display_products_with_currencies, kurlar)
+    )
     
     # Kolon sırasını düzenle
     display_products_with_currencies = display_products_with_currencies[[
@@ -1439,54 +1080,37 @@ elif page == "Yeni Ürün Ekle":
     col_save1, col_save2, col_save3 = st.columns([1, 1, 1])
     with col_save2:
         if st.button("💾 DEĞİŞİKLİKLERİ KAYDET", type="primary", use_container_width=True):
-            # Silinen satırları tespit et
-            original_indices = set(display_products_with_currencies['original_index'].tolist())
-            edited_indices = set(edited_df['original_index'].tolist())
-            deleted_indices = original_indices - edited_indices
+            # Değişiklik kümesi: silinen, eklenen ve güncellenen hücreler (original_index ile eşlenir)
+            edited_df = edited_df.assign(Kayit_Tarihi=pd.to_datetime(edited_df['Kayit_Tarihi'], errors='coerce'))
+            yeni_satir = edited_df['original_index'].isna()
+            if yeni_satir.any():
+                edited_df.loc[yeni_satir, 'Kayit_Tarihi'] = edited_df.loc[yeni_satir, 'Kayit_Tarihi'].fillna(pd.Timestamp(datetime.now().date()))
+                edited_df.loc[yeni_satir, 'Giris_Para_Birimi'] = edited_df.loc[yeni_satir, 'Giris_Para_Birimi'].fillna('TL')
+                edited_df.loc[yeni_satir, 'Giris_Fiyat'] = edited_df.loc[yeni_satir, 'Giris_Fiyat'].fillna(edited_df.loc[yeni_satir, 'NTS_Maliyet_TL'])
+                eksik = yeni_satir & edited_df[['Urun_Adi', 'Fabrika', 'NTS_Maliyet_TL']].isna().any(axis=1)
+                if eksik.any():
+                    st.warning(f"⚠️ Ürün adı, fabrika veya TL/Kg eksik {int(eksik.sum())} yeni satır atlandı.")
+                    edited_df = edited_df[~eksik]
             
-            # Silinen satırları ana dataframe'den çıkar
-            if deleted_indices:
-                df_products_filtered = df_products.drop(index=list(deleted_indices))
-                df_products_filtered.to_csv(PRODUCT_FILE, index=False)
-                st.success(f"✅ {len(deleted_indices)} satır silindi ve değişiklikler kaydedildi!")
-                st.balloons()
-                st.rerun()
+            degisiklikler = diff_frames(display_products_with_currencies, edited_df, 'original_index', PRODUCT_EDIT_COLUMNS)
+            if not degisiklikler:
+                st.info("ℹ️ Hiçbir değişiklik yapılmadı.")
             else:
-                # Düzenlenmiş verileri güncelle
-                degisiklik_sayisi = 0
-                for idx, row in edited_df.iterrows():
-                    orig_idx = row['original_index']
-                    if orig_idx in df_products.index:
-                        # Değişiklikleri kontrol et ve kaydet
-                        if df_products.loc[orig_idx, 'Urun_Adi'] != row['Urun_Adi']:
-                            df_products.loc[orig_idx, 'Urun_Adi'] = row['Urun_Adi']
-                            degisiklik_sayisi += 1
-                        if df_products.loc[orig_idx, 'Fabrika'] != row['Fabrika']:
-                            df_products.loc[orig_idx, 'Fabrika'] = row['Fabrika']
-                            degisiklik_sayisi += 1
-                        if df_products.loc[orig_idx, 'NTS_Maliyet_TL'] != row['NTS_Maliyet_TL']:
-                            df_products.loc[orig_idx, 'NTS_Maliyet_TL'] = row['NTS_Maliyet_TL']
-                            degisiklik_sayisi += 1
-                        if df_products.loc[orig_idx, 'Giris_Para_Birimi'] != row['Giris_Para_Birimi']:
-                            df_products.loc[orig_idx, 'Giris_Para_Birimi'] = row['Giris_Para_Birimi']
-                            degisiklik_sayisi += 1
-                        if df_products.loc[orig_idx, 'Giris_Fiyat'] != row['Giris_Fiyat']:
-                            df_products.loc[orig_idx, 'Giris_Fiyat'] = row['Giris_Fiyat']
-                            degisiklik_sayisi += 1
-                        
-                        # Tarihi düzgün formatta kaydet
-                        if pd.notna(row['Kayit_Tarihi']):
-                            if isinstance(row['Kayit_Tarihi'], str):
-                                tarih_str = row['Kayit_Tarihi']
-                            else:
-                                tarih_str = row['Kayit_Tarihi'].strftime('%d.%m.%Y')
-                            df_products.loc[orig_idx, 'Kayit_Tarihi'] = tarih_str
-                
-                df_products.to_csv(PRODUCT_FILE, index=False)
-                if degisiklik_sayisi > 0:
-                    st.success(f"✅ {degisiklik_sayisi} değişiklik kaydedildi!")
-                else:
-                    st.info("ℹ️ Hiçbir değişiklik yapılmadı.")
+                # Silme, düzenleme ve eklemeler dosyanın güncel hâline tek yazmada uygulanır;
+                # düzenleyici açıkken değişen satırlar varsa kayıt reddedilir
+                try:
+                    get_storage().update_products(lambda df: apply_checked(prepare_products(df), degisiklikler))
+                except ChangeConflict as e:
+                    st.error(f"❌ Kaydedilmedi: {e}. Sayfayı yenileyip değişiklikleri tekrar yapın.")
+                    st.stop()
+                record_changes(degisiklikler, display_products_with_currencies, st.session_state.username)
+                sayilar = degisiklikler.counts()
+                st.success(
+                    f"✅ Kaydedildi: {sayilar['deleted']} satır silindi, "
+                    f"{sayilar['updated_rows']} satırda {sayilar['updated_cells']} değişiklik, {sayilar['inserted']} yeni satır."
+                )
+                if sayilar['deleted']:
+                    st.balloons()
                 st.rerun()
     
     st.info("💡 **İpucu:** Tabloda istediğiniz hücreyi tıklayarak düzenleyebilirsiniz. Satır silmek için soldaki ❌ butonuna tıklayın. Tüm değişiklikler için 'Değişiklikleri Kaydet' butonuna basın.")
@@ -1498,11 +1122,7 @@ elif page == "📈 Ürün Fiyat Artışı":
     st.header("📈 Ürün Fiyat Artışı")
 
     def latest_price_info(urun, fabrika):
-        subset = df_products[(df_products['Urun_Adi'] == urun) & (df_products['Fabrika'] == fabrika)]
-        if subset.empty:
-            return None, None
-        latest = subset.sort_values('Kayit_Tarihi', ascending=False).iloc[0]
-        return latest['NTS_Maliyet_TL'], latest['Kayit_Tarihi']
+        return urun_index.latest(urun, fabrika)
 
     st.markdown("### 🎯 A) Belirli Ürüne Artış")
     col_a1, col_a2, col_a3 = st.columns(3)
@@ -1532,7 +1152,7 @@ elif page == "📈 Ürün Fiyat Artışı":
     b_oran = st.number_input("Toplu Artış (%)", min_value=-100.0, max_value=1000.0, value=0.0, step=1.0, key="b_oran")
     b_onay = st.checkbox("Tüm ürünlerde son fiyatları güncellemeyi onaylıyorum", key="b_onay")
 
-    latest_all = df_products.sort_values('Kayit_Tarihi').groupby(['Urun_Adi', 'Fabrika'], as_index=False).tail(1)
+    latest_all = urun_index.latest_rows()
     etkilenecek = len(latest_all)
     ort_fiyat = latest_all['NTS_Maliyet_TL'].mean() if not latest_all.empty else 0
     yeni_ort = ort_fiyat * (1 + b_oran / 100)
@@ -1547,10 +1167,8 @@ elif page == "📈 Ürün Fiyat Artışı":
         elif not b_onay:
             st.error("Onay kutusunu işaretleyin.")
         else:
-            for _, row in latest_all.iterrows():
-                yeni_fiyat = row['NTS_Maliyet_TL'] * (1 + b_oran / 100)
-                save_new_product(row['Urun_Adi'], row['Fabrika'], yeni_fiyat, datetime.now())
-            st.success(f"✅ {etkilenecek} kayıt güncellendi. %{b_oran} uygulandı.")
+            ozet = bulk_reprice(latest_all, b_oran)
+            st.success(f"✅ {ozet['count']} kayıt güncellendi. %{b_oran} uygulandı. ({ozet['seconds']:.2f} sn)")
             st.balloons()
             st.rerun()
 
@@ -1573,10 +1191,8 @@ elif page == "📈 Ürün Fiyat Artışı":
         elif not c_onay:
             st.error("Onay kutusunu işaretleyin.")
         else:
-            for _, row in factory_latest.iterrows():
-                yeni_fiyat = row['NTS_Maliyet_TL'] * (1 + c_oran / 100)
-                save_new_product(row['Urun_Adi'], row['Fabrika'], yeni_fiyat, datetime.now())
-            st.success(f"✅ {c_fabrika} fabrikasında {len(factory_latest)} kayıt güncellendi. %{c_oran} uygulandı.")
+            ozet = bulk_reprice(factory_latest, c_oran)
+            st.success(f"✅ {c_fabrika} fabrikasında {ozet['count']} kayıt güncellendi. %{c_oran} uygulandı. ({ozet['seconds']:.2f} sn)")
             st.balloons()
             st.rerun()
 
@@ -1597,9 +1213,9 @@ elif page == "Lojistik Fiyat Güncelleme":
             st.write("")
             if st.button("🚀 Tüm Fiyatlara Uygula", type="primary"):
                 if zam_orani != 0:
-                    df_shipping['Fiyat_TL_KG'] = df_shipping['Fiyat_TL_KG'] * (1 + zam_orani / 100)
-                    df_shipping['Fiyat_TL_KG'] = df_shipping['Fiyat_TL_KG'].round(2)
-                    df_shipping.to_csv(SHIPPING_FILE, index=False)
+                    # Zam dosyanın güncel hâline uygulanır (aradaki başka yazmalar korunur)
+                    get_storage().update_shipping(
+                        lambda df: df.assign(Fiyat_TL_KG=(df['Fiyat_TL_KG'] * (1 + zam_orani / 100)).round(2)))
                     st.success(f"✅ Tüm fiyatlara %{zam_orani} zam uygulandı!")
                     st.rerun()
                 else:
@@ -1608,36 +1224,40 @@ elif page == "Lojistik Fiyat Güncelleme":
     st.markdown("---")
     st.subheader("📝 Nakliye Fiyat Listesi")
     
+    # satir_no: güncel dosyadaki satır konumu; kayıt yalnızca değişiklik kümesini uygular
+    nakliye_tablosu = df_shipping.reset_index(drop=True).rename_axis('satir_no').reset_index()
     edited_df = st.data_editor(
-        df_shipping,
+        nakliye_tablosu,
         num_rows="dynamic",
         use_container_width=True,
+        hide_index=True,
+        disabled=['satir_no'],
         column_config={
+            "satir_no": None,  # Gizle
             "Fiyat_TL_KG": st.column_config.NumberColumn("Fiyat (TL/Kg)", format="%.2f TL")
         }
     )
     
     if st.button("💾 Değişiklikleri Kaydet"):
-        edited_df.to_csv(SHIPPING_FILE, index=False)
+        nakliye_degisiklik = diff_frames(nakliye_tablosu, edited_df, 'satir_no', SHIPPING_COLUMNS)
+        try:
+            get_storage().update_shipping(lambda df: apply_checked(df, nakliye_degisiklik))
+        except ChangeConflict as e:
+            st.error(f"❌ Kaydedilmedi: {e}. Sayfayı yenileyip değişiklikleri tekrar yapın.")
+            st.stop()
         st.success("✅ Nakliye veritabanı güncellendi!")
         st.rerun()
 
 elif page == "� Bayi Müşteri Yönetimi":
     st.header("👥 Bayi Müşteri Yönetimi")
     
-    # Bayi müşteri dosyası
-    BAYI_MUSTERI_FILE = "bayi_musterileri.json"
-    
     # Bayi müşteri verilerini yükle
     def load_bayi_musteriler():
-        if os.path.exists(BAYI_MUSTERI_FILE):
-            with open(BAYI_MUSTERI_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {}
+        return get_storage().read_json('bayi_musterileri')
     
     def save_bayi_musteriler(data):
-        with open(BAYI_MUSTERI_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        # Yalnızca bu bayinin listesi yazılır; diğer bayilerin eşzamanlı kayıtları korunur
+        get_storage().put_json_item('bayi_musterileri', current_user, data[current_user])
     
     bayi_musteriler = load_bayi_musteriler()
     current_user = st.session_state.username
@@ -1698,10 +1318,13 @@ elif page == "� Bayi Müşteri Yönetimi":
             filtered_musteriler = [m for m in filtered_musteriler if search_musteri.lower() in m['adi'].lower()]
         
         if filtered_musteriler:
-            # DataFrame formatında göster
-            musteri_df = pd.DataFrame(filtered_musteriler)
-            musteri_df = musteri_df[['adi', 'telefon', 'kayit_tarihi', 'toplam_hesaplama']]
-            musteri_df.columns = ['Müşteri Adı', 'Telefon', 'Kayıt Tarihi', 'Toplam Hesaplama']
+            # DataFrame formatında göster (hesaplama istatistikleri özet tablolarından)
+            musteri_df = pd.DataFrame(filtered_musteriler)[['adi', 'telefon', 'kayit_tarihi']]
+            ozetler = [rollups.get('kullanici_bayi_musteri', (current_user, m['adi'])) for m in filtered_musteriler]
+            musteri_df['toplam_hesaplama'] = [o['count'] for o in ozetler]
+            musteri_df['ort_kar_marji'] = [o['avg_margin'] for o in ozetler]
+            musteri_df['ort_satis_tl_kg'] = [o['avg_sale_tl_kg'] for o in ozetler]
+            musteri_df.columns = ['Müşteri Adı', 'Telefon', 'Kayıt Tarihi', 'Toplam Hesaplama', 'Ort. Kâr Marjı (%)', 'Ort. Satış (TL/kg)']
             
             st.dataframe(musteri_df, use_container_width=True, hide_index=True, height=400)
             
@@ -1737,11 +1360,14 @@ elif page == "� Bayi Müşteri Yönetimi":
     st.markdown("---")
     st.subheader("📊 İstatistikler")
     
-    col_stat1, col_stat2, col_stat3 = st.columns(3)
+    col_stat1, col_stat2, col_stat3, col_stat4 = st.columns(4)
     with col_stat1:
         st.metric("👥 Toplam Müşteri", len(bayi_musteriler[current_user]))
     with col_stat2:
-        toplam_hesap = sum(m.get('toplam_hesaplama', 0) for m in bayi_musteriler[current_user])
+        toplam_hesap = sum(
+            rollups.get('kullanici_bayi_musteri', (current_user, m['adi']))['count']
+            for m in bayi_musteriler[current_user]
+        )
         st.metric("📊 Toplam Hesaplama", toplam_hesap)
     with col_stat3:
         if bayi_musteriler[current_user]:
@@ -1749,46 +1375,50 @@ elif page == "� Bayi Müşteri Yönetimi":
             st.metric("📈 Ortalama Hesaplama", f"{ort_hesap:.1f}")
         else:
             st.metric("📈 Ortalama Hesaplama", "0")
+    with col_stat4:
+        kullanici_ozet = rollups.get('username', current_user)
+        ort_marj = kullanici_ozet['avg_margin']
+        st.metric("💹 Ortalama Kâr Marjı", f"%{ort_marj:.1f}" if ort_marj is not None else "-")
 
 elif page == "�📜 Hesaplama Geçmişi":
     st.header("📜 Hesaplama Geçmişi")
-    ensure_calc_history_file()
-    df_hist = pd.read_csv(CALC_HISTORY_FILE)
-    if df_hist.empty:
+    secenekler = history_filter_options(get_storage().signature(['history']))
+    if not any(secenekler.values()):
         st.info("Henüz kayıt yok.")
     else:
-        df_hist['timestamp'] = pd.to_datetime(df_hist['timestamp'])
-        df_hist = df_hist.sort_values('timestamp', ascending=False)
-
         col_f1, col_f2, col_f3 = st.columns(3)
         with col_f1:
-            f_musteri = st.selectbox("Müşteri (Bayi)", [''] + sorted(df_hist['musteri'].dropna().unique().tolist()))
+            f_musteri = st.selectbox("Müşteri (Bayi)", [''] + secenekler['musteri'])
         with col_f2:
-            f_bayi_musteri = st.selectbox("Bayi Müşteri", [''] + sorted(df_hist['bayi_musteri'].dropna().unique().tolist()) if 'bayi_musteri' in df_hist.columns else [''])
+            f_bayi_musteri = st.selectbox("Bayi Müşteri", [''] + secenekler['bayi_musteri'])
         with col_f3:
-            f_urun = st.selectbox("Ürün", [''] + sorted(df_hist['urun'].dropna().unique().tolist()))
+            f_urun = st.selectbox("Ürün", [''] + secenekler['urun'])
         
         col_f4, col_f5, col_f6 = st.columns(3)
         with col_f4:
-            f_user = st.selectbox("Kullanıcı", [''] + sorted(df_hist['username'].dropna().unique().tolist()))
+            f_user = st.selectbox("Kullanıcı", [''] + secenekler['username'])
         with col_f5:
-            st.write("")
+            f_baslangic = st.date_input("Başlangıç Tarihi", value=None, format="DD.MM.YYYY")
         with col_f6:
-            st.write("")
+            f_bitis = st.date_input("Bitiş Tarihi", value=None, format="DD.MM.YYYY")
 
-        if f_musteri:
-            df_hist = df_hist[df_hist['musteri'] == f_musteri]
-        if f_bayi_musteri and 'bayi_musteri' in df_hist.columns:
-            df_hist = df_hist[df_hist['bayi_musteri'] == f_bayi_musteri]
-        if f_urun:
-            df_hist = df_hist[df_hist['urun'] == f_urun]
-        if f_user:
-            df_hist = df_hist[df_hist['username'] == f_user]
+        # Geçmiş parça parça okunur; yalnızca filtreye uyan satırlar belleğe alınır
+        filtre = HistoryFilter(
+            musteri=f_musteri or None, bayi_musteri=f_bayi_musteri or None,
+            urun=f_urun or None, username=f_user or None,
+            start=f_baslangic, end=f_bitis,
+        )
+        df_hist = collect(iter_filtered(filtre))
+        df_hist['timestamp'] = pd.to_datetime(df_hist['timestamp'])
+        df_hist = df_hist.sort_values('timestamp', ascending=False)
 
         st.metric("Kayıt Sayısı", len(df_hist))
 
-        csv_data = df_hist.to_csv(index=False).encode('utf-8')
-        st.download_button("⬇️ CSV Olarak İndir", csv_data, "hesaplama_gecmisi.csv", mime="text/csv")
+        col_d1, col_d2 = st.columns(2)
+        with col_d1:
+            st.download_button("⬇️ CSV Olarak İndir", export_bytes([df_hist], 'csv'), "hesaplama_gecmisi.csv", mime="text/csv")
+        with col_d2:
+            st.download_button("⬇️ Excel Olarak İndir", export_bytes([df_hist], 'xlsx'), "hesaplama_gecmisi.xlsx", mime=XLSX_MIME)
 
         st.markdown("---")
         st.markdown("##### 📊 Hesaplama Kayıtları (Satırları silebilirsiniz)")
@@ -1816,19 +1446,20 @@ elif page == "�📜 Hesaplama Geçmişi":
         col_save1, col_save2, col_save3 = st.columns([1, 1, 1])
         with col_save2:
             if st.button("💾 SİLİNEN SATIRLARI KALDIR", type="primary", use_container_width=True):
-                # Tüm geçmişi oku
-                df_all_hist = pd.read_csv(CALC_HISTORY_FILE)
-                
                 # Silinen satırları tespit et
-                original_indices = set(df_hist_display['original_index'].tolist())
-                edited_indices = set(edited_hist['original_index'].tolist())
-                deleted_indices = original_indices - edited_indices
+                deleted_rows = df_hist_display[~df_hist_display['original_index'].isin(edited_hist['original_index'])]
                 
-                if deleted_indices:
-                    # Silinen satırları çıkar
-                    df_all_hist = df_all_hist.drop(index=list(deleted_indices))
-                    df_all_hist.to_csv(CALC_HISTORY_FILE, index=False)
-                    st.success(f"✅ {len(deleted_indices)} kayıt silindi!")
+                if not deleted_rows.empty:
+                    # Silme geçmişin güncel hâline, kayıt anahtarlarıyla uygulanır (aradaki eklemeler korunur)
+                    silinen = []
+
+                    def kayitlari_sil(df):
+                        kalan, adet = drop_history_records(df, deleted_rows)
+                        silinen.append(adet)
+                        return kalan
+
+                    get_storage().update_history(kayitlari_sil)
+                    st.success(f"✅ {silinen[-1]} kayıt silindi!")
                     st.balloons()
                     st.rerun()
                 else:
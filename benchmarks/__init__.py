@@ -0,0 +1 @@
+"""Fiyatlandırma benchmark paketi (veri üreteci + ölçüm koşucusu)."""
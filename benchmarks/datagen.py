@@ -0,0 +1,196 @@
+"""
+Benchmark'lar için tohumlu (seeded) sentetik veri üreteci.
+
+Mevcut dosya şemalarında (urun_fiyat_db.csv, lokasyonlar.csv,
+exchange_rates.json, hesaplama_gecmisi.csv) üretim ölçeğinde veri yazar.
+Aynı tohum ve parametreler her zaman aynı dosyaları üretir.
+
+    python -m benchmarks.datagen --out benchmarks/data/medium --price-rows 100000
+"""
+import argparse
+import json
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from nts_core.storage import CALC_COLUMNS, HISTORY_COLUMNS, PRODUCT_DATE_FORMAT
+
+SCALES = {
+    'small': {'price_rows': 10_000, 'cities': 120, 'history_rows': 10_000},
+    'medium': {'price_rows': 100_000, 'cities': 200, 'history_rows': 100_000},
+    'large': {'price_rows': 1_000_000, 'cities': 400, 'history_rows': 1_000_000},
+}
+
+PROVINCES = [
+    'ADANA', 'ADIYAMAN', 'AFYON', 'AGRI', 'AKSARAY', 'AMASYA', 'ANKARA', 'ANTALYA', 'ARDAHAN', 'ARTVIN',
+    'AYDIN', 'BALIKESİR', 'BARTIN', 'BATMAN', 'BAYBURT', 'BİLECİK', 'BİNGÖL', 'BİTLİS', 'BOLU', 'BURDUR',
+    'BURSA', 'ÇANAKKALE', 'ÇANKIRI', 'ÇORUM', 'DENİZLİ', 'DİYARBAKIR', 'DÜZCE', 'EDİRNE', 'ELAZIĞ', 'ERZİNCAN',
+    'ERZURUM', 'ESKİŞEHİR', 'GAZİANTEP', 'GİRESUN', 'GÜMÜŞHANE', 'HAKKARİ', 'HATAY', 'IĞDIR', 'ISPARTA',
+    'İSTANBUL ANADOLU', 'İSTANBUL AVRUPA', 'İZMİR', 'KAHRAMANMARAŞ', 'KARABÜK', 'KARAMAN', 'KARS', 'KASTAMONU',
+    'KAYSERİ', 'KIRIKKALE', 'KIRŞEHİR', 'KİLİS', 'KOCAELI', 'KONYA', 'KÜTAHYA', 'MALATYA', 'MANİSA', 'MARDİN',
+    'MERSİN', 'MUĞLA', 'MUŞ', 'NEVŞEHİR', 'NİĞDE', 'ORDU', 'OSMANİYE', 'RİZE', 'SAKARYA', 'SAMSUN', 'SİİRT',
+    'SİNOP', 'SİVAS', 'ŞANLIURFA', 'ŞIRNAK', 'TEKİRDAĞ', 'TOKAT', 'TRABZON', 'TUNCELİ', 'UŞAK', 'VAN', 'YALOVA',
+    'YOZGAT', 'ZONGULDAK',
+]
+PRODUCT_FAMILIES = [
+    'Sika Viscocrete', 'SikaRapid', 'Sikament', 'Sika Plastiment', 'SikaFume', 'Sika Retarder',
+    'Sika Stabilizer', 'SikaControl', 'Sika ViscoFlow', 'Sikalastic', 'Sikadur', 'SikaGrout',
+]
+PACKAGES = ['', ' Dökme', ' IBC', ' 25 KG', ' Varil']
+FACTORIES = ['TR14', 'TR15', 'TR16']
+CARRIERS = ['CALISKAN', 'BAYKAN', 'ASLAN', 'OZTURK', 'KARDESLER', 'YILDIZ', 'ANADOLU', 'EGE']
+VEHICLES = ['TIR', 'KIRKAYAK', 'KAMYON']
+
+
+def city_names(count):
+    """81 il + gerekirse ilçe/şantiye varyasyonları ile `count` benzersiz şehir adı"""
+    names = list(PROVINCES)
+    i = 0
+    while len(names) < count:
+        names.append(f"{PROVINCES[i % len(PROVINCES)]} - BÖLGE {i // len(PROVINCES) + 1}")
+        i += 1
+    return names[:count]
+
+
+def product_names(count, rng):
+    codes = rng.choice(np.arange(100, 9999), size=count, replace=False)
+    return [
+        f"{PRODUCT_FAMILIES[i % len(PRODUCT_FAMILIES)]} {code}{PACKAGES[i % len(PACKAGES)]}"
+        for i, code in enumerate(codes)
+    ]
+
+
+def generate_products(rng, price_rows, factories=FACTORIES, history_per_key=8, start=date(2023, 1, 2)):
+    """Her (ürün, fabrika) için ortalama `history_per_key` tarihli fiyat kaydı"""
+    keys = max(1, price_rows // history_per_key)
+    n_products = max(1, keys // len(factories))
+    names = np.array(product_names(n_products, rng), dtype=object)
+
+    product = rng.integers(0, n_products, size=price_rows)
+    factory = rng.integers(0, len(factories), size=price_rows)
+    base = rng.uniform(8, 60, size=n_products)
+    factory_factor = np.array([1.0, 1.04, 0.97])[: len(factories)]
+    days = rng.integers(0, 700, size=price_rows)
+    drift = 1 + days / 700 * rng.uniform(0.05, 0.35, size=price_rows)
+    prices = np.round(base[product] * factory_factor[factory % len(factory_factor)] * drift, 4)
+
+    dates = pd.to_datetime(start) + pd.to_timedelta(days, unit='D')
+    currency = rng.choice(['TL', 'USD', 'EUR'], size=price_rows, p=[0.7, 0.2, 0.1])
+    usd = np.round(28 + days * 0.012, 4)
+    eur = np.round(usd * 1.08, 4)
+    chf = np.round(usd * 1.13, 4)
+    giris = np.where(currency == 'USD', prices / usd, np.where(currency == 'EUR', prices / eur, prices))
+
+    df = pd.DataFrame({
+        'Urun_Adi': names[product],
+        'Fabrika': np.array(factories, dtype=object)[factory],
+        'NTS_Maliyet_TL': prices,
+        'Kayit_Tarihi': dates.strftime(PRODUCT_DATE_FORMAT),
+        'Giris_Para_Birimi': currency,
+        'Giris_Fiyat': np.round(giris, 4),
+        'Kur_USD': usd,
+        'Kur_EUR': eur,
+        'Kur_CHF': chf,
+        'Kur_Tarihi': dates.strftime('%Y-%m-%d'),
+    })
+    # Eski kayıtlarda kur bilgisi yok (mevcut dosyalardaki gibi)
+    legacy = rng.random(price_rows) < 0.15
+    df.loc[legacy, ['Giris_Para_Birimi', 'Giris_Fiyat', 'Kur_USD', 'Kur_EUR', 'Kur_CHF', 'Kur_Tarihi']] = None
+    return df
+
+
+def generate_shipping(rng, cities, factories=FACTORIES, carriers=CARRIERS, vehicles=VEHICLES):
+    """Her şehir × fabrika için 1-3 firma, her firma için 1-2 araç tipi"""
+    rows = []
+    distance = {fabrika: rng.uniform(0.6, 4.8, size=len(cities)) for fabrika in factories}
+    for c, sehir in enumerate(cities):
+        for fabrika in factories:
+            if rng.random() < 0.1:  # Bazı şehirlere bazı fabrikalardan hat yok
+                continue
+            for firma in rng.choice(carriers, size=rng.integers(1, 4), replace=False):
+                for arac in rng.choice(vehicles, size=rng.integers(1, 3), replace=False):
+                    fiyat = distance[fabrika][c] * (1.08 if arac == 'KIRKAYAK' else 1.0) * rng.uniform(0.92, 1.1)
+                    rows.append((sehir, firma, fabrika, arac, round(float(fiyat), 3)))
+    return pd.DataFrame(rows, columns=['Sehir', 'Firma', 'Fabrika', 'Arac_Tipi', 'Fiyat_TL_KG'])
+
+
+def generate_history(rng, history_rows, products, shipping):
+    if history_rows <= 0:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+    urun = rng.choice(products['Urun_Adi'].unique(), size=history_rows)
+    lane = shipping.iloc[rng.integers(0, len(shipping), size=history_rows)].reset_index(drop=True)
+    nts = rng.uniform(8, 60, size=history_rows)
+    nakliye = lane['Fiyat_TL_KG'].to_numpy()
+    marj = rng.choice([10.0, 12.5, 15.0, 20.0], size=history_rows)
+    satis = (nts + nakliye) * (1 + marj / 100)
+    usd, eur, chf = 34.25, 37.57, 40.04
+    stamps = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 600 * 86400, size=history_rows), unit='s')
+    df = pd.DataFrame({
+        'timestamp': stamps.strftime('%Y-%m-%d %H:%M:%S'),
+        'username': rng.choice(['goksel', 'bayi1', 'bayi2', 'satis'], size=history_rows),
+        'musteri': rng.choice([f'Müşteri {i}' for i in range(300)], size=history_rows),
+        'urun': urun,
+        'sehir': lane['Sehir'], 'fabrika': lane['Fabrika'], 'firma': lane['Firma'], 'arac': lane['Arac_Tipi'],
+        'kar_marji': marj,
+        'nts_tl': np.round(nts, 4), 'nakliye_tl': nakliye, 'toplam_maliyet_tl': np.round(nts + nakliye, 4),
+        'satis_tl_kg': np.round(satis, 4), 'satis_usd_kg': np.round(satis / usd, 4),
+        'satis_eur_kg': np.round(satis / eur, 4), 'satis_chf_kg': np.round(satis / chf, 4),
+        'satis_tl_ton': np.round(satis * 1000, 2), 'satis_usd_ton': np.round(satis / usd * 1000, 2),
+        'satis_eur_ton': np.round(satis / eur * 1000, 2), 'satis_chf_ton': np.round(satis / chf * 1000, 2),
+        'usd_kur': usd, 'eur_kur': eur, 'chf_kur': chf,
+        'kur_tarihi': '2024-10-07', 'urun_kayit_tarihi': '07.10.2024',
+        'bayi_musteri': rng.choice(['', 'XYZ Yapı', 'DEF Proje'], size=history_rows),
+    })
+    return df[CALC_COLUMNS + ['bayi_musteri']]
+
+
+def generate(out_dir, price_rows=10_000, cities=120, history_rows=10_000, seed=42):
+    """Veri setini `out_dir` klasörüne yaz; üretim parametrelerini döndür"""
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    products = generate_products(rng, price_rows)
+    shipping = generate_shipping(rng, city_names(cities))
+    history = generate_history(rng, history_rows, products, shipping)
+
+    products.to_csv(os.path.join(out_dir, 'urun_fiyat_db.csv'), index=False)
+    shipping.to_csv(os.path.join(out_dir, 'lokasyonlar.csv'), index=False)
+    history.to_csv(os.path.join(out_dir, 'hesaplama_gecmisi.csv'), index=False)
+    rates = {'TL': 1.0, 'USD': 34.2497, 'EUR': 37.5673, 'CHF': 40.0389,
+             'date': '2024-10-07 10:00:00', 'source_date': '2024-10-07'}
+    with open(os.path.join(out_dir, 'exchange_rates.json'), 'w', encoding='utf-8') as f:
+        json.dump(rates, f, ensure_ascii=False, indent=2)
+
+    params = {
+        'seed': seed, 'price_rows': len(products), 'products': int(products['Urun_Adi'].nunique()),
+        'cities': int(shipping['Sehir'].nunique()), 'shipping_rows': len(shipping), 'history_rows': len(history),
+    }
+    with open(os.path.join(out_dir, 'dataset.json'), 'w', encoding='utf-8') as f:
+        json.dump(params, f, ensure_ascii=False, indent=2)
+    return params
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark veri üreteci')
+    parser.add_argument('--out', required=True)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--price-rows', type=int, default=None)
+    parser.add_argument('--cities', type=int, default=None)
+    parser.add_argument('--history-rows', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    preset = SCALES[args.scale]
+    params = generate(
+        args.out,
+        price_rows=args.price_rows or preset['price_rows'],
+        cities=args.cities or preset['cities'],
+        history_rows=preset['history_rows'] if args.history_rows is None else args.history_rows,
+        seed=args.seed,
+    )
+    print(json.dumps(params, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+"""
+Fiyatlandırma benchmark'ları.
+
+Her senaryo ısınma turlarından sonra `--iterations` kez ölçülür; p50/p95/p99
+gecikme, saniyedeki işlem sayısı ve sürecin o ana kadarki en yüksek RSS'i
+raporlanır. Sonuçlar JSON olarak kaydedilir; `--baseline` verilirse p50 veya
+p95'i eşikten fazla kötüleşen senaryolar işaretlenir.
+
+    python -m benchmarks.run --scale small
+    python -m benchmarks.run --scale medium --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --scale medium --baseline benchmarks/baseline.json --fail-on-regression
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from nts_core.price_index import ProductPriceIndex
+
+from . import datagen
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+
+def peak_rss_mb():
+    """Sürecin en yüksek RSS değeri (MB); ölçülemiyorsa None"""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return round(getattr(info, 'peak_wset', info.rss) / 1024 / 1024, 1)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux KB, macOS bayt döndürür
+    return round(peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def measure(fn, iterations, warmup=2, items=1):
+    """fn'i ölç; gecikme yüzdelikleri (ms), throughput ve peak RSS döndür"""
+    for _ in range(warmup):
+        fn()
+    timings = np.empty(iterations)
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter_ns()
+        fn()
+        timings[i] = (time.perf_counter_ns() - t0) / 1e6
+    total = time.perf_counter() - started
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+    result = {
+        'iterations': iterations,
+        'p50_ms': round(float(p50), 4),
+        'p95_ms': round(float(p95), 4),
+        'p99_ms': round(float(p99), 4),
+        'mean_ms': round(float(timings.mean()), 4),
+        'ops_per_s': round(iterations / total, 2) if total else None,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    if items > 1:
+        result['items_per_op'] = items
+        result['items_per_s'] = round(iterations * items / total, 1) if total else None
+    return result
+
+
+class Cases:
+    """Senaryolar; veri klasörüne chdir edildikten sonra kurulur"""
+
+    def __init__(self, rng, iterations, batch_size):
+        import api_server
+
+        self.rng = rng
+        self.iterations = iterations
+        self.batch_size = batch_size
+        self.api = api_server
+        self.client = api_server.app.test_client()
+        self.products = api_server.load_products()
+        self.shipping = api_server.load_shipping()
+        self.rates = api_server.load_exchange_rates()
+        self.index = ProductPriceIndex(self.products)
+        self.product_names = self.products['Urun_Adi'].unique()
+        self.city_names = self.shipping['Sehir'].unique()
+        self.lanes = self.shipping[['Sehir', 'Fabrika', 'Firma', 'Arac_Tipi']].to_dict('records')
+        self.scratch = tempfile.mkdtemp(prefix='nts-bench-')
+
+    def pick_product(self):
+        return self.product_names[self.rng.integers(len(self.product_names))]
+
+    def pick_city(self):
+        return self.city_names[self.rng.integers(len(self.city_names))]
+
+    def all(self):
+        n = self.iterations
+        heavy = max(3, n // 10)
+        return [
+            ('load_products', self.load_products, heavy, 1),
+            ('load_shipping', self.load_shipping, n, 1),
+            ('price_index_build', lambda: ProductPriceIndex(self.products), heavy, 1),
+            ('find_cheapest_route', self.find_cheapest_route, n, 1),
+            ('append_calc_record', self.append_calc_record, n, 1),
+            ('bulk_reprice', self.bulk_reprice, max(3, n // 20), len(self.index.keys())),
+            ('api_products', lambda: self.get('/api/products'), heavy, 1),
+            ('api_cities', lambda: self.get('/api/cities'), n, 1),
+            ('api_shipping', lambda: self.get(f'/api/shipping?city={self.pick_city()}'), n, 1),
+            ('api_rates', lambda: self.get('/api/rates'), n, 1),
+            ('api_calculate_auto', self.api_calculate_auto, n, 1),
+            ('api_calculate_manual', self.api_calculate_manual, n, 1),
+            ('api_calculate_batch', self.api_calculate_batch, max(3, n // 10), self.batch_size),
+            ('api_matrix_product', lambda: self.get(f'/api/matrix/product?product={self.pick_product()}&factories=1'), n, 1),
+            ('api_matrix_city', lambda: self.get(f'/api/matrix/city?city={self.pick_city()}'), heavy, 1),
+            ('api_rates_backfill', self.api_rates_backfill, max(3, n // 20), 1),
+            ('api_health', lambda: self.get('/health'), n, 1),
+            ('api_metrics', lambda: self.get('/metrics'), n, 1),
+        ]
+
+    def close(self):
+        shutil.rmtree(self.scratch, ignore_errors=True)
+
+    # --- Çekirdek ---
+    def load_products(self):
+        self.api.load_products()
+
+    def load_shipping(self):
+        self.api.load_shipping()
+
+    def find_cheapest_route(self):
+        from nts_core.quote import find_cheapest_route
+        find_cheapest_route(self.index, self.shipping, self.pick_product(), self.pick_city(), 15.0, self.rates)
+
+    def append_calc_record(self):
+        from nts_core.storage import CsvStorage
+        if not hasattr(self, '_history_storage'):
+            shutil.copy('hesaplama_gecmisi.csv', self.scratch)
+            self._history_storage = CsvStorage(self.scratch)
+        record = {
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'username': 'bench',
+            'musteri': 'Benchmark', 'urun': self.pick_product(), 'sehir': self.pick_city(),
+            'kar_marji': 15.0, 'nts_tl': 20.0, 'nakliye_tl': 1.0, 'satis_tl_kg': 24.15, 'bayi_musteri': '',
+        }
+        self._history_storage.append_history(record)
+
+    def bulk_reprice(self):
+        from nts_core.repricing import bulk_reprice
+        from nts_core.storage import CsvStorage
+        # Her tur aynı başlangıç dosyasından başlar; aksi halde dosya her turda büyür
+        shutil.copy('urun_fiyat_db.csv', self.scratch)
+        bulk_reprice(self.index.latest_rows(), 5.0, storage=CsvStorage(self.scratch))
+
+    # --- API ---
+    def get(self, url):
+        response = self.client.get(url)
+        assert response.status_code < 500, (url, response.status_code)
+
+    def post(self, url, body):
+        response = self.client.post(url, json=body)
+        assert response.status_code < 500, (url, response.status_code)
+
+    def api_calculate_auto(self):
+        self.post('/api/calculate', {'product': self.pick_product(), 'city': self.pick_city(), 'profit_margin': 15.0})
+
+    def api_calculate_manual(self):
+        lane = self.lanes[self.rng.integers(len(self.lanes))]
+        self.post('/api/calculate', {
+            'product': self.pick_product(), 'city': lane['Sehir'], 'profit_margin': 15.0,
+            'factory': lane['Fabrika'], 'shipping_company': lane['Firma'], 'vehicle_type': lane['Arac_Tipi'],
+        })
+
+    def api_calculate_batch(self):
+        items = [
+            {'product': self.pick_product(), 'city': self.pick_city(), 'profit_margin': 15.0}
+            for _ in range(self.batch_size)
+        ]
+        self.post('/api/calculate/batch', {'items': items})
+
+    def api_rates_backfill(self):
+        # NTS_TCMB_URL yerel fixture sunucusunu gösterir; force=True her turda ağ yolunu ölçer
+        self.post('/api/rates/backfill', {'start': '2024-01-01', 'end': '2024-01-31', 'force': True})
+
+
+def compare(results, baseline, threshold):
+    """Baseline'a göre p50/p95'i `threshold` oranından fazla kötüleşen senaryolar"""
+    regressions = []
+    base_cases = baseline.get('cases', {})
+    for name, current in results['cases'].items():
+        base = base_cases.get(name)
+        if not base:
+            continue
+        for metric in ('p50_ms', 'p95_ms'):
+            if base.get(metric) and current[metric] > base[metric] * (1 + threshold):
+                regressions.append({
+                    'case': name, 'metric': metric, 'baseline': base[metric], 'current': current[metric],
+                    'change_pct': round((current[metric] / base[metric] - 1) * 100, 1),
+                })
+        current['regression'] = any(r['case'] == name for r in regressions)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='NTS fiyatlandırma benchmark\'ları')
+    parser.add_argument('--scale', choices=sorted(datagen.SCALES), default='small')
+    parser.add_argument('--data', default=None, help='Veri klasörü (yoksa üretilir)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--cases', default=None, help='Virgülle ayrılmış senaryo adları')
+    parser.add_argument('--out', default=None, help='Sonuç JSON yolu (varsayılan: benchmarks/results/)')
+    parser.add_argument('--baseline', default=None, help='Karşılaştırılacak sonuç JSON dosyası')
+    parser.add_argument('--save-baseline', default=None, help='Sonuçları baseline olarak da kaydet')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Gerileme eşiği (0.2 = %%20)')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args(argv)
+
+    data_dir = os.path.abspath(args.data or os.path.join(DATA_DIR, f'{args.scale}-{args.seed}'))
+    if not os.path.exists(os.path.join(data_dir, 'dataset.json')):
+        preset = datagen.SCALES[args.scale]
+        print(f"📦 Veri üretiliyor: {data_dir}")
+        datagen.generate(data_dir, preset['price_rows'], preset['cities'], preset['history_rows'], args.seed)
+    with open(os.path.join(data_dir, 'dataset.json'), encoding='utf-8') as f:
+        dataset = json.load(f)
+
+    # Uygulama dosyaları göreli yollarla okur; TCMB istekleri yerel fixture sunucusuna gider
+    os.environ['NTS_STORAGE'] = 'csv'
+    from nts_core.tcmb_fixtures import start_in_background
+    fixture_server, fixture_url = start_in_background()
+    os.environ['NTS_TCMB_URL'] = fixture_url
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    cwd = os.getcwd()
+    os.chdir(data_dir)
+
+    wanted = set(args.cases.split(',')) if args.cases else None
+    results = {
+        'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'scale': args.scale,
+        'dataset': dataset,
+        'environment': {
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'pandas': pd.__version__, 'numpy': np.__version__,
+        },
+        'cases': {},
+    }
+    cases = None
+    try:
+        cases = Cases(np.random.default_rng(args.seed), args.iterations, args.batch_size)
+        print(f"{'senaryo':<24}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>10}{'RSS MB':>9}")
+        for name, fn, iterations, items in cases.all():
+            if wanted and name not in wanted:
+                continue
+            result = measure(fn, iterations, items=items)
+            results['cases'][name] = result
+            print(f"{name:<24}{result['p50_ms']:>10.3f}{result['p95_ms']:>10.3f}{result['p99_ms']:>10.3f}"
+                  f"{result['ops_per_s']:>10.1f}{result['peak_rss_mb'] or 0:>9.1f}")
+    finally:
+        if cases is not None:
+            cases.close()
+        os.chdir(cwd)
+        fixture_server.shutdown()
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        results['regressions'] = regressions
+        for r in regressions:
+            print(f"⚠️  {r['case']} {r['metric']}: {r['baseline']} → {r['current']} ms ({r['change_pct']:+.1f}%)")
+        if not regressions:
+            print("✅ Baseline'a göre gerileme yok")
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{args.scale}.json")
+    for path in filter(None, [out, args.save_baseline]):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"💾 {out}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -35,6 +35,23 @@ class ApiService {
     }
   }
   
+  // Ürün/şehir otomatik tamamlama (sunucu tarafı arama, Türkçe harf duyarsız)
+  Future<List<String>> searchSuggestions(String query, {String? kind, int limit = 10}) async {
+    try {
+      final params = {'q': query, 'limit': '$limit', if (kind != null) 'kind': kind};
+      final response = await http.get(
+        Uri.parse('$baseUrl/api/search').replace(queryParameters: params)
+      );
+      if (response.statusCode == 200) {
+        List<dynamic> items = json.decode(response.body)['items'];
+        return items.map((item) => item['text'] as String).toList();
+      }
+      throw Exception('Arama yapılamadı');
+    } catch (e) {
+      throw Exception('Bağlantı hatası: $e');
+    }
+  }
+  
   // Nakliye seçeneklerini getir
   Future<List<ShippingOption>> fetchShippingOptions(String city) async {
     try {
@@ -0,0 +1,43 @@
+"""
+NTS fiyatlandırma çekirdeği (Streamlit'ten bağımsız ortak modüller).
+
+Paket içe aktarımı hiçbir alt modülü (ve pandas/numpy'yi) yüklemez; aşağıdaki
+adlar ilk erişimde ilgili alt modülden alınır (PEP 562). Böylece CLI ve
+işçiler yalnızca kullandıkları parçaların yükleme maliyetini öder.
+"""
+import importlib
+
+_EXPORTS = {
+    'PricingSnapshot': 'snapshot',
+    'SnapshotStore': 'snapshot',
+    'file_signature': 'snapshot',
+    'ProductPriceIndex': 'price_index',
+    'RouteQuote': 'quote',
+    'find_cheapest_route': 'quote',
+    'quote_columns': 'quote',
+    'quote_batch': 'quote',
+    'load_exchange_rates': 'rates',
+    'get_current_rates': 'rates',
+    'load_products': 'loaders',
+    'load_shipping': 'loaders',
+    'price_index': 'loaders',
+    'pricing_store': 'loaders',
+    'PricingError': 'pricing',
+    'calculate': 'pricing',
+    'get_storage': 'storage',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
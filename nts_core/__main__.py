@@ -0,0 +1,34 @@
+"""
+Komut satırından fiyat hesaplama: python -m nts_core quote --product ... --city ...
+
+Ağır bağımlılıklar (pandas vb.) yalnızca komut çalışırken yüklenir; `--help` anında döner.
+"""
+import argparse
+import json
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m nts_core', description='NTS fiyatlandırma çekirdeği')
+    sub = parser.add_subparsers(dest='command', required=True)
+    quote = sub.add_parser('quote', help='Tek ürün/şehir için fiyat hesapla (API /api/calculate ile aynı)')
+    quote.add_argument('--product', required=True)
+    quote.add_argument('--city', required=True)
+    quote.add_argument('--margin', type=float, default=15.0, help='Kâr marjı %% (varsayılan: 15)')
+    quote.add_argument('--factory', default=None, help='Manuel seçim: fabrika')
+    quote.add_argument('--company', default=None, help='Manuel seçim: nakliye firması')
+    quote.add_argument('--vehicle', default=None, help='Manuel seçim: araç tipi')
+    args = parser.parse_args(argv)
+
+    from .loaders import pricing_store
+    from .pricing import PricingError, calculate
+
+    snapshot = pricing_store().get()
+    try:
+        result = calculate(snapshot, args.product, args.city, args.margin, args.factory, args.company, args.vehicle)
+    except PricingError as e:
+        parser.exit(1, f"Hata: {e}\n")
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
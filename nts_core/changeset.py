@@ -0,0 +1,192 @@
+"""
+Tablo düzenleyicisi için değişiklik kümesi (eklenen / silinen / güncellenen hücreler).
+
+Düzenlenmiş tablo, satır kimliği kolonu üzerinden orijinaliyle vektörel
+karşılaştırılır; kimliği boş satırlar yeni eklenmiş sayılır. Değişiklikler
+tek seferde uygulanır (silme + güncelleme + ekleme) ve denetim için
+`product_audit` veri kümesine kaydedilir.
+
+Satır kimliği dosyadaki konumdur; düzenleyici açıkken dosya değişmiş
+olabileceği için değişiklikler güncel tabloya `apply_checked` ile uygulanır:
+güncellenen hücrelerin eski değerleri ve silinen satırlar hâlâ aynı değilse
+kayıt reddedilir.
+"""
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .storage import get_storage
+
+AUDIT_DATASET = 'product_audit'
+# Denetim kaydında silinen/güncellenen satırı tanımlayan kolonlar
+AUDIT_LABEL_COLUMNS = ('Urun_Adi', 'Fabrika')
+
+
+@dataclass(frozen=True)
+class ChangeSet:
+    """
+    key: Satır kimliği kolonu
+    inserted: Yeni satırlar (yalnızca karşılaştırılan kolonlar)
+    deleted: Silinen satırlar (orijinal, index = kimlik)
+    updated: Değişen hücreler; kolonlar [key, 'column', 'old', 'new']
+    columns: Karşılaştırılan kolonlar
+    """
+    key: str
+    inserted: pd.DataFrame
+    deleted: pd.DataFrame
+    updated: pd.DataFrame
+    columns: tuple = ()
+
+    def __bool__(self):
+        return not (self.inserted.empty and self.deleted.empty and self.updated.empty)
+
+    def counts(self):
+        return {
+            'inserted': len(self.inserted),
+            'deleted': len(self.deleted),
+            'updated_cells': len(self.updated),
+            'updated_rows': self.updated[self.key].nunique(),
+        }
+
+
+def diff_frames(original, edited, key, columns):
+    """
+    İki tablo arasındaki değişiklik kümesi.
+
+    Args:
+        original: Düzenleyiciye verilen tablo (key kolonu benzersiz)
+        edited: Düzenleyiciden dönen tablo; yeni satırlarda key boştur
+        columns: Karşılaştırılan (düzenlenebilir) kolonlar
+    """
+    columns = list(columns)
+    before = original.set_index(key)[columns]
+    has_key = edited[key].notna()
+    inserted = edited.loc[~has_key, columns].reset_index(drop=True)
+    after = edited.loc[has_key].set_index(key)[columns]
+    # Eklenen satırlar kimlik kolonunu float'a çevirmiş olabilir
+    after.index = after.index.astype(before.index.dtype)
+
+    deleted = original.set_index(key).loc[before.index.difference(after.index, sort=False)]
+    common = after.index.intersection(before.index, sort=False)
+    old, new = before.loc[common], after.loc[common]
+    changed = old.ne(new) & ~(old.isna() & new.isna())
+    rows, cols = np.nonzero(changed.to_numpy())
+    updated = pd.DataFrame({
+        key: common[rows],
+        'column': np.asarray(columns, dtype=object)[cols],
+        'old': old.to_numpy(dtype=object)[rows, cols],
+        'new': new.to_numpy(dtype=object)[rows, cols],
+    })
+    return ChangeSet(key, inserted, deleted, updated, tuple(columns))
+
+
+def apply_changes(df, changes):
+    """
+    Değişiklikleri `df`'nin kopyasına uygula (index = satır kimliği).
+
+    İşlem değişiklik sayısıyla orantılıdır: silmeler tek drop, güncellemeler
+    kolon başına tek atama, eklemeler tek concat.
+    """
+    result = df.drop(index=changes.deleted.index)
+    for column, group in changes.updated.groupby('column', sort=False):
+        values = pd.Series(group['new'].tolist(), index=group[changes.key].to_numpy())
+        if column not in result.columns:
+            result[column] = None
+        try:
+            result.loc[values.index, column] = values
+        except (TypeError, ValueError):
+            # Uyumsuz tip (ör. sayı kolonuna metin): kolon object'e genişletilir
+            result[column] = result[column].astype(object)
+            result.loc[values.index, column] = values
+    if not changes.inserted.empty:
+        result = pd.concat([result, changes.inserted], ignore_index=True)
+    return result
+
+
+class ChangeConflict(Exception):
+    """Değişiklik kümesi güncel tabloyla çakışıyor; `rows` çakışan satır kimlikleri"""
+
+    def __init__(self, rows):
+        super().__init__(f"{len(rows)} satır düzenleme sırasında başka biri tarafından değiştirildi")
+        self.rows = rows
+
+
+def _same(current, expected):
+    if pd.isna(current) and pd.isna(expected):
+        return True
+    try:
+        return bool(current == expected)
+    except (TypeError, ValueError):
+        return False
+
+
+def conflicts(df, changes):
+    """
+    Değişiklik kümesinin dayandığı değerleri `df`'de artık taşımayan satır kimlikleri.
+
+    Güncellenen hücrelerin eski değeri ve silinen satırların karşılaştırılan
+    kolonları güncel değerle aynı olmalıdır; satırı kalmayan kimlikler de çakışmadır.
+    `df`'de bulunmayan kolonlar karşılaştırılmaz.
+    """
+    stale = set()
+    for row_id, column, old in zip(changes.updated[changes.key], changes.updated['column'], changes.updated['old']):
+        if row_id not in df.index or (column in df.columns and not _same(df.at[row_id, column], old)):
+            stale.add(row_id)
+    columns = [column for column in changes.columns if column in df.columns and column in changes.deleted.columns]
+    for row_id, row in zip(changes.deleted.index, changes.deleted[columns].itertuples(index=False, name=None)):
+        if row_id not in df.index or not all(_same(df.at[row_id, column], value) for column, value in zip(columns, row)):
+            stale.add(row_id)
+    return sorted(stale)
+
+
+def apply_checked(df, changes):
+    """Çakışma yoksa `apply_changes`; varsa ChangeConflict (tablo değişmez)"""
+    stale = conflicts(df, changes)
+    if stale:
+        raise ChangeConflict(stale)
+    return apply_changes(df, changes)
+
+
+def _json_value(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NaT:
+        return None
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _labels(frame):
+    columns = [column for column in AUDIT_LABEL_COLUMNS if column in frame.columns]
+    return [{column: _json_value(value) for column, value in zip(columns, row)}
+            for row in frame[columns].itertuples(index=False, name=None)]
+
+
+def audit_record(changes, original, username=None):
+    """Değişiklik kümesinin JSON'a yazılabilir denetim kaydı"""
+    updated_rows = original.set_index(changes.key).loc[changes.updated[changes.key]] if len(changes.updated) else original.iloc[0:0]
+    return {
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'username': username,
+        'counts': changes.counts(),
+        'inserted': [{column: _json_value(value) for column, value in row.items()}
+                     for row in changes.inserted.to_dict('records')],
+        'deleted': _labels(changes.deleted),
+        'updated': [
+            dict(label, column=column, old=_json_value(old), new=_json_value(new))
+            for label, column, old, new in zip(
+                _labels(updated_rows), changes.updated['column'], changes.updated['old'], changes.updated['new'])
+        ],
+    }
+
+
+def record_changes(changes, original, username=None, storage=None):
+    """Denetim kaydını `product_audit` veri kümesine ekle; kayıt anahtarını döndür"""
+    record = audit_record(changes, original, username)
+    change_id = f"{record['timestamp']} {uuid.uuid4().hex[:8]}"
+    (storage or get_storage()).put_json_item(AUDIT_DATASET, change_id, record)
+    return change_id
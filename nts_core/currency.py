@@ -0,0 +1,59 @@
+"""
+Ürün maliyetlerinin döviz karşılıkları (vektörel).
+
+Her ürün kaydı kendi kayıt tarihindeki kurları (Kur_USD/Kur_EUR/Kur_CHF)
+taşır. Kur kolonları yüklemede bir kez sayıya çevrilir (boş, hatalı veya
+≤0 → NaN); dönüşüm tek bölme işlemidir, kayıtlı kur yoksa güncel kura düşülür.
+"""
+import numpy as np
+import pandas as pd
+
+CURRENCIES = ('USD', 'EUR', 'CHF')
+RATE_COLUMNS = {code: f'Kur_{code}' for code in CURRENCIES}
+
+
+def _rate_values(df, column):
+    if column not in df.columns:
+        return pd.Series(np.nan, index=df.index, dtype='float64')
+    values = pd.to_numeric(df[column], errors='coerce').astype('float64')
+    return values.where(values > 0)
+
+
+def normalize_rate_columns(df):
+    """Kur_* kolonlarını float'a çevir; eksik kolonlar NaN ile eklenir"""
+    return df.assign(**{column: _rate_values(df, column) for column in RATE_COLUMNS.values()})
+
+
+def convert(tl_values, saved_rates, current_rate, decimals=4):
+    """
+    TL değerlerini kayıtlı kura (yoksa güncel kura) böl.
+
+    Args:
+        tl_values: TL tutarları (dizi)
+        saved_rates: Satır başına kayıtlı kur (NaN → güncel kur)
+        current_rate: Güncel kur (skaler)
+
+    Returns:
+        numpy dizisi; kullanılabilir kur yoksa 0
+    """
+    tl = np.asarray(tl_values, dtype=float)
+    rates = np.asarray(saved_rates, dtype=float)
+    rates = np.where(rates > 0, rates, current_rate)
+    result = np.zeros_like(tl)
+    np.divide(tl, rates, out=result, where=rates > 0)
+    return result.round(decimals)
+
+
+def currency_columns(df, current_rates, value_column='NTS_Maliyet_TL', suffix='/Kg', decimals=4):
+    """
+    `value_column` için USD/EUR/CHF karşılık kolonları.
+
+    Returns:
+        dict: 'USD/Kg' gibi kolon adı → numpy dizisi
+    """
+    tl = pd.to_numeric(df[value_column], errors='coerce').to_numpy(dtype=float)
+    columns = {}
+    for code, rate_column in RATE_COLUMNS.items():
+        current = float(current_rates.get(code, 1) or 0)
+        columns[f'{code}{suffix}'] = convert(tl, _rate_values(df, rate_column).to_numpy(), current, decimals)
+    return columns
@@ -0,0 +1,185 @@
+"""
+Hesaplama geçmişinin akışlı (parça parça) filtrelenmesi ve dışa aktarımı.
+
+Geçmiş hiçbir zaman tek DataFrame olarak belleğe alınmaz: depolama
+parçalar halinde okunur, her parça filtrelenir ve CSV/XLSX çıktısına
+doğrudan yazılır. Bellek kullanımı parça boyutuyla sınırlıdır.
+"""
+import io
+import math
+import tempfile
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import pandas as pd
+
+from .history_parquet import UNKNOWN_MONTH
+from .storage import HISTORY_CHUNK_ROWS, HISTORY_COLUMNS, get_storage
+
+# Filtre alanı → geçmiş kolonu
+FILTER_COLUMNS = {
+    'musteri': 'musteri',
+    'bayi_musteri': 'bayi_musteri',
+    'urun': 'urun',
+    'username': 'username',
+}
+XLSX_MIME = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+_STREAM_BLOCK = 64 * 1024
+
+
+@dataclass(frozen=True)
+class HistoryFilter:
+    """Eşitlik filtreleri ve kapalı [start, end] tarih aralığı; boş alanlar uygulanmaz"""
+    musteri: str = None
+    bayi_musteri: str = None
+    urun: str = None
+    username: str = None
+    start: date = None
+    end: date = None
+
+    @classmethod
+    def from_args(cls, args):
+        """Sorgu parametrelerinden filtre oluştur; tarihler YYYY-MM-DD, hatalıysa ValueError"""
+        values = {name: args.get(name) or None for name in FILTER_COLUMNS}
+        for name in ('start', 'end'):
+            values[name] = date.fromisoformat(args[name]) if args.get(name) else None
+        return cls(**values)
+
+    def columns(self):
+        """Filtreyi değerlendirmek için gereken kolonlar"""
+        needed = [column for name, column in FILTER_COLUMNS.items() if getattr(self, name) is not None]
+        if self.start is not None or self.end is not None:
+            needed.append('timestamp')
+        return needed
+
+    def sql_where(self):
+        """
+        SQLite WHERE koşulu ve parametreleri (indeksle daraltma; kesin sonuç `apply` ile).
+
+        Tarihler ISO metin (YYYY-MM-DD ...) olarak karşılaştırılır.
+        """
+        clauses, params = [], []
+        for name, column in FILTER_COLUMNS.items():
+            value = getattr(self, name)
+            if value is not None:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        if self.start is not None:
+            clauses.append('timestamp >= ?')
+            params.append(self.start.isoformat())
+        if self.end is not None:
+            clauses.append('timestamp < ?')
+            params.append((self.end + timedelta(days=1)).isoformat())
+        return ' AND '.join(clauses), params
+
+    def month_predicate(self):
+        """Ay bölümü ('YYYY-MM') tarih aralığıyla kesişiyor mu; tarih yoksa None. Tarihsiz bölüm hep okunur."""
+        if self.start is None and self.end is None:
+            return None
+        first = self.start.strftime('%Y-%m') if self.start is not None else ''
+        last = self.end.strftime('%Y-%m') if self.end is not None else '9999-99'
+        return lambda month: month == UNKNOWN_MONTH or first <= month <= last
+
+    def apply(self, chunk):
+        """Parçanın filtreye uyan satırları (index korunur)"""
+        mask = pd.Series(True, index=chunk.index)
+        for name, column in FILTER_COLUMNS.items():
+            value = getattr(self, name)
+            if value is not None:
+                if column not in chunk.columns:
+                    return chunk.iloc[0:0]
+                mask &= chunk[column] == value
+        if self.start is not None or self.end is not None:
+            timestamps = pd.to_datetime(chunk['timestamp'], errors='coerce')
+            if self.start is not None:
+                mask &= timestamps >= pd.Timestamp(self.start)
+            if self.end is not None:
+                mask &= timestamps < pd.Timestamp(self.end) + pd.Timedelta(days=1)
+        return chunk[mask]
+
+
+def iter_filtered(filters=None, storage=None, chunksize=HISTORY_CHUNK_ROWS, columns=None):
+    """Filtreye uyan geçmiş parçaları (boş parçalar atlanır); filtre ve kolon seçimi depolamaya iletilir"""
+    for chunk in (storage or get_storage()).iter_history(chunksize, filters=filters, columns=columns):
+        if not chunk.empty:
+            yield chunk
+
+
+def collect(chunks):
+    """Parçaları tek DataFrame'e birleştir (yalnızca filtrelenmiş, küçük sonuçlar için)"""
+    chunks = list(chunks)
+    if not chunks:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+    return pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+
+
+def filter_options(storage=None, chunksize=HISTORY_CHUNK_ROWS):
+    """Filtre seçim kutuları için kolon başına sıralı benzersiz değerler (tek geçiş)"""
+    seen = {column: set() for column in FILTER_COLUMNS.values()}
+    for chunk in (storage or get_storage()).iter_history(chunksize, columns=list(seen)):
+        for column, values in seen.items():
+            if column in chunk.columns:
+                values.update(chunk[column].dropna().unique().tolist())
+    return {column: sorted(values, key=str) for column, values in seen.items()}
+
+
+def iter_csv(chunks):
+    """Parçalardan UTF-8 CSV bayt blokları üret; başlık ilk parçada bir kez yazılır"""
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header).encode('utf-8')
+        header = False
+    if header:
+        yield (','.join(HISTORY_COLUMNS) + '\n').encode('utf-8')
+
+
+def _xlsx_cell(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value
+
+
+def write_xlsx(chunks, fileobj, sheet_title='Hesaplama Geçmişi'):
+    """Parçaları openpyxl write_only modunda satır satır XLSX'e yaz"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_title)
+    header = None
+    for chunk in chunks:
+        if header is None:
+            header = list(chunk.columns)
+            sheet.append(header)
+        for row in chunk.itertuples(index=False, name=None):
+            sheet.append([_xlsx_cell(value) for value in row])
+    if header is None:
+        sheet.append(HISTORY_COLUMNS)
+    workbook.save(fileobj)
+
+
+def iter_xlsx(chunks):
+    """
+    XLSX bayt blokları üret.
+
+    XLSX bir zip arşivi olduğundan sonu yazılmadan gönderilemez; dosya önce
+    diske taşabilen geçici dosyaya yazılır, sonra bloklar halinde okunur.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as buffer:
+        write_xlsx(chunks, buffer)
+        buffer.seek(0)
+        while True:
+            block = buffer.read(_STREAM_BLOCK)
+            if not block:
+                break
+            yield block
+
+
+def export_bytes(chunks, fmt='csv'):
+    """Küçük (filtrelenmiş) sonuçlar için tam çıktı baytları"""
+    if fmt == 'xlsx':
+        buffer = io.BytesIO()
+        write_xlsx(chunks, buffer)
+        return buffer.getvalue()
+    return b''.join(iter_csv(chunks))
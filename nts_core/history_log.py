@@ -0,0 +1,320 @@
+"""
+Hesaplama geçmişi için yalnızca-ekleme (append-only) CSV yazıcısı.
+
+Başlık dosyaya bir kez yazılır, her kayıt tek satır olarak sona eklenir;
+kaydetme maliyeti geçmişin boyutundan bağımsızdır. Tüm eklemeler tek bir
+yazıcı thread'i üzerinden geçer: aynı anda gelen kayıtlar bir grup halinde
+yazılır ve tek fsync ile diske alınır (group commit). Çağıran, kaydı diske
+alınana kadar bekler.
+
+Çökme sonrası yarım kalmış son satır (torn tail) dosya açılırken kesilir;
+onaylanmış kayıtlar her zaman tam satırdır. Satır sonu eksik ama başlığın
+kolon sayısına ayrışan son satır kesilmez, yalnızca satır sonu eklenir.
+"""
+import csv
+import io
+import logging
+import math
+import os
+import queue
+import shutil
+import threading
+
+from .write_coordinator import file_lock
+
+logger = logging.getLogger(__name__)
+
+
+class _Request:
+    __slots__ = ('kind', 'payload', 'done', 'error', 'result')
+
+    def __init__(self, kind, payload):
+        self.kind = kind
+        self.payload = payload
+        self.done = threading.Event()
+        self.error = None
+        self.result = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and math.isnan(value):
+        return ''
+    if isinstance(value, str):
+        # Her kayıt tek satır olmalı; kuyruk kurtarma satır sonlarına dayanır
+        return value.replace('\r', ' ').replace('\n', ' ')
+    return value
+
+
+class HistoryLog:
+    """
+    Tek yazıcılı, grup commit'li append-only CSV.
+
+    Kayıtta dosya başlığında olmayan bir kolon varsa başlık bir kez
+    genişletilir (geçici dosya + os.replace); eski satırlar eksik kolonları
+    boş olarak okunur.
+    """
+
+    def __init__(self, path, columns, max_batch=512):
+        self.path = path
+        self.max_batch = max_batch
+        self._default_columns = list(columns)
+        self._columns = None
+        self._file = None
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.stats = {'batches': 0, 'records': 0, 'recovered_bytes': 0, 'header_rewrites': 0}
+
+    # --- Çağıran tarafı ---
+    def append(self, record, wait=True):
+        """Kaydı ekle; wait=True ise diske alınana (fsync) kadar bekle"""
+        return self._submit('append', dict(record), wait)
+
+    def ensure(self):
+        """Dosya yoksa başlıkla oluştur, yarım kalmış son satırı temizle"""
+        self._submit('open', None, True)
+
+    def rewrite(self, df):
+        """Tüm geçmişi yeniden yaz (ör. satır silme); bekleyen eklemelerden sonra uygulanır"""
+        self._submit('rewrite', df, True)
+
+    def exclusive(self, fn):
+        """
+        `fn()`'i yazıcı thread'inde, bekleyen eklemelerden sonra ve dosya kapalıyken çalıştır.
+
+        Çalışırken yeni eklemeler sırada bekler; dosyayı okuyup değiştiren
+        işlemler (ör. sıkıştırma) eklemelerle yarışmaz. `fn`'in sonucunu döndürür.
+        """
+        return self._submit('call', fn, True).result
+
+    def close(self):
+        self._submit('close', None, True)
+
+    def _submit(self, kind, payload, wait):
+        self._ensure_thread()
+        request = _Request(kind, payload)
+        self._queue.put(request)
+        if wait:
+            request.wait()
+        return request
+
+    def _ensure_thread(self):
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='nts-history-writer', daemon=True)
+                self._thread.start()
+
+    # --- Yazıcı thread'i ---
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if self._process(batch):
+                return
+
+    def _process(self, batch):
+        # Başka süreçler (API, betikler) aynı dosyaya yazabilir: grup süreçler arası kilit altında işlenir
+        with file_lock(self.path):
+            self._reopen_if_replaced()
+            return self._process_locked(batch)
+
+    def _reopen_if_replaced(self):
+        """Dosya başka bir süreç tarafından os.replace ile değiştirildiyse yeni dosyayı aç"""
+        if self._file is None:
+            return
+        try:
+            replaced = os.stat(self.path).st_ino != os.fstat(self._file.fileno()).st_ino
+        except OSError:
+            replaced = True
+        if replaced:
+            self._close_file()
+
+    def _process_locked(self, batch):
+        appends = []
+        closing = False
+        for request in batch:
+            if request.kind == 'append':
+                appends.append(request)
+                continue
+            # Sıra korunur: önce bekleyen eklemeler yazılır
+            self._commit(appends)
+            appends = []
+            try:
+                if request.kind == 'open':
+                    self._open()
+                elif request.kind == 'rewrite':
+                    self._rewrite(request.payload)
+                elif request.kind == 'call':
+                    self._close_file()
+                    request.result = request.payload()
+                elif request.kind == 'close':
+                    closing = True
+            except Exception as exc:
+                request.error = exc
+            request.done.set()
+        self._commit(appends)
+        if closing:
+            self._close_file()
+        return closing
+
+    def _commit(self, requests):
+        if not requests:
+            return
+        try:
+            self._open()
+            records = [request.payload for request in requests]
+            new_columns = []
+            for record in records:
+                for column in record:
+                    if column not in self._columns and column not in new_columns:
+                        new_columns.append(column)
+            if new_columns:
+                self._extend_header(new_columns)
+
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator='\n')
+            for record in records:
+                writer.writerow([_cell(record.get(column)) for column in self._columns])
+            self._file.write(buffer.getvalue())
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.stats['batches'] += 1
+            self.stats['records'] += len(records)
+        except Exception as exc:
+            logger.exception("Hesaplama geçmişi yazılamadı: %s", self.path)
+            for request in requests:
+                request.error = exc
+            # Sonraki denemede dosya yeniden açılır ve yarım satır temizlenir
+            self._close_file()
+        for request in requests:
+            request.done.set()
+
+    def _open(self):
+        if self._file is not None:
+            return
+        self._recover_tail()
+        is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, 'a', encoding='utf-8', newline='')
+        if is_new:
+            self._columns = list(self._default_columns)
+            csv.writer(self._file, lineterminator='\n').writerow(self._columns)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        else:
+            with open(self.path, 'r', encoding='utf-8', newline='') as f:
+                self._columns = next(csv.reader(f), [])
+
+    def _close_file(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            finally:
+                self._file = None
+                self._columns = None
+
+    @staticmethod
+    def _fields(line):
+        """Satırın CSV alanları; yarım kalmış satırda (bozuk UTF-8, kapanmamış tırnak) None"""
+        try:
+            text = line.decode('utf-8')
+        except UnicodeDecodeError:
+            return None
+        if text.count('"') % 2:
+            return None
+        return next(csv.reader([text]), [])
+
+    def _complete_tail(self, f, keep, tail):
+        """Satır sonu olmayan son satır tam mı: başlıktaki kolon sayısına ayrışıyorsa evet"""
+        fields = self._fields(tail)
+        if fields is None:
+            return False
+        if keep == 0:
+            # Tek satır başlıktır: varsayılan kolonların hepsini içermeli
+            return set(self._default_columns) <= set(fields)
+        f.seek(0)
+        header = self._fields(f.readline().rstrip(b'\r\n'))
+        return header is not None and len(fields) == len(header)
+
+    def _recover_tail(self):
+        """
+        Dosya satır sonuyla bitmiyorsa son satırı onar.
+
+        Son satır başlıktaki kolon sayısına ayrışıyorsa (ör. elle düzenlenmiş ya da
+        satır sonu olmadan kaydedilmiş dosya) yalnızca satır sonu eklenir; aksi
+        halde çökmede yarım kalmış kayıttır ve kesilir.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b'\n':
+                return
+            # Son satır sonunu geriye doğru ara
+            end = size
+            keep = 0
+            while end > 0:
+                start = max(0, end - 65536)
+                f.seek(start)
+                chunk = f.read(end - start)
+                newline = chunk.rfind(b'\n')
+                if newline != -1:
+                    keep = start + newline + 1
+                    break
+                end = start
+            f.seek(keep)
+            tail = f.read(size - keep)
+            if self._complete_tail(f, keep, tail.rstrip(b'\r')):
+                f.seek(size)
+                f.write(b'\n')
+                f.flush()
+                os.fsync(f.fileno())
+                logger.warning("%s: satır sonu olmayan son kayda satır sonu eklendi", self.path)
+                return
+            f.truncate(keep)
+            f.flush()
+            os.fsync(f.fileno())
+        self.stats['recovered_bytes'] += size - keep
+        logger.warning("%s: yarım kalmış son kayıt temizlendi (%d bayt)", self.path, size - keep)
+
+    def _extend_header(self, new_columns):
+        columns = self._columns + new_columns
+        self._close_file()
+        tmp_path = self.path + '.tmp'
+        with open(self.path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            src.readline()
+            header = io.StringIO()
+            csv.writer(header, lineterminator='\n').writerow(columns)
+            dst.write(header.getvalue().encode('utf-8'))
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp_path, self.path)
+        self.stats['header_rewrites'] += 1
+        self._open()
+
+    def _rewrite(self, df):
+        self._close_file()
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            df.to_csv(f, index=False, lineterminator='\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
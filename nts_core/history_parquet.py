@@ -0,0 +1,220 @@
+"""
+Hesaplama geçmişi için aylara bölünmüş Parquet deposu (pyarrow isteğe bağlı).
+
+Düzen: <kök>/month=YYYY-MM/part-000001.parquet. Yeni kayıtlar önce mevcut
+append-only CSV'ye (HistoryLog) yazılır; CSV belirli bir boyutu aşınca
+yazıcı thread'inde aylara dağıtılıp Parquet dosyalarına taşınır ve CSV
+başlığa indirilir. Okuma sırası: aylar ve dosyalar sırayla, sonra CSV
+kuyruğu; satır konumu (index) bu sıraya göre tüm geçmişte tekildir.
+
+Sorgular yalnızca tarih aralığına giren ay klasörlerini ve istenen
+kolonları okur; eşitlik/tarih filtreleri önce yalnızca filtre kolonları
+üzerinde değerlendirilir, kalan kolonlar sadece eşleşen satırlar için alınır.
+"""
+import glob
+import logging
+import os
+import shutil
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+NUMERIC_COLUMNS = (
+    'kar_marji', 'nts_tl', 'nakliye_tl', 'toplam_maliyet_tl',
+    'satis_tl_kg', 'satis_usd_kg', 'satis_eur_kg', 'satis_chf_kg',
+    'satis_tl_ton', 'satis_usd_ton', 'satis_eur_ton', 'satis_chf_ton',
+    'usd_kur', 'eur_kur', 'chf_kur',
+)
+UNKNOWN_MONTH = 'unknown'
+# CSV kuyruğu bu boyutu aşınca Parquet'e taşınır (bayt)
+COMPACT_TAIL_BYTES = 1024 * 1024
+
+
+def available():
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _month_keys(timestamps):
+    months = pd.to_datetime(timestamps, errors='coerce').dt.strftime('%Y-%m')
+    return months.fillna(UNKNOWN_MONTH)
+
+
+def _normalize(df, columns):
+    """Parquet şeması dosyalar arasında aynı kalsın: sayısal kolonlar float, diğerleri metin"""
+    # Başlığa sonradan eklenmiş kolonlar korunur
+    columns = list(columns) + [column for column in df.columns if column not in columns]
+    df = df.reindex(columns=columns)
+    data = {}
+    for column in columns:
+        if column in NUMERIC_COLUMNS:
+            data[column] = pd.to_numeric(df[column], errors='coerce').astype('float64')
+        else:
+            data[column] = df[column].astype('string')
+    return pd.DataFrame(data, index=df.index)
+
+
+class PartitionedHistory:
+    """Aylık Parquet bölümleri + CSV kuyruğu (HistoryLog)"""
+
+    def __init__(self, root, log, columns, compact_bytes=COMPACT_TAIL_BYTES):
+        self.root = root
+        self.log = log
+        self.columns = list(columns)
+        self.compact_bytes = compact_bytes
+
+    # --- Bölümler ---
+    def months(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name.split('=', 1)[1] for name in os.listdir(self.root) if name.startswith('month='))
+
+    def _month_dir(self, month, root=None):
+        return os.path.join(root or self.root, f"month={month}")
+
+    def files(self, months=None):
+        """(ay, dosya yolu) listesi, okuma sırasında"""
+        result = []
+        for month in self.months():
+            if months is not None and not months(month):
+                continue
+            for path in sorted(glob.glob(os.path.join(self._month_dir(month), 'part-*.parquet'))):
+                result.append((month, path))
+        return result
+
+    def _next_part(self, month_dir):
+        existing = glob.glob(os.path.join(month_dir, 'part-*.parquet'))
+        numbers = [int(os.path.basename(path)[5:-8]) for path in existing]
+        return os.path.join(month_dir, f"part-{max(numbers, default=0) + 1:06d}.parquet")
+
+    def _write_partitions(self, df, root=None):
+        """DataFrame'i ay bölümlerine yeni dosyalar olarak yaz (satır sırası korunur)"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if df.empty:
+            return 0
+        df = _normalize(df, self.columns)
+        for month, part in df.groupby(_month_keys(df['timestamp']), sort=True):
+            month_dir = self._month_dir(month, root)
+            os.makedirs(month_dir, exist_ok=True)
+            path = self._next_part(month_dir)
+            table = pa.Table.from_pandas(part, preserve_index=False)
+            pq.write_table(table, path + '.tmp', compression='zstd')
+            os.replace(path + '.tmp', path)
+        return len(df)
+
+    # --- Sıkıştırma (CSV kuyruğu → Parquet) ---
+    def compact(self, chunksize=50_000):
+        """CSV kuyruğundaki kayıtları Parquet bölümlerine taşı; taşınan satır sayısını döndür"""
+        return self.log.exclusive(lambda: self._compact(chunksize))
+
+    def _compact(self, chunksize):
+        path = self.log.path
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return 0
+        moved = 0
+        with pd.read_csv(path, chunksize=chunksize) as reader:
+            for chunk in reader:
+                moved += self._write_partitions(chunk)
+        # Kuyruk yalnızca başlığa indirilir (geçici dosya + os.replace)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            f.write(','.join(self.columns) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        if moved:
+            logger.info("%d geçmiş kaydı Parquet'e taşındı: %s", moved, self.root)
+        return moved
+
+    def maybe_compact(self):
+        """Kuyruk eşik boyutu aştıysa sıkıştır"""
+        try:
+            size = os.path.getsize(self.log.path)
+        except OSError:
+            return 0
+        return self.compact() if size >= self.compact_bytes else 0
+
+    def rewrite(self, df):
+        """Tüm geçmişi yeniden yaz: yeni bölüm ağacı hazırlanır, sonra eskisiyle yer değiştirir"""
+        self.log.exclusive(lambda: self._replace(df))
+
+    def update(self, fn):
+        """`fn(güncel geçmiş) → yeni geçmiş`; okuma ve yazma yazıcı thread'inde, eklemeler beklerken"""
+        def run():
+            chunks = [chunk for chunk in self.iter_chunks() if not chunk.empty]
+            self._replace(fn(pd.concat(chunks) if chunks else pd.DataFrame(columns=self.columns)))
+        self.log.exclusive(run)
+
+    def _replace(self, df):
+        new_root = self.root + '.new'
+        old_root = self.root + '.old'
+        shutil.rmtree(new_root, ignore_errors=True)
+        os.makedirs(new_root)
+        self._write_partitions(df, new_root)
+        if os.path.isdir(self.root):
+            shutil.rmtree(old_root, ignore_errors=True)
+            os.replace(self.root, old_root)
+        os.replace(new_root, self.root)
+        shutil.rmtree(old_root, ignore_errors=True)
+        self.log._rewrite(pd.DataFrame(columns=self.columns))
+
+    # --- Okuma ---
+    def iter_chunks(self, chunksize=50_000, filters=None, columns=None):
+        """
+        Geçmişi parça parça oku; index tüm geçmişteki satır konumudur.
+
+        Args:
+            filters: HistoryFilter (ay aralığı ve filtre kolonları buradan alınır)
+            columns: Okunacak kolonlar (None → tümü)
+        """
+        import pyarrow.parquet as pq
+
+        months = filters.month_predicate() if filters is not None else None
+        filter_columns = filters.columns() if filters is not None else []
+        offset = 0
+        for month, path in self.files():
+            parquet = pq.ParquetFile(path)
+            rows = parquet.metadata.num_rows
+            if months is not None and not months(month):
+                offset += rows
+                continue
+            names = parquet.schema_arrow.names
+            read_columns = None if columns is None else [column for column in columns if column in names]
+            if filter_columns:
+                keys = parquet.read(columns=[column for column in filter_columns if column in names]).to_pandas()
+                keys.index = pd.RangeIndex(offset, offset + rows)
+                positions = filters.apply(keys).index.to_numpy() - offset
+                if len(positions):
+                    yield self._frame(parquet.read(columns=read_columns).take(positions), columns, positions + offset)
+            else:
+                table = parquet.read(columns=read_columns)
+                for start in range(0, rows, chunksize):
+                    part = table.slice(start, chunksize)
+                    yield self._frame(part, columns, pd.RangeIndex(offset + start, offset + start + len(part)))
+            offset += rows
+
+        # Henüz taşınmamış CSV kuyruğu
+        if os.path.exists(self.log.path) and os.path.getsize(self.log.path) > 0:
+            wanted = None if columns is None else set(columns) | set(filter_columns)
+            with pd.read_csv(self.log.path, chunksize=chunksize,
+                             usecols=None if wanted is None else (lambda column: column in wanted)) as reader:
+                for chunk in reader:
+                    chunk.index = chunk.index + offset
+                    if filters is not None:
+                        chunk = filters.apply(chunk)
+                    yield chunk if columns is None else chunk.reindex(columns=columns)
+
+    @staticmethod
+    def _frame(table, columns, index):
+        frame = table.to_pandas()
+        if columns is not None:
+            frame = frame.reindex(columns=columns)
+        frame.index = index
+        return frame
@@ -0,0 +1,79 @@
+"""
+Ortak veri yükleyiciler ve paylaşılan fiyatlandırma snapshot'ı.
+
+Streamlit uygulaması, API ve CLI aynı yükleyicileri kullanır; yükleme
+adımları isteğe bağlı `timer(adım)` bağlam yöneticisiyle ölçülebilir.
+"""
+from contextlib import nullcontext
+
+import pandas as pd
+
+from .currency import normalize_rate_columns
+from .price_index import ProductPriceIndex
+from .rates import EXCHANGE_RATES_FILE, load_exchange_rates
+from .snapshot import SnapshotStore
+from .storage import PRODUCT_DATE_FORMAT, get_storage
+
+PRODUCT_FALLBACK_COLUMNS = ['Urun_Adi', 'Fabrika', 'NTS_Maliyet_TL', 'Kayit_Tarihi']
+SHIPPING_FALLBACK_COLUMNS = ['Sehir', 'Firma', 'Fabrika', 'Arac_Tipi', 'Fiyat_TL_KG']
+
+
+def _no_timer(step):
+    return nullcontext()
+
+
+def parse_product_dates(df):
+    return df.assign(Kayit_Tarihi=pd.to_datetime(df['Kayit_Tarihi'], format=PRODUCT_DATE_FORMAT, errors='coerce'))
+
+
+def prepare_products(df):
+    """Depolamadan okunan ham ürün tablosunu snapshot biçimine çevir (ör. update_products içinde)"""
+    return normalize_rate_columns(parse_product_dates(df))
+
+
+def load_products(timer=_no_timer):
+    """Ürün fiyatları; Kayit_Tarihi datetime'a, Kur_* kolonları sayıya çevrilir. Okunamazsa boş tablo."""
+    try:
+        with timer('products_read'):
+            df = get_storage().read_products()
+        with timer('products_dates'):
+            df = parse_product_dates(df)
+        with timer('products_rates'):
+            return normalize_rate_columns(df)
+    except Exception:
+        return pd.DataFrame(columns=PRODUCT_FALLBACK_COLUMNS)
+
+
+def load_shipping(timer=_no_timer):
+    """Nakliye fiyatları; okunamazsa boş tablo"""
+    try:
+        with timer('shipping_read'):
+            return get_storage().read_shipping()
+    except Exception:
+        return pd.DataFrame(columns=SHIPPING_FALLBACK_COLUMNS)
+
+
+def load_pricing_data(timer=_no_timer, with_rates=True):
+    rates = load_exchange_rates() if with_rates else {}
+    return load_products(timer), load_shipping(timer), rates
+
+
+def pricing_store(timer=_no_timer, with_rates=True):
+    """
+    Ürün/nakliye (ve kayıtlı kurlar) için paylaşılan SnapshotStore.
+
+    Depolama imzası (CSV: mtime/boyut, SQLite: veri kümesi sürümü) değişince
+    yeniden yüklenir; aynı süreçteki yazmalar önbelleği ayrıca hemen geçersiz kılar.
+    """
+    store = SnapshotStore(
+        lambda: load_pricing_data(timer, with_rates),
+        [EXCHANGE_RATES_FILE] if with_rates else [],
+        signature_fn=lambda: get_storage().signature(['products', 'shipping']),
+    )
+    get_storage().add_listener(lambda dataset: store.invalidate() if dataset in ('products', 'shipping') else None)
+    return store
+
+
+def price_index(snapshot):
+    """Snapshot başına bir kez kurulan ürün fiyat indeksi"""
+    return snapshot.memo('price_index', lambda: ProductPriceIndex(snapshot.products))
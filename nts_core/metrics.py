@@ -0,0 +1,280 @@
+"""
+Hafif, bağımlılıksız metrik kaydı (Prometheus metin biçimi).
+
+Sayaç, anlık değer (gauge) ve histogram destekler; etiket kombinasyonu
+başına değer tutar. Tüm güncellemeler thread-safe'tir.
+
+Çok süreçli modda (gunicorn işçileri, `enable_multiprocess`) her süreç
+değerlerini ortak klasörde kendi dosyasına yazar; `/metrics` hangi işçi
+yanıtlarsa yanıtlasın tüm dosyaları birleştirir: sayaç ve histogramlar
+toplanır, gauge'lar `pid` etiketiyle süreç başına verilir. Diğer işçilerin
+değerleri en fazla FLUSH_INTERVAL saniye geriden gelir.
+"""
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Çok süreçli modda bir sürecin değerlerini dosyasına yazma aralığı (saniye)
+FLUSH_INTERVAL = 1.0
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: etiketler {self.labelnames} olmalı, verilen {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self, values=None, labelnames=None):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        if values is None:
+            with self._lock:
+                values = dict(self._values)
+        for key, value in sorted(values.items()):
+            lines.extend(self._render_sample(key, value, labelnames or self.labelnames))
+        return lines
+
+    def _render_sample(self, key, value, labelnames):
+        return [f'{self.name}{_format_labels(labelnames, key)} {_format_value(value)}']
+
+    def snapshot(self):
+        """Dosyaya yazılabilir değerler: [[etiket değerleri], değer]"""
+        with self._lock:
+            return [[list(key), json.loads(json.dumps(value))] for key, value in self._values.items()]
+
+    def merge(self, merged, key, value):
+        """Başka bir sürecin değerini birleştir (sayaç: toplam)"""
+        merged[key] = merged.get(key, 0) + value
+
+    def _reset(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def merge(self, merged, key, state):
+        current = merged.get(key)
+        if current is None:
+            merged[key] = [list(state[0]), state[1], state[2]]
+            return
+        current[0] = [a + b for a, b in zip(current[0], state[0])]
+        current[1] += state[1]
+        current[2] += state[2]
+
+    def _render_sample(self, key, state, labelnames):
+        counts, total, count = state
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            le = ('le', _format_value(bound))
+            lines.append(f'{self.name}_bucket{_format_labels(labelnames, key, le)} {cumulative}')
+        labels = _format_labels(labelnames, key)
+        lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+        lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self.multiprocess_dir = None
+        self._flushed_at = 0.0
+        self._flusher_pid = None
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"{name} farklı bir metrik türüyle kayıtlı")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def enable_multiprocess(self, directory):
+        """
+        Süreçler arası birleştirmeyi aç (fork'tan önce, ana süreçte çağrılır).
+
+        Fork sonrası çocuk süreç devraldığı değerleri sıfırlar; bunlar ana
+        sürecin dosyasında zaten sayılıdır.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.multiprocess_dir = directory
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._flushed_at = 0.0
+        for metric in self._metrics.values():
+            metric._reset()
+
+    def flush(self, force=False):
+        """Bu sürecin değerlerini dosyasına yaz (çok süreçli modda; en fazla FLUSH_INTERVAL'de bir)"""
+        directory = self.multiprocess_dir
+        if directory is None:
+            return
+        self._ensure_flusher()
+        now = time.monotonic()
+        if not force and now - self._flushed_at < FLUSH_INTERVAL:
+            return
+        self._flushed_at = now
+        with self._lock:
+            metrics = list(self._metrics.values())
+        data = {metric.name: metric.snapshot() for metric in metrics}
+        path = os.path.join(directory, f'metrics-{os.getpid()}.json')
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def _ensure_flusher(self):
+        """Süreç başına arka plan yazıcısı: boşta kalan işçinin son değerleri de FLUSH_INTERVAL içinde görünür"""
+        if self._flusher_pid == os.getpid():
+            return
+        self._flusher_pid = os.getpid()
+
+        def run():
+            while True:
+                time.sleep(FLUSH_INTERVAL)
+                try:
+                    self.flush(force=True)
+                except OSError:
+                    pass
+
+        threading.Thread(target=run, name='metrics-flush', daemon=True).start()
+
+    def _merged(self, metrics):
+        """Tüm süreç dosyalarını birleştir: ad → (değerler, etiket adları)"""
+        self.flush(force=True)
+        merged = {metric.name: {} for metric in metrics}
+        for path in glob.glob(os.path.join(self.multiprocess_dir, 'metrics-*.json')):
+            pid = int(os.path.basename(path)[8:-5])
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for metric in metrics:
+                if metric.kind == 'gauge' and not _alive(pid):
+                    continue
+                for key, value in data.get(metric.name, []):
+                    key = tuple(key) + ((str(pid),) if metric.kind == 'gauge' else ())
+                    metric.merge(merged[metric.name], key, value)
+        return {
+            metric.name: (merged[metric.name], metric.labelnames + (('pid',) if metric.kind == 'gauge' else ()))
+            for metric in metrics
+        }
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        merged = self._merged(metrics) if self.multiprocess_dir is not None else {}
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render(*merged.get(metric.name, (None, None))))
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
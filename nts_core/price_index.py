@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+INDEX_KEY = ['Urun_Adi', 'Fabrika']
+
+
+class ProductPriceIndex:
+    """
+    (Urun_Adi, Fabrika) → tarihe göre sıralı fiyat geçmişi indeksi.
+
+    Veri sürümü başına bir kez kurulur. Sıralama, önceki
+    `sort_values('Kayit_Tarihi', ascending=False)` davranışıyla aynıdır:
+    en yeni kayıt önce, aynı tarihliler dosya sırasında, tarihsizler en sonda.
+    En son fiyat O(1), tarih aralığı dilimleri O(log n) ile bulunur.
+    """
+
+    def __init__(self, df_products):
+        ordered = df_products.sort_values('Kayit_Tarihi', ascending=False, kind='stable')
+        self.frame = ordered
+        self._prices = ordered['NTS_Maliyet_TL'].to_numpy()
+        self._dates = ordered['Kayit_Tarihi'].array
+
+        if ordered.empty:
+            self._positions = {}
+            self._product_first = {}
+        else:
+            self._positions = ordered.groupby(INDEX_KEY, sort=False).indices
+            self._product_first = {
+                urun: positions[0]
+                for urun, positions in ordered.groupby('Urun_Adi', sort=False).indices.items()
+            }
+
+        # Tarih aralığı aramaları için: her anahtarın tarihli kayıtları (azalan) → negatif ns (artan)
+        dates = pd.to_datetime(ordered['Kayit_Tarihi'], errors='coerce')
+        valid = dates.notna().to_numpy()
+        dates_ns = dates.to_numpy(dtype='datetime64[ns]').astype('int64')
+        self._date_keys = {
+            key: -dates_ns[positions[valid[positions]]]
+            for key, positions in self._positions.items()
+        }
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    def keys(self):
+        return self._positions.keys()
+
+    def latest(self, urun_adi, fabrika):
+        """En son (fiyat, kayıt tarihi); kayıt yoksa (None, None)"""
+        positions = self._positions.get((urun_adi, fabrika))
+        if positions is None:
+            return None, None
+        first = positions[0]
+        return self._prices[first], self._dates[first]
+
+    def latest_price(self, urun_adi, fabrika):
+        return self.latest(urun_adi, fabrika)[0]
+
+    def latest_product_date(self, urun_adi):
+        """Ürünün tüm fabrikalardaki en son kayıt tarihi"""
+        first = self._product_first.get(urun_adi)
+        if first is None:
+            return None
+        return self._dates[first]
+
+    def history(self, urun_adi, fabrika, start=None, end=None):
+        """
+        Ürün/fabrika fiyat geçmişi (en yeni önce).
+
+        start/end verilirse yalnızca [start, end] aralığındaki tarihli kayıtlar döner.
+        """
+        positions = self._positions.get((urun_adi, fabrika))
+        if positions is None:
+            return self.frame.iloc[0:0]
+        if start is not None or end is not None:
+            keys = self._date_keys[(urun_adi, fabrika)]
+            lo = 0 if end is None else np.searchsorted(keys, -pd.Timestamp(end).as_unit('ns').value, side='left')
+            hi = len(keys) if start is None else np.searchsorted(keys, -pd.Timestamp(start).as_unit('ns').value, side='right')
+            positions = positions[lo:hi]
+        return self.frame.iloc[positions]
+
+    def latest_rows(self):
+        """Her (ürün, fabrika) için en son kaydı içeren DataFrame"""
+        if not self._positions:
+            return self.frame.iloc[0:0]
+        firsts = np.fromiter((positions[0] for positions in self._positions.values()), dtype=np.intp)
+        return self.frame.iloc[np.sort(firsts)]
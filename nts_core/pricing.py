@@ -0,0 +1,115 @@
+"""
+Tekil fiyat hesaplama (API /api/calculate ve `python -m nts_core quote` ortak yolu).
+
+Manuel seçimde (fabrika + firma + araç) tek hat fiyatlanır; aksi halde en ucuz
+rota bulunur. Rota matrisi verilmişse ve marj > -100 ise (sıralama maliyetle
+aynıdır) sonuç matristen okunur, yoksa RouteQuote ile hesaplanır.
+"""
+import math
+from contextlib import nullcontext
+
+from .loaders import price_index
+from .quote import CALCULATED_COLUMNS, RouteQuote, quote_columns
+
+DEFAULT_MARGIN = 15.0
+
+
+class PricingError(Exception):
+    """Hesaplama yapılamadı; `status` HTTP karşılığıdır"""
+
+    def __init__(self, message, status=404):
+        super().__init__(message)
+        self.status = status
+
+
+def _no_stage(name):
+    return nullcontext()
+
+
+def calculation_result(row, snapshot):
+    """Hesaplama motoru satırını API yanıt biçimine çevir"""
+    return {
+        'Fabrika': row['Fabrika'],
+        'Firma': row['Firma'],
+        'Arac': row['Arac'],
+        'NTS_TL': float(row['NTS_TL']),
+        'Nakliye_TL': float(row['Nakliye_TL']),
+        'Toplam_Maliyet_TL': float(row['Toplam_Maliyet_TL']),
+        'Satis_TL': float(row['Satis_TL']),
+        'Satis_USD_KG': float(row['Satis_USD_KG']),
+        'Satis_EUR_KG': float(row['Satis_EUR_KG']),
+        'Satis_CHF_KG': float(row['Satis_CHF_KG']),
+        'is_cheapest': True,
+        'data_version': snapshot.version
+    }
+
+
+def parse_margin(value, default=DEFAULT_MARGIN):
+    """Kâr marjını sayıya çevir (None → varsayılan); geçersizse PricingError (400)"""
+    try:
+        margin = float(default if value is None else value)
+    except (TypeError, ValueError):
+        raise PricingError('Invalid profit_margin', 400)
+    if math.isnan(margin):
+        raise PricingError('Invalid profit_margin', 400)
+    return margin
+
+
+def calculate(snapshot, product, city, profit_margin=DEFAULT_MARGIN, factory=None, shipping_company=None,
+              vehicle_type=None, route_matrix=None, stage=_no_stage):
+    """
+    Tek ürün/şehir için fiyat hesapla.
+
+    Args:
+        snapshot: PricingSnapshot (kurlar snapshot'tan alınır)
+        route_matrix: En ucuz rota matrisini döndüren fonksiyon (isteğe bağlı)
+        stage: Aşama süresi ölçen bağlam yöneticisi fabrikası, `stage(ad)`
+
+    Returns:
+        dict: calculation_result biçiminde sonuç
+
+    Raises:
+        PricingError: Eksik/geçersiz girdi (400), ürün/hat bulunamadı veya geçerli hesaplama yok
+    """
+    if not product or not city:
+        raise PricingError('Product and city are required', 400)
+    profit_margin = parse_margin(profit_margin)
+
+    with stage('index'):
+        urun_index = price_index(snapshot)
+    df_shipping = snapshot.shipping
+    rates = snapshot.rates
+
+    # Manuel seçim varsa
+    if factory and shipping_company and vehicle_type:
+        with stage('lookup'):
+            nts_cost = urun_index.latest_price(product, factory)
+        if nts_cost is None:
+            raise PricingError('Product not found')
+
+        with stage('filter'):
+            shipping_data = df_shipping[
+                (df_shipping['Sehir'] == city) &
+                (df_shipping['Fabrika'] == factory) &
+                (df_shipping['Firma'] == shipping_company) &
+                (df_shipping['Arac_Tipi'] == vehicle_type)
+            ]
+        if shipping_data.empty:
+            raise PricingError('Shipping option not found')
+
+        with stage('quote'):
+            columns = quote_columns([nts_cost], shipping_data['Fiyat_TL_KG'].to_numpy()[:1], profit_margin, rates)
+            row = {'Fabrika': factory, 'Firma': shipping_company, 'Arac': vehicle_type}
+            row.update({key: columns[key][0].item() for key in CALCULATED_COLUMNS})
+        return calculation_result(row, snapshot)
+
+    # Otomatik - en ucuz seçenek
+    with stage('route'):
+        if route_matrix is not None and profit_margin > -100:
+            row = route_matrix().cheapest(product, city, profit_margin, rates)
+        else:
+            quote = RouteQuote(urun_index, df_shipping, product, city, profit_margin, rates)
+            row = quote.row(quote.best) if quote.best is not None else None
+    if row is None:
+        raise PricingError('No valid calculation found')
+    return calculation_result(row, snapshot)
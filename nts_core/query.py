@@ -0,0 +1,102 @@
+"""
+API listeleri için sıralı görünüm, anahtar tabanlı (keyset) sayfalama ve kolon seçimi.
+
+İmleç, son döndürülen satırın sıralama anahtarını taşır; veri sürümü
+değişse bile sayfalama kaldığı anahtardan devam eder (satır atlanmaz,
+tekrar edilmez).
+"""
+import base64
+import json
+from bisect import bisect_right
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(key):
+    raw = json.dumps(list(key), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """İmleci sıralama anahtarına çevir; geçersizse ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        key = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError('Invalid cursor') from e
+    if not isinstance(key, list):
+        raise ValueError('Invalid cursor')
+    return tuple(key)
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE):
+    if value is None:
+        return default
+    limit = int(value)
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def parse_fields(value, columns):
+    """`fields=a,b` parametresini doğrula; verilmezse None (tüm kolonlar)"""
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in columns]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+class SortedView:
+    """
+    DataFrame'in sabit sıralı görünümü; snapshot başına bir kez kurulur.
+
+    Sıralama anahtarı verilen kolonlar + (isteğe bağlı) azalan tarih + kaynak
+    satır numarasıdır, böylece her satırın anahtarı tekildir.
+    """
+
+    def __init__(self, df, key_columns, date_column=None):
+        parts = [df[column].astype(str).tolist() for column in key_columns]
+        if date_column is not None:
+            # En yeni önce; tarihsizler en sonda
+            dates = pd.to_datetime(df[date_column], errors='coerce')
+            ns = dates.to_numpy(dtype='datetime64[ns]').astype('int64')
+            ns = np.where(dates.isna().to_numpy(), np.iinfo('int64').min + 1, ns)
+            parts.append((-ns).tolist())
+        parts.append(range(len(df)))
+        keys = list(zip(*parts))
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self.frame = df.iloc[order]
+        self.keys = [keys[i] for i in order]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def page(self, mask=None, limit=DEFAULT_PAGE_SIZE, after=None):
+        """
+        `after` anahtarından sonraki en fazla `limit` satır.
+
+        Args:
+            mask: Görünüm sırasındaki boolean filtre (None → tümü)
+            limit: Sayfa boyutu (None → kalan tüm satırlar)
+
+        Returns:
+            (DataFrame, sonraki imleç ya da None)
+        """
+        positions = np.arange(len(self.keys)) if mask is None else np.flatnonzero(mask)
+        if after is not None:
+            try:
+                start = bisect_right(self.keys, after)
+            except TypeError as e:
+                raise ValueError('Invalid cursor') from e
+            positions = positions[np.searchsorted(positions, start):]
+        if limit is None or len(positions) <= limit:
+            return self.frame.iloc[positions], None
+        selected = positions[:limit]
+        return self.frame.iloc[selected], encode_cursor(self.keys[selected[-1]])
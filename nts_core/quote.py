@@ -0,0 +1,340 @@
+import numpy as np
+
+FACTORIES = ['TR14', 'TR15', 'TR16']
+DEFAULT_RATES = {'USD': 36.50, 'EUR': 38.20, 'CHF': 41.10}
+
+# find_cheapest_route satır sözlüklerinin anahtar sıraları (mevcut çıktı biçimi korunur)
+DISPLAY_COLUMNS = [
+    'NTS_TL', 'Nakliye_TL', 'Toplam_Maliyet_TL',
+    'Satis_USD_KG', 'Satis_EUR_KG', 'Satis_CHF_KG',
+    'Satis_TL_TON', 'Satis_USD_TON', 'Satis_EUR_TON', 'Satis_CHF_TON',
+    'Satis_TL',
+]
+CALCULATED_COLUMNS = [
+    'NTS_TL', 'Nakliye_TL', 'Toplam_Maliyet_TL', 'Satis_TL',
+    'Satis_USD_KG', 'Satis_EUR_KG', 'Satis_CHF_KG',
+    'Satis_USD_TON', 'Satis_EUR_TON', 'Satis_CHF_TON', 'Satis_TL_TON',
+]
+
+
+def resolve_rates(exchange_rates):
+    """USD/EUR/CHF kurlarını boş/0 değerlerde varsayılana düşerek döndür"""
+    return tuple(exchange_rates.get(code, default) or default for code, default in DEFAULT_RATES.items())
+
+
+def quote_columns(nts_tl, nakliye_tl, kar_marji, exchange_rates):
+    """
+    Tüm aday nakliye hatları için fiyatları tek seferde hesapla.
+
+    Args:
+        nts_tl: NTS maliyetleri (TL/Kg), dizi veya skaler
+        nakliye_tl: Nakliye maliyetleri (TL/Kg), dizi
+        kar_marji: Kâr marjı (%), skaler veya dizi
+        exchange_rates: Kur sözlüğü
+
+    Returns:
+        dict: Kolon adı → numpy dizisi
+    """
+    usd_rate, eur_rate, chf_rate = resolve_rates(exchange_rates)
+    nts = np.asarray(nts_tl, dtype=float)
+    nakliye = np.asarray(nakliye_tl, dtype=float)
+    toplam = nts + nakliye
+    satis = toplam * (1 + np.asarray(kar_marji, dtype=float) / 100)
+    satis_usd = satis / usd_rate
+    satis_eur = satis / eur_rate
+    satis_chf = satis / chf_rate
+    return {
+        'NTS_TL': np.broadcast_to(nts, toplam.shape),
+        'Nakliye_TL': nakliye,
+        'Toplam_Maliyet_TL': toplam,
+        'Satis_TL': satis,
+        'Satis_USD_KG': satis_usd,
+        'Satis_EUR_KG': satis_eur,
+        'Satis_CHF_KG': satis_chf,
+        'Satis_TL_TON': satis * 1000,
+        'Satis_USD_TON': satis_usd * 1000,
+        'Satis_EUR_TON': satis_eur * 1000,
+        'Satis_CHF_TON': satis_chf * 1000,
+    }
+
+
+def order_routes(candidates, group, value):
+    """
+    Geçerli aday rotaları ortak kurala göre sırala; her grubun ilk satırı en ucuzudur.
+
+    Kural (tüm uç noktalar için aynı): `value` NaN olan adaylar geçerli
+    hesaplama sayılmaz ve atılır; kalanlar `value` artan, eşitlikte fabrika
+    sırası (`_rank`), sonra nakliye dosyasındaki hat sırası (`_lane`).
+    Geçerli adayı kalmayan grup sonuçta hiç yer almaz.
+    """
+    candidates = candidates[candidates[value].notna()]
+    return candidates.sort_values(list(group) + [value, '_rank', '_lane'], kind='stable')
+
+
+def cheapest_position(satis_tl):
+    """
+    En düşük satış fiyatının konumu; `order_routes` kuralı (NaN aday geçersiz).
+
+    Adaylar fabrika ve hat sırasında verilir, eşitlikte ilk sıradaki seçilir.
+    Aday yoksa ya da hepsi NaN ise None (geçerli hesaplama yok).
+    """
+    satis_tl = np.asarray(satis_tl, dtype=float)
+    if satis_tl.size == 0 or np.isnan(satis_tl).all():
+        return None
+    return int(np.nanargmin(satis_tl))
+
+
+def _empty_row(fabrika, firma='-', arac='-', nts_tl='-'):
+    return {
+        'Fabrika': fabrika,
+        'Firma': firma,
+        'Arac': arac,
+        'NTS_TL': nts_tl,
+        'Nakliye_TL': '-',
+        'Toplam_Maliyet_TL': '-',
+        'Satis_USD_KG': '-',
+        'Satis_EUR_KG': '-',
+        'Satis_CHF_KG': '-',
+        'Satis_TL_TON': '-',
+        'Satis_USD_TON': '-',
+        'Satis_EUR_TON': '-',
+        'Satis_CHF_TON': '-',
+        'Satis_TL': None,
+        'HasPrice': False
+    }
+
+
+def _quote_rows(fabrika, firmalar, araclar, columns, keys, has_price):
+    values = [columns[key].tolist() for key in keys]
+    rows = []
+    for i, (firma, arac) in enumerate(zip(firmalar, araclar)):
+        row = {'Fabrika': fabrika, 'Firma': firma, 'Arac': arac}
+        for key, column in zip(keys, values):
+            row[key] = column[i]
+        if has_price:
+            row['HasPrice'] = True
+        rows.append(row)
+    return rows
+
+
+def route_prices(urun_index, urun_adi, fabrikalar=FACTORIES, secili_fiyatlar=None):
+    """Fabrika → kullanılacak NTS fiyatı (seçili fiyat yoksa en son fiyat, kayıt yoksa None)"""
+    secili_fiyatlar = secili_fiyatlar or {}
+    return {
+        fabrika: secili_fiyatlar[fabrika] if fabrika in secili_fiyatlar else urun_index.latest_price(urun_adi, fabrika)
+        for fabrika in fabrikalar
+    }
+
+
+class RouteQuote:
+    """
+    Bir ürün/şehir için tüm aday hatların kolon bazlı fiyat sonucu.
+
+    Adaylar fabrika sırasına göre, her fabrikanın hatları dosya sırasında dizilir;
+    `best` en ucuz adayın konumudur (geçerli aday yoksa None).
+    """
+
+    def __init__(self, urun_index, df_shipping, urun_adi, sehir, kar_marji, exchange_rates, secili_fiyatlar=None, fabrikalar=FACTORIES):
+        self.fabrikalar = list(fabrikalar)
+        self.nts_fiyatlari = route_prices(urun_index, urun_adi, self.fabrikalar, secili_fiyatlar)
+
+        ilgili_nakliye = df_shipping[df_shipping['Sehir'] == sehir]
+        lane_fabrika = ilgili_nakliye['Fabrika'].to_numpy()
+        self.lane_firma = ilgili_nakliye['Firma'].to_numpy()
+        self.lane_arac = ilgili_nakliye['Arac_Tipi'].to_numpy()
+        self.lane_groups = {fabrika: np.flatnonzero(lane_fabrika == fabrika) for fabrika in self.fabrikalar}
+
+        # Fiyatı olan fabrikaların hatları, fabrika sırasına göre (hat sırası korunur)
+        priced = [fabrika for fabrika in self.fabrikalar if self.nts_fiyatlari[fabrika] is not None]
+        self.positions = np.concatenate([self.lane_groups[fabrika] for fabrika in priced] or [np.array([], dtype=np.intp)])
+        self.fabrika = np.concatenate([np.full(len(self.lane_groups[fabrika]), fabrika, dtype=object) for fabrika in priced] or [np.array([], dtype=object)])
+        nts_values = np.concatenate([np.full(len(self.lane_groups[fabrika]), self.nts_fiyatlari[fabrika], dtype=float) for fabrika in priced] or [np.array([])])
+        lane_fiyat = ilgili_nakliye['Fiyat_TL_KG'].to_numpy()
+        self.columns = quote_columns(nts_values, lane_fiyat[self.positions], kar_marji, exchange_rates)
+        self.best = cheapest_position(self.columns['Satis_TL'])
+
+    def __len__(self):
+        return len(self.positions)
+
+    def row(self, i, keys=CALCULATED_COLUMNS):
+        """i. adayı sözlük olarak döndür"""
+        lane = self.positions[i]
+        row = {'Fabrika': self.fabrika[i], 'Firma': self.lane_firma[lane], 'Arac': self.lane_arac[lane]}
+        for key in keys:
+            row[key] = self.columns[key][i].item()
+        return row
+
+
+def find_cheapest_route(urun_index, df_shipping, urun_adi, sehir, kar_marji, exchange_rates, secili_fiyatlar=None, manuel_nakliye=None):
+    """
+    Ürün ve varış şehri için tüm fabrika/nakliye seçeneklerini fiyatla, en ucuzunu bul.
+
+    Returns:
+        tuple: (en_ucuz, display_rows, exchange_rates)
+    """
+    # Manuel nakliye seçimi varsa, sadece o seçeneği hesapla
+    if manuel_nakliye:
+        nts_fiyatlari = route_prices(urun_index, urun_adi, FACTORIES, secili_fiyatlar)
+        fabrika = manuel_nakliye['fabrika']
+        if fabrika in nts_fiyatlari:
+            nts_tl = nts_fiyatlari[fabrika]
+        else:
+            nts_tl = route_prices(urun_index, urun_adi, [fabrika], secili_fiyatlar)[fabrika]
+
+        if nts_tl is not None:
+            columns = quote_columns([nts_tl], [manuel_nakliye['fiyat']], kar_marji, exchange_rates)
+            columns['NTS_TL'] = np.array([nts_tl], dtype=object)
+            columns['Nakliye_TL'] = np.array([manuel_nakliye['fiyat']], dtype=object)
+            manuel_row = _quote_rows(fabrika, [manuel_nakliye['firma']], [manuel_nakliye['arac']],
+                                     columns, DISPLAY_COLUMNS, has_price=True)[0]
+
+            # Tüm fabrikalar için display göster ama sadece seçili manuel hesaplama
+            display_rows = []
+            for fab in FACTORIES:
+                if fab == fabrika:
+                    display_rows.append(manuel_row)
+                else:
+                    fab_nts = nts_fiyatlari[fab]
+                    display_rows.append(_empty_row(fab, nts_tl=fab_nts if fab_nts is not None else '-'))
+
+            return manuel_row, display_rows, exchange_rates
+
+    # Otomatik mod - tüm seçenekleri tek seferde hesapla
+    quote = RouteQuote(urun_index, df_shipping, urun_adi, sehir, kar_marji, exchange_rates, secili_fiyatlar)
+
+    display_rows = []
+    calculated_rows = []
+    offset = 0
+    for fabrika in quote.fabrikalar:
+        group = quote.lane_groups[fabrika]
+        nts_tl = quote.nts_fiyatlari[fabrika]
+
+        # Eğer nakliye kaydı yoksa bile satır ekle (boş gösterim)
+        if len(group) == 0:
+            display_rows.append(_empty_row(fabrika, nts_tl=nts_tl if nts_tl is not None else '-'))
+            continue
+
+        firmalar = quote.lane_firma[group].tolist()
+        araclar = quote.lane_arac[group].tolist()
+        if nts_tl is None:
+            display_rows.extend(_empty_row(fabrika, firma, arac) for firma, arac in zip(firmalar, araclar))
+            continue
+
+        segment = {key: values[offset:offset + len(group)] for key, values in quote.columns.items()}
+        offset += len(group)
+        display_rows.extend(_quote_rows(fabrika, firmalar, araclar, segment, DISPLAY_COLUMNS, has_price=True))
+        calculated_rows.extend(_quote_rows(fabrika, firmalar, araclar, segment, CALCULATED_COLUMNS, has_price=False))
+
+    en_ucuz = calculated_rows[quote.best] if quote.best is not None else None
+
+    return en_ucuz, display_rows, exchange_rates
+
+
+BATCH_RESULT_COLUMNS = ['Fabrika', 'Firma', 'Arac'] + CALCULATED_COLUMNS
+
+
+def _first_cheapest(candidates):
+    """Her istek (`_req`) için en ucuz adayın satır etiketi (`order_routes` kuralı)"""
+    return order_routes(candidates, ['_req'], 'Satis_TL').drop_duplicates('_req').index
+
+
+def quote_batch(urun_index, df_shipping, items, exchange_rates, default_margin=15.0):
+    """
+    Çok sayıda ürün × şehir hesaplamasını tek bir vektörel birleştirmeyle çöz.
+
+    Her satır /api/calculate ile aynı kurallarla hesaplanır: fabrika, firma ve
+    araç tipinin üçü de verilmişse manuel seçim, aksi halde en ucuz seçenek.
+    Hatalı satırlar tüm batch'i durdurmaz; `error` ve `status` kolonlarıyla döner.
+
+    Args:
+        urun_index: ProductPriceIndex
+        df_shipping: Nakliye hatları
+        items: İstek sözlükleri listesi (product, city, profit_margin, factory, shipping_company, vehicle_type)
+        exchange_rates: Kur sözlüğü
+        default_margin: profit_margin verilmeyen satırlar için marj
+
+    Returns:
+        pd.DataFrame: Girdi sırasında, `index` kolonlu sonuç tablosu
+    """
+    import pandas as pd
+
+    fields = ['product', 'city', 'profit_margin', 'factory', 'shipping_company', 'vehicle_type']
+    req = pd.DataFrame.from_records(
+        [{field: item.get(field) if isinstance(item, dict) else None for field in fields} for item in items],
+        columns=fields,
+    )
+    req['_req'] = np.arange(len(req))
+    results = pd.DataFrame({'index': req['_req']})
+    for column in BATCH_RESULT_COLUMNS:
+        results[column] = None
+    results['error'] = None
+    results['status'] = 200
+
+    def fail(mask, message, status):
+        target = mask & results['error'].isna()
+        results.loc[target, 'error'] = message
+        results.loc[target, 'status'] = status
+
+    def filled(column):
+        return req[column].notna() & (req[column].astype(str) != '')
+
+    fail(~(filled('product') & filled('city')), 'Product and city are required', 400)
+    margin = pd.to_numeric(req['profit_margin'].where(req['profit_margin'].notna(), default_margin), errors='coerce')
+    fail(margin.isna(), 'Invalid profit_margin', 400)
+    req['_margin'] = margin
+
+    valid = req[results['error'].isna()]
+    manual_mask = filled('factory') & filled('shipping_company') & filled('vehicle_type')
+
+    prices = urun_index.latest_rows()[['Urun_Adi', 'Fabrika', 'NTS_Maliyet_TL']]
+    lanes = df_shipping[['Sehir', 'Firma', 'Fabrika', 'Arac_Tipi', 'Fiyat_TL_KG']].copy()
+    lanes['_lane'] = np.arange(len(lanes))
+
+    chosen = []
+
+    # Manuel seçim: ürün fiyatı → ilk eşleşen nakliye hattı
+    manual = valid[manual_mask.loc[valid.index]]
+    if not manual.empty:
+        priced = manual.merge(prices, left_on=['product', 'factory'], right_on=['Urun_Adi', 'Fabrika'],
+                              how='left', indicator=True)
+        found = priced['_merge'] == 'both'
+        fail(req['_req'].isin(priced.loc[~found, '_req']), 'Product not found', 404)
+        priced = priced[found].drop(columns=['Urun_Adi', 'Fabrika', '_merge'])
+        matched = priced.merge(
+            lanes, left_on=['city', 'factory', 'shipping_company', 'vehicle_type'],
+            right_on=['Sehir', 'Fabrika', 'Firma', 'Arac_Tipi'], how='inner',
+        ).sort_values(['_req', '_lane'], kind='stable').drop_duplicates('_req')
+        fail(req['_req'].isin(priced['_req']) & ~req['_req'].isin(matched['_req']), 'Shipping option not found', 404)
+        matched = matched.assign(Fabrika=matched['factory'], Firma=matched['shipping_company'], Arac_Tipi=matched['vehicle_type'])
+        chosen.append(matched)
+
+    # Otomatik: şehir hatları × ürün fiyatları, fabrika ve hat sırasıyla
+    auto = valid[~manual_mask.loc[valid.index]]
+    if not auto.empty:
+        factory_rank = {fabrika: rank for rank, fabrika in enumerate(FACTORIES)}
+        auto_lanes = lanes[lanes['Fabrika'].isin(FACTORIES)].copy()
+        auto_lanes['_rank'] = auto_lanes['Fabrika'].map(factory_rank)
+        candidates = auto[['_req', 'product', 'city', '_margin']].merge(
+            auto_lanes, left_on='city', right_on='Sehir', how='inner',
+        ).merge(
+            prices, left_on=['product', 'Fabrika'], right_on=['Urun_Adi', 'Fabrika'], how='inner',
+        ).sort_values(['_req', '_rank', '_lane'], kind='stable').reset_index(drop=True)
+        columns = quote_columns(candidates['NTS_Maliyet_TL'].to_numpy(), candidates['Fiyat_TL_KG'].to_numpy(),
+                                candidates['_margin'].to_numpy(), exchange_rates)
+        candidates['Satis_TL'] = columns['Satis_TL']
+        best = candidates.loc[_first_cheapest(candidates)]
+        fail(req['_req'].isin(auto['_req']) & ~req['_req'].isin(best['_req']), 'No valid calculation found', 404)
+        chosen.append(best)
+
+    if chosen:
+        best = pd.concat(chosen, ignore_index=True)
+        columns = quote_columns(best['NTS_Maliyet_TL'].to_numpy(), best['Fiyat_TL_KG'].to_numpy(),
+                                best['_margin'].to_numpy(), exchange_rates)
+        rows = best['_req'].to_numpy()
+        results.loc[rows, 'Fabrika'] = best['Fabrika'].to_numpy()
+        results.loc[rows, 'Firma'] = best['Firma'].to_numpy()
+        results.loc[rows, 'Arac'] = best['Arac_Tipi'].to_numpy()
+        for key in CALCULATED_COLUMNS:
+            results.loc[rows, key] = columns[key]
+
+    return results
@@ -0,0 +1,436 @@
+"""
+TCMB döviz satış kurları için kalıcı, okuma öncelikli (read-through) önbellek.
+
+Bir hedef tarihin kuru önce yerel geçmişten (tcmb_history) çözülür. TCMB'nin
+kur dosyası yayımlamadığı günler (resmi tatiller) negatif önbellekte
+(tcmb_missing) tutulur: geçmiş tarihler kalıcı olarak, bugün ise kısa bir süre
+için (dosya gün içinde yayımlanır). Ağa yalnızca yerelde bilinmeyen iş günleri
+için çıkılır.
+
+Sayfa yüklemesi `get_current_rates` ile ağı hiç beklemez: eksik gün varsa
+eldeki en yakın kur döner ve güncelleme arka planda tek seferlik yapılır.
+
+Geçmiş dönem doldurma (backfill):
+    python -m nts_core.rates backfill --start 2024-01-01 --end 2024-12-31
+    python -m nts_core.rates fixture-server --port 8765   # çevrimdışı test sunucusu
+    python -m nts_core.rates backfill --start 2024-01-01 --end 2024-03-31 --base-url http://127.0.0.1:8765
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .storage import get_storage
+from .write_coordinator import file_lock, write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+TCMB_BASE_URL = os.environ.get('NTS_TCMB_URL', 'https://www.tcmb.gov.tr/kurlar')
+CURRENCIES = ('USD', 'EUR', 'CHF')
+MAX_LOOKBACK_DAYS = 15  # 15 güne kadar geriye git
+MAX_BUSINESS_DAYS = 10  # Maksimum 10 iş günü dene
+TODAY_MISS_TTL = 30 * 60
+BACKFILL_WORKERS = 8
+MAX_BACKFILL_DAYS = 731
+
+EXCHANGE_RATES_FILE = 'exchange_rates.json'
+DEFAULT_EXCHANGE_RATES = {
+    'TL': 1.0, 'USD': 36.50, 'EUR': 38.20, 'CHF': 41.10,
+    'date': 'Varsayılan', 'source_date': 'Varsayılan', 'is_fallback': True,
+}
+
+# fetch_tcmb sonuç durumları
+FOUND = 'found'
+MISSING = 'missing'  # TCMB o gün için dosya yayımlamamış (tatil / henüz yayımlanmadı)
+FAILED = 'failed'    # Ağ veya ayrıştırma hatası; negatif önbelleğe alınmaz
+
+
+def save_exchange_rates(rates):
+    """Döviz kurlarını kaydet"""
+    with file_lock(EXCHANGE_RATES_FILE):
+        write_json_atomic(rates, EXCHANGE_RATES_FILE)
+
+
+def load_exchange_rates():
+    """Kayıtlı döviz kurlarını yükle"""
+    if os.path.exists(EXCHANGE_RATES_FILE):
+        with open(EXCHANGE_RATES_FILE, 'r', encoding='utf-8') as f:
+            try:
+                return json.load(f)
+            except json.JSONDecodeError:
+                pass
+    # Varsayılan kurlar
+    return dict(DEFAULT_EXCHANGE_RATES)
+
+
+def parse_tcmb_xml(content, date_obj):
+    """TCMB kur XML'inden USD/EUR/CHF döviz satış kurlarını çıkar; bulunamazsa None"""
+    try:
+        root = ET.fromstring(content)
+    except ET.ParseError:
+        return None
+    rates = {}
+    for currency in root.findall('Currency'):
+        code = currency.get('CurrencyCode')
+        if code in CURRENCIES:
+            forex_selling = currency.find('ForexSelling')
+            if forex_selling is not None and forex_selling.text:
+                rates[code] = float(forex_selling.text)
+    if not rates:
+        return None
+    rates['TL'] = 1.0
+    rates['date'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    rates['source_date'] = date_obj.strftime('%Y-%m-%d')
+    return rates
+
+
+def tcmb_url(date_obj, base_url=None):
+    return f"{base_url or TCMB_BASE_URL}/{date_obj.strftime('%Y%m')}/{date_obj.strftime('%d%m%Y')}.xml"
+
+
+def make_session(pool_size=BACKFILL_WORKERS, retries=3, backoff=0.5):
+    """Bağlantı havuzlu, geçici hatalarda üstel beklemeyle tekrar deneyen oturum"""
+    retry = Retry(
+        total=retries, connect=retries, read=retries, backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504), allowed_methods=frozenset(['GET']),
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def fetch_tcmb(date_obj, timeout=10, session=None, base_url=None):
+    """
+    Tek bir günün kur dosyasını TCMB'den çek.
+
+    Returns:
+        tuple: (FOUND, rates) / (MISSING, None) / (FAILED, None)
+    """
+    url = tcmb_url(date_obj, base_url)
+    try:
+        response = (session or requests).get(url, timeout=timeout)
+    except requests.RequestException:
+        return FAILED, None
+    if response.status_code == 404:
+        return MISSING, None
+    if response.status_code != 200:
+        return FAILED, None
+    rates = parse_tcmb_xml(response.content, date_obj)
+    return (FOUND, rates) if rates else (FAILED, None)
+
+
+def _as_date(value):
+    if value is None:
+        return date.today()
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def business_days_back(target_date):
+    """Hedef tarihten geriye (gün farkı, iş günü) çiftleri; hafta sonları atlanır"""
+    attempts = 0
+    for back in range(0, MAX_LOOKBACK_DAYS):
+        candidate = target_date - timedelta(days=back)
+        if candidate.weekday() >= 5:  # Hafta sonu ise atla
+            continue
+        attempts += 1
+        if attempts > MAX_BUSINESS_DAYS:
+            break
+        yield back, candidate
+
+
+def _for_target(rates, target_date, back, candidate):
+    result = dict(rates)
+    result['is_fallback'] = back > 0
+    result['fallback_days'] = back
+    result['target_date'] = target_date.strftime('%Y-%m-%d')
+    if back > 0:
+        result['used_date'] = candidate.strftime('%Y-%m-%d')
+    else:
+        result.pop('used_date', None)
+    return result
+
+
+class TcmbRateCache:
+    """
+    Tarih → kur çözümleyicisi.
+
+    Geçmiş ve negatif önbellek depolama katmanındaki JSON belgelerinde
+    tutulur; bellekteki kopya depolama imzası değiştiğinde yenilenir.
+    """
+
+    def __init__(self, storage=None, fetcher=fetch_tcmb, today_miss_ttl=TODAY_MISS_TTL):
+        self._storage = storage
+        self._fetcher = fetcher
+        self.today_miss_ttl = today_miss_ttl
+        self._signature = None
+        self._history = {}
+        self._missing = {}
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        self._published = None
+
+    @property
+    def storage(self):
+        return self._storage or get_storage()
+
+    def _load(self):
+        storage = self.storage
+        signature = storage.signature(['tcmb_history', 'tcmb_missing'])
+        if signature != self._signature:
+            with self._lock:
+                if signature != self._signature:
+                    self._history = storage.read_json('tcmb_history')
+                    self._missing = storage.read_json('tcmb_missing')
+                    self._signature = signature
+        return self._history, self._missing
+
+    def cached(self, date_obj):
+        """Yerel geçmişte verilen tarihin kuru (yoksa None)"""
+        history, _ = self._load()
+        return history.get(_as_date(date_obj).strftime('%Y-%m-%d'))
+
+    def is_known_missing(self, date_obj, today=None):
+        """
+        Gün TCMB'de yayımlanmamış olarak biliniyor mu.
+
+        Kayıt yalnızca gün bittikten sonra yapılan kontrolden geliyorsa kalıcıdır
+        (tatil). Gün içinde (yayım öncesi) kaydedilenler o gün TTL boyunca geçerlidir,
+        sonraki günlerde yeniden kontrol edilir.
+        """
+        _, missing = self._load()
+        key = date_obj.strftime('%Y-%m-%d')
+        entry = missing.get(key)
+        if entry is None:
+            return False
+        checked_on = entry.get('checked_on')
+        if checked_on is not None and checked_on > key:
+            return True
+        if date_obj < (today or date.today()):
+            return False
+        return time.time() - entry.get('checked_at', 0) < self.today_miss_ttl
+
+    def store(self, date_obj, status, rates=None):
+        """Ağdan alınan sonucu kalıcı önbelleğe yaz (FAILED yazılmaz)"""
+        self.store_many([(date_obj, status, rates)])
+
+    def store_many(self, results):
+        """(tarih, durum, kurlar) sonuçlarını veri kümesi başına tek yazmayla kaydet"""
+        found, missing = {}, {}
+        checked_at = time.time()
+        checked_on = date.today().strftime('%Y-%m-%d')
+        for date_obj, status, rates in results:
+            key = date_obj.strftime('%Y-%m-%d')
+            if status == FOUND:
+                found[key] = rates
+            elif status == MISSING:
+                missing[key] = {'checked_at': checked_at, 'checked_on': checked_on}
+        if found:
+            self.storage.put_json_items('tcmb_history', found)
+        if missing:
+            self.storage.put_json_items('tcmb_missing', missing)
+
+    def _resolve(self, target_date, allow_network):
+        """
+        Returns:
+            tuple: (kurlar veya None, ağdan doğrulanması gereken iş günleri)
+        """
+        today = date.today()
+        history, _ = self._load()
+        pending = []
+        for back, candidate in business_days_back(target_date):
+            key = candidate.strftime('%Y-%m-%d')
+            rates = history.get(key)
+            if rates is not None:
+                return self._publish(_for_target(rates, target_date, back, candidate), target_date, today), pending
+            if candidate > today or self.is_known_missing(candidate, today):
+                continue
+            if not allow_network:
+                pending.append(candidate)
+                continue
+            status, fetched = self._fetcher(candidate)
+            self.store(candidate, status, fetched)
+            if status == FOUND:
+                return self._publish(_for_target(fetched, target_date, back, candidate), target_date, today), pending
+            if status == FAILED:
+                pending.append(candidate)
+        return None, pending
+
+    def _publish(self, rates, target_date, today):
+        """
+        Bugünün kuru `exchange_rates.json`'a yazılır (API snapshot'ı ve /api/rates bu dosyayı okur).
+
+        Kur ağdan da geçmişten de (ör. backfill, başka süreç) gelse yazılır;
+        dosya zaten aynıysa dokunulmaz.
+        """
+        if target_date == today and rates != self._published:
+            if load_exchange_rates() != rates:
+                save_exchange_rates(rates)
+            self._published = rates
+        return rates
+
+    def get_rates(self, target_date=None):
+        """Hedef tarihin kuru; gerekirse TCMB'ye gider (bloklar)"""
+        rates, _ = self._resolve(_as_date(target_date), allow_network=True)
+        return rates if rates is not None else self._fallback()
+
+    def get_current_rates(self, target_date=None):
+        """
+        Ağı beklemeden eldeki en güncel kur.
+
+        Yerelde bilinmeyen iş günü varsa arka planda tek seferlik güncelleme
+        başlatılır; sonuç sonraki yüklemede görünür.
+        """
+        target_date = _as_date(target_date)
+        rates, pending = self._resolve(target_date, allow_network=False)
+        if pending:
+            self.refresh_async(target_date)
+        return rates if rates is not None else self._fallback()
+
+    def refresh_async(self, target_date=None):
+        """Hedef tarih için arka plan güncellemesi başlat; zaten sürüyorsa False"""
+        target_date = _as_date(target_date)
+        key = target_date.strftime('%Y-%m-%d')
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                self._resolve(target_date, allow_network=True)
+            except Exception:
+                logger.exception("TCMB kur güncellemesi başarısız: %s", key)
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, name=f'tcmb-refresh-{key}', daemon=True).start()
+        return True
+
+    def backfill(self, start, end, workers=BACKFILL_WORKERS, base_url=None, force=False, timeout=10):
+        """
+        [start, end] aralığındaki iş günlerinin kurlarını eşzamanlı çek.
+
+        Yerelde bulunan veya tatil olarak bilinen günler atlanır (force=True
+        hariç). İstekler paylaşılan bir bağlantı havuzu üzerinden gider;
+        sonuçlar en sonda tek seferde yazılır.
+
+        Returns:
+            dict: Özet (istenen, atlanan, bulunan, eksik, hatalı günler, süre)
+        """
+        started = time.perf_counter()
+        start, end = _as_date(start), _as_date(end)
+        if end < start:
+            raise ValueError("Bitiş tarihi başlangıçtan önce olamaz")
+        if (end - start).days + 1 > MAX_BACKFILL_DAYS:
+            raise ValueError(f"En fazla {MAX_BACKFILL_DAYS} günlük aralık doldurulabilir")
+
+        today = date.today()
+        history, _ = self._load()
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        days = [day for day in days if day.weekday() < 5 and day <= today]
+        if force:
+            todo = days
+        else:
+            todo = [
+                day for day in days
+                if day.strftime('%Y-%m-%d') not in history and not self.is_known_missing(day, today)
+            ]
+
+        results = []
+        if todo:
+            workers = max(1, min(workers, len(todo)))
+            with make_session(pool_size=workers) as session, ThreadPoolExecutor(max_workers=workers) as pool:
+                fetched = pool.map(lambda day: fetch_tcmb(day, timeout=timeout, session=session, base_url=base_url), todo)
+                results = [(day, status, rates) for day, (status, rates) in zip(todo, fetched)]
+            self.store_many(results)
+        if end >= today:
+            # Bugünün kuru geldiyse güncel kur dosyası da yenilenir
+            self._resolve(today, allow_network=False)
+
+        statuses = [status for _, status, _ in results]
+        return {
+            'start': start.strftime('%Y-%m-%d'),
+            'end': end.strftime('%Y-%m-%d'),
+            'business_days': len(days),
+            'skipped': len(days) - len(todo),
+            'found': statuses.count(FOUND),
+            'missing': statuses.count(MISSING),
+            'failed': [day.strftime('%Y-%m-%d') for day, status, _ in results if status == FAILED],
+            'seconds': round(time.perf_counter() - started, 3),
+        }
+
+    @staticmethod
+    def _fallback():
+        fallback = load_exchange_rates()
+        fallback['is_fallback'] = True
+        fallback.setdefault('source_date', 'Varsayılan')
+        return fallback
+
+
+rate_cache = TcmbRateCache()
+
+
+def get_tcmb_rates(target_date=None):
+    """
+    TCMB döviz satış kurlarını getir (yerel geçmiş → TCMB).
+
+    Args:
+        target_date: datetime.date veya None. None ise bugünün tarihi kullanılır.
+
+    Returns:
+        dict: Kurlar ve tarih bilgisi
+    """
+    return rate_cache.get_rates(target_date)
+
+
+def get_current_rates():
+    """Sayfa yüklemesi için bloklamayan güncel kurlar"""
+    return rate_cache.get_current_rates()
+
+
+def get_rates_for_date(date_obj):
+    """Kaydedilmiş TCMB geçmişinde verilen tarih için kur arar."""
+    return rate_cache.cached(date_obj)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='TCMB kur geçmişi araçları')
+    sub = parser.add_subparsers(dest='command', required=True)
+    backfill = sub.add_parser('backfill', help='Tarih aralığının kurlarını eşzamanlı çek ve kaydet')
+    backfill.add_argument('--start', required=True, type=date.fromisoformat, help='YYYY-MM-DD')
+    backfill.add_argument('--end', type=date.fromisoformat, default=None, help='YYYY-MM-DD (varsayılan: bugün)')
+    backfill.add_argument('--workers', type=int, default=BACKFILL_WORKERS)
+    backfill.add_argument('--base-url', default=None, help='TCMB yerine kullanılacak adres (ör. fixture sunucusu)')
+    backfill.add_argument('--force', action='store_true', help='Kayıtlı günleri de yeniden çek')
+    fixture = sub.add_parser('fixture-server', help='Çevrimdışı test için TCMB benzeri yerel sunucu')
+    fixture.add_argument('--host', default='127.0.0.1')
+    fixture.add_argument('--port', type=int, default=8765)
+    fixture.add_argument('--dir', default=None, help='YYYYMM/GGAAYYYY.xml düzeninde kayıtlı dosyalar (yoksa sentetik)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'backfill':
+        summary = rate_cache.backfill(args.start, args.end or date.today(), workers=args.workers,
+                                      base_url=args.base_url, force=args.force)
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    else:
+        from .tcmb_fixtures import serve
+        serve(args.host, args.port, args.dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Toplu ürün fiyat artışı: yeni fiyat kayıtları vektörel hesaplanır ve tek yazmayla eklenir."""
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from .storage import PRODUCT_DATE_FORMAT, get_storage
+
+
+def repriced_rows(latest, oran, tarih=None):
+    """
+    Son fiyat satırlarından (Urun_Adi, Fabrika, NTS_Maliyet_TL) %oran artışlı yeni kayıtlar üret.
+
+    Kolonlar `save_new_product` ile eklenen kayıtlarla aynıdır.
+    """
+    tarih = tarih or datetime.now()
+    yeni_fiyat = latest['NTS_Maliyet_TL'].to_numpy(dtype=float) * (1 + oran / 100)
+    return pd.DataFrame({
+        'Urun_Adi': latest['Urun_Adi'].to_numpy(),
+        'Fabrika': latest['Fabrika'].to_numpy(),
+        'NTS_Maliyet_TL': yeni_fiyat,
+        'Giris_Para_Birimi': 'TL',
+        'Giris_Fiyat': yeni_fiyat,
+        'Kayit_Tarihi': tarih.strftime(PRODUCT_DATE_FORMAT),
+        'Kur_USD': '',
+        'Kur_EUR': '',
+        'Kur_CHF': '',
+        'Kur_Tarihi': '',
+    })
+
+
+def bulk_reprice(latest, oran, tarih=None, storage=None):
+    """
+    Verilen son fiyat satırlarının tamamına %oran uygula ve tek seferde kaydet.
+
+    Returns:
+        dict: count, oran, old_avg, new_avg, seconds
+    """
+    started = time.perf_counter()
+    rows = repriced_rows(latest, oran, tarih)
+    if not rows.empty:
+        (storage or get_storage()).append_products(rows)
+    return {
+        'count': len(rows),
+        'oran': oran,
+        'old_avg': float(latest['NTS_Maliyet_TL'].mean()) if len(latest) else 0.0,
+        'new_avg': float(rows['NTS_Maliyet_TL'].mean()) if len(rows) else 0.0,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
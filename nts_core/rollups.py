@@ -0,0 +1,201 @@
+"""
+Hesaplama geçmişi özetleri (rollup): boyut başına sayı, ortalama kâr marjı ve ortalama satış TL/kg.
+
+Özetler `history_rollups` veri kümesinde hücre başına bir anahtarla tutulur
+("boyut␟değer" → [adet, marj toplamı, marj adedi, satış toplamı, satış adedi]).
+Her kayıt eklenirken yalnızca o kaydın dokunduğu hücreler güncellenir; okumalar
+geçmişe dokunmaz. Saklanan özet geçmişin imzasıyla eşleşmiyorsa (ör. satır
+silindi, başka bir süreç yazdı) geçmiş bir kez parça parça taranarak yeniden kurulur.
+
+Kayıt ekleme (imza kontrolü + ekleme + yeni imza) süreçler arası kilit
+altındadır; başka bir sürecin eklemesi yeni imzaya sayılmadan karışamaz.
+"""
+import math
+import threading
+
+import pandas as pd
+
+from .storage import HISTORY_CHUNK_ROWS, get_storage
+from .write_coordinator import file_lock
+
+DATASET = 'history_rollups'
+META_KEY = '_meta'
+KEY_SEP = '\x1f'
+
+# Boyut adı → geçmiş kolonları ('gun' timestamp'in tarih kısmıdır)
+DIMENSIONS = {
+    'musteri': ('musteri',),
+    'bayi_musteri': ('bayi_musteri',),
+    'urun': ('urun',),
+    'sehir': ('sehir',),
+    'username': ('username',),
+    'gun': ('gun',),
+    'kullanici_bayi_musteri': ('username', 'bayi_musteri'),
+}
+SOURCE_COLUMNS = ['timestamp', 'musteri', 'bayi_musteri', 'urun', 'sehir', 'username', 'kar_marji', 'satis_tl_kg']
+
+
+def cell_key(dimension, value):
+    values = value if isinstance(value, tuple) else (value,)
+    return KEY_SEP.join((dimension,) + tuple(str(v) for v in values))
+
+
+def _number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(number) else number
+
+
+def _present(value):
+    return value is not None and not (isinstance(value, float) and math.isnan(value)) and str(value) != ''
+
+
+def summarize(cell):
+    """Hücreyi okunabilir özete çevir"""
+    count, margin_sum, margin_n, sale_sum, sale_n = cell if cell else (0, 0.0, 0, 0.0, 0)
+    return {
+        'count': int(count),
+        'avg_margin': margin_sum / margin_n if margin_n else None,
+        'avg_sale_tl_kg': sale_sum / sale_n if sale_n else None,
+    }
+
+
+def _record_cells(record):
+    """Kaydın dokunduğu hücre anahtarları"""
+    values = dict(record)
+    values['gun'] = str(record.get('timestamp') or '')[:10]
+    keys = []
+    for dimension, columns in DIMENSIONS.items():
+        parts = tuple(values.get(column) for column in columns)
+        if all(_present(part) for part in parts):
+            keys.append(cell_key(dimension, parts if len(parts) > 1 else parts[0]))
+    return keys
+
+
+def _chunk_cells(chunk, cells):
+    """Parçayı boyut başına gruplayıp hücrelere ekle (vektörel)"""
+    chunk = chunk.assign(
+        gun=chunk['timestamp'].astype('string').str.slice(0, 10),
+        kar_marji=pd.to_numeric(chunk['kar_marji'], errors='coerce'),
+        satis_tl_kg=pd.to_numeric(chunk['satis_tl_kg'], errors='coerce'),
+    )
+    for dimension, columns in DIMENSIONS.items():
+        columns = list(columns)
+        if any(column not in chunk.columns for column in columns):
+            continue
+        subset = chunk.dropna(subset=columns)
+        for column in columns:
+            subset = subset[subset[column].astype('string') != '']
+        if subset.empty:
+            continue
+        grouped = subset.groupby(columns, sort=False).agg(
+            count=('gun', 'size'),
+            margin_sum=('kar_marji', 'sum'), margin_n=('kar_marji', 'count'),
+            sale_sum=('satis_tl_kg', 'sum'), sale_n=('satis_tl_kg', 'count'),
+        )
+        for key, row in zip(grouped.index, grouped.itertuples(index=False, name=None)):
+            name = cell_key(dimension, key)
+            cell = cells.setdefault(name, [0, 0.0, 0, 0.0, 0])
+            for i, value in enumerate(row):
+                cell[i] += value.item() if hasattr(value, 'item') else value
+
+
+class HistoryRollups:
+    """Geçmiş özetlerinin bellek içi kopyası; depolamadaki `history_rollups` ile eşlenir"""
+
+    def __init__(self, storage=None):
+        self._storage = storage
+        self._lock = threading.Lock()
+        self._cells = None
+        self._signature = None
+
+    @property
+    def storage(self):
+        return self._storage or get_storage()
+
+    def _record_lock(self):
+        """Kayıt eklemeyi süreçler arası sıraya sokan kilit (özet dosyasının/veritabanının yanında)"""
+        storage = self.storage
+        base = storage.path(DATASET) if storage.name == 'csv' else storage.db_path
+        return file_lock(base + '.record')
+
+    def _history_signature(self):
+        return [list(part) for part in self.storage.signature(['history'])]
+
+    def _load(self):
+        """Güncel özetler; imza değiştiyse depodan yükle veya yeniden kur (kilit altında çağrılır)"""
+        signature = self._history_signature()
+        if self._cells is not None and self._signature == signature:
+            return self._cells
+        stored = self.storage.read_json(DATASET)
+        meta = stored.pop(META_KEY, None) or {}
+        if meta.get('signature') == signature:
+            self._cells, self._signature = stored, signature
+        else:
+            self._rebuild()
+        return self._cells
+
+    def _rebuild(self):
+        # İmza taramadan önce alınır: tarama sırasında gelen ekleme bir sonraki okumada yeniden kurdurur
+        signature = self._history_signature()
+        cells = {}
+        for chunk in self.storage.iter_history(HISTORY_CHUNK_ROWS, columns=SOURCE_COLUMNS):
+            if not chunk.empty:
+                _chunk_cells(chunk, cells)
+        data = dict(cells)
+        data[META_KEY] = {'signature': signature}
+        self.storage.write_json(DATASET, data)
+        self._cells, self._signature = cells, signature
+
+    def rebuild(self):
+        """Özetleri geçmişten baştan kur"""
+        with self._lock:
+            self._rebuild()
+
+    def record(self, record):
+        """Kaydı geçmişe ekle ve yalnızca dokunduğu özet hücrelerini güncelle"""
+        with self._lock, self._record_lock():
+            # Eklemeden önceki imza önbellekle karşılaştırılır (uyuşmazsa yeniden kurulur)
+            cells = self._load()
+            self.storage.append_history(record)
+            margin, sale = _number(record.get('kar_marji')), _number(record.get('satis_tl_kg'))
+            changed = {}
+            for name in _record_cells(record):
+                cell = cells.setdefault(name, [0, 0.0, 0, 0.0, 0])
+                cell[0] += 1
+                if margin is not None:
+                    cell[1] += margin
+                    cell[2] += 1
+                if sale is not None:
+                    cell[3] += sale
+                    cell[4] += 1
+                changed[name] = cell
+            self._signature = self._history_signature()
+            changed[META_KEY] = {'signature': self._signature}
+            self.storage.put_json_items(DATASET, changed)
+
+    def get(self, dimension, value):
+        """Tek hücrenin özeti; değer bileşik boyutlarda demettir"""
+        with self._lock:
+            return summarize(self._load().get(cell_key(dimension, value)))
+
+    def top(self, dimension, limit=None):
+        """Boyutun tüm değerleri, adede göre azalan"""
+        prefix = dimension + KEY_SEP
+        with self._lock:
+            items = [(name[len(prefix):], cell) for name, cell in self._load().items() if name.startswith(prefix)]
+        items.sort(key=lambda item: item[1][0], reverse=True)
+        rows = []
+        for name, cell in items[:limit]:
+            parts = name.split(KEY_SEP)
+            rows.append(dict(summarize(cell), key=parts if len(parts) > 1 else parts[0]))
+        return rows
+
+
+rollups = HistoryRollups()
+
+
+def record_calculation(record):
+    rollups.record(record)
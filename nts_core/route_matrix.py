@@ -0,0 +1,225 @@
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+from .quote import FACTORIES, order_routes, quote_columns
+
+RouteCell = namedtuple('RouteCell', ['Fabrika', 'Firma', 'Arac', 'NTS_TL', 'Nakliye_TL', 'Toplam_Maliyet_TL'])
+RouteEntry = namedtuple('RouteEntry', ['best', 'factories'])
+
+QUOTE_KEYS = [
+    'Satis_TL', 'Satis_USD_KG', 'Satis_EUR_KG', 'Satis_CHF_KG',
+    'Satis_TL_TON', 'Satis_USD_TON', 'Satis_EUR_TON', 'Satis_CHF_TON',
+]
+
+
+def _price_table(urun_index):
+    prices = urun_index.latest_rows()[['Urun_Adi', 'Fabrika', 'NTS_Maliyet_TL']]
+    return prices[prices['Fabrika'].isin(FACTORIES)]
+
+
+def _lane_table(df_shipping):
+    lanes = df_shipping[['Sehir', 'Firma', 'Fabrika', 'Arac_Tipi', 'Fiyat_TL_KG']]
+    lanes = lanes.assign(_lane=np.arange(len(lanes)))
+    lanes = lanes[lanes['Fabrika'].isin(FACTORIES)]
+    return lanes.assign(_rank=lanes['Fabrika'].map({fabrika: rank for rank, fabrika in enumerate(FACTORIES)}))
+
+
+def _price_signatures(prices):
+    signatures = {}
+    for urun, fabrika, nts in zip(prices['Urun_Adi'].tolist(), prices['Fabrika'].tolist(), prices['NTS_Maliyet_TL'].tolist()):
+        signatures.setdefault(urun, []).append((fabrika, nts))
+    return {urun: tuple(sorted(items)) for urun, items in signatures.items()}
+
+
+def _lane_signatures(lanes):
+    signatures = {}
+    for row in zip(lanes['Sehir'].tolist(), lanes['Fabrika'].tolist(), lanes['Firma'].tolist(),
+                   lanes['Arac_Tipi'].tolist(), lanes['Fiyat_TL_KG'].tolist()):
+        signatures.setdefault(row[0], []).append(row[1:])
+    return {sehir: tuple(items) for sehir, items in signatures.items()}
+
+
+def compute_routes(prices, lanes):
+    """
+    Verilen fiyat × hat kombinasyonları için en ucuz rotaları hesapla.
+
+    Toplam maliyete (NTS + nakliye) göre seçim yapılır; marj > -100 olduğu
+    sürece satış fiyatı sıralaması aynıdır. Sıralama `order_routes` kuralıdır
+    (NaN toplamlı adaylar atılır, eşitlikte fabrika ve hat sırası; find_cheapest_route ve
+    quote_batch ile aynı). Geçerli adayı olmayan ürün/şehir çifti matriste yer almaz.
+
+    Returns:
+        dict: (Urun_Adi, Sehir) → RouteEntry
+    """
+    candidates = prices.merge(lanes, on='Fabrika', how='inner')
+    if candidates.empty:
+        return {}
+    candidates['Toplam_Maliyet_TL'] = (
+        candidates['NTS_Maliyet_TL'].to_numpy(dtype=float) + candidates['Fiyat_TL_KG'].to_numpy(dtype=float)
+    )
+    candidates = order_routes(candidates, ['Urun_Adi', 'Sehir'], 'Toplam_Maliyet_TL')
+    factory_best = candidates.drop_duplicates(['Urun_Adi', 'Sehir', 'Fabrika'])
+
+    entries = {}
+    for urun, sehir, fabrika, firma, arac, nts, nakliye, toplam in zip(
+        factory_best['Urun_Adi'].tolist(), factory_best['Sehir'].tolist(), factory_best['Fabrika'].tolist(),
+        factory_best['Firma'].tolist(), factory_best['Arac_Tipi'].tolist(), factory_best['NTS_Maliyet_TL'].tolist(),
+        factory_best['Fiyat_TL_KG'].tolist(), factory_best['Toplam_Maliyet_TL'].tolist(),
+    ):
+        cell = RouteCell(fabrika, firma, arac, nts, nakliye, toplam)
+        entry = entries.get((urun, sehir))
+        if entry is None:
+            # Sıralama gereği ilk gelen fabrika minimumu aynı zamanda genel minimumdur
+            entries[(urun, sehir)] = RouteEntry(cell, {fabrika: cell})
+        else:
+            entry.factories[fabrika] = cell
+    return entries
+
+
+class RouteMatrix:
+    """
+    Tüm ürün × şehir çiftleri için önceden hesaplanmış en ucuz rota matrisi.
+
+    Her hücre en ucuz fabrika/firma/araç ile fabrika bazlı minimumları tutar.
+    Matris TL maliyet saklar; marj ve döviz dönüşümü sorgu anında vektörel
+    uygulanır, bu yüzden kur değişimi yeniden hesaplama gerektirmez.
+    Oluşturulduktan sonra değişmez; `refreshed` yeni bir matris döndürür.
+    """
+
+    def __init__(self, by_product, by_city, price_signatures, lane_signatures, version=None, stats=None):
+        self.by_product = by_product
+        self.by_city = by_city
+        self.price_signatures = price_signatures
+        self.lane_signatures = lane_signatures
+        self.version = version
+        self.stats = stats or {}
+
+    @classmethod
+    def build(cls, urun_index, df_shipping, version=None):
+        prices = _price_table(urun_index)
+        lanes = _lane_table(df_shipping)
+        by_product, by_city = {}, {}
+        for (urun, sehir), entry in compute_routes(prices, lanes).items():
+            by_product.setdefault(urun, {})[sehir] = entry
+            by_city.setdefault(sehir, {})[urun] = entry
+        stats = {'mode': 'full', 'products': len(by_product), 'cities': len(by_city)}
+        return cls(by_product, by_city, _price_signatures(prices), _lane_signatures(lanes), version, stats)
+
+    def refreshed(self, urun_index, df_shipping, version=None):
+        """
+        Yeni veriye göre güncellenmiş matris döndür.
+
+        Yalnızca fiyatı değişen ürünlerin satırları ve hatları değişen
+        şehirlerin kolonları yeniden hesaplanır.
+        """
+        prices = _price_table(urun_index)
+        lanes = _lane_table(df_shipping)
+        price_signatures = _price_signatures(prices)
+        lane_signatures = _lane_signatures(lanes)
+
+        changed_products = {
+            urun for urun in price_signatures.keys() | self.price_signatures.keys()
+            if price_signatures.get(urun) != self.price_signatures.get(urun)
+        }
+        changed_cities = {
+            sehir for sehir in lane_signatures.keys() | self.lane_signatures.keys()
+            if lane_signatures.get(sehir) != self.lane_signatures.get(sehir)
+        }
+        if not changed_products and not changed_cities:
+            return RouteMatrix(self.by_product, self.by_city, price_signatures, lane_signatures, version,
+                               {'mode': 'unchanged', 'products': 0, 'cities': 0})
+
+        by_product = {urun: dict(row) for urun, row in self.by_product.items() if urun not in changed_products}
+        by_city = {sehir: dict(column) for sehir, column in self.by_city.items() if sehir not in changed_cities}
+        for row in by_product.values():
+            for sehir in changed_cities:
+                row.pop(sehir, None)
+        for column in by_city.values():
+            for urun in changed_products:
+                column.pop(urun, None)
+
+        updates = {}
+        if changed_products:
+            updates.update(compute_routes(prices[prices['Urun_Adi'].isin(changed_products)], lanes))
+        if changed_cities:
+            updates.update(compute_routes(prices, lanes[lanes['Sehir'].isin(changed_cities)]))
+        for (urun, sehir), entry in updates.items():
+            by_product.setdefault(urun, {})[sehir] = entry
+            by_city.setdefault(sehir, {})[urun] = entry
+
+        stats = {'mode': 'incremental', 'products': len(changed_products), 'cities': len(changed_cities)}
+        return RouteMatrix(by_product, by_city, price_signatures, lane_signatures, version, stats)
+
+    def entry(self, urun_adi, sehir):
+        return self.by_product.get(urun_adi, {}).get(sehir)
+
+    def cheapest(self, urun_adi, sehir, kar_marji, exchange_rates):
+        """Ürün/şehir için en ucuz rotanın fiyatlandırılmış satırı (yoksa None)"""
+        entry = self.entry(urun_adi, sehir)
+        if entry is None:
+            return None
+        return self._quote([None], [entry.best], kar_marji, exchange_rates, None)[0]
+
+    def _quote(self, keys, cells, kar_marji, exchange_rates, key_name):
+        if not cells:
+            return []
+        columns = quote_columns([cell.NTS_TL for cell in cells], [cell.Nakliye_TL for cell in cells],
+                                kar_marji, exchange_rates)
+        values = [columns[name].tolist() for name in QUOTE_KEYS]
+        rows = []
+        for i, (key, cell) in enumerate(zip(keys, cells)):
+            row = {key_name: key} if key_name else {}
+            row.update(cell._asdict())
+            for name, column in zip(QUOTE_KEYS, values):
+                row[name] = column[i]
+            rows.append(row)
+        return rows
+
+    def product_routes(self, urun_adi, kar_marji, exchange_rates, factories=False):
+        """Bir ürünün tüm şehirlerdeki en ucuz rotaları (şehir adına göre sıralı)"""
+        row = self.by_product.get(urun_adi, {})
+        return self._routes(row, kar_marji, exchange_rates, factories, 'Sehir')
+
+    def city_routes(self, sehir, kar_marji, exchange_rates, factories=False):
+        """Bir şehre tüm ürünlerin en ucuz rotaları (ürün adına göre sıralı)"""
+        column = self.by_city.get(sehir, {})
+        return self._routes(column, kar_marji, exchange_rates, factories, 'Urun_Adi')
+
+    def _routes(self, entries, kar_marji, exchange_rates, factories, key_name):
+        keys = sorted(entries)
+        rows = self._quote(keys, [entries[key].best for key in keys], kar_marji, exchange_rates, key_name)
+        if factories:
+            for key, row in zip(keys, rows):
+                fabrika_cells = entries[key].factories
+                fabrikalar = [fabrika for fabrika in FACTORIES if fabrika in fabrika_cells]
+                row['Fabrikalar'] = self._quote(fabrikalar, [fabrika_cells[fabrika] for fabrika in fabrikalar],
+                                                kar_marji, exchange_rates, None)
+        return rows
+
+
+class RouteMatrixStore:
+    """Son matrisi tutar; veri sürümü değişince artımlı olarak yeniler ve atomik değiştirir."""
+
+    def __init__(self):
+        self._matrix = None
+        self._lock = threading.Lock()
+
+    def get(self, version, urun_index_factory, df_shipping):
+        matrix = self._matrix
+        if matrix is not None and matrix.version == version:
+            return matrix
+        with self._lock:
+            matrix = self._matrix
+            if matrix is not None and matrix.version == version:
+                return matrix
+            if matrix is None:
+                matrix = RouteMatrix.build(urun_index_factory(), df_shipping, version)
+            else:
+                matrix = matrix.refreshed(urun_index_factory(), df_shipping, version)
+            self._matrix = matrix
+            return matrix
+
+    def peek(self):
+        return self._matrix
@@ -0,0 +1,169 @@
+"""
+Ürün ve şehir arama indeksi (Türkçe büyük/küçük harf ve aksan duyarsız).
+
+Metinler lower()'dan önce Türkçe harf tablosuyla katlanır (lower() 'İ'yi
+'i̇' yapar) ve aksanlardan arındırılır (İ/I/ı→i, ç→c, ğ→g, ö→o, ş→s, ü→u);
+"SİKARAPİD", "sikarapid" ve "Sıkarapıd" aynı anahtara düşer. İndeks
+snapshot başına bir kez kurulur:
+
+- Kelime başı araması: katlanmış kelimelerin sıralı listesi üzerinde bisect
+- Alt dize araması: kelimenin en seyrek trigramının kayıt listesi, sonra `in` ile doğrulama
+- Bulanık arama (yazım hataları): sorgu trigramlarının ad trigramlarında
+  bulunma oranı; yalnızca tam eşleşmeler yetmediğinde devreye girer
+"""
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from itertools import chain
+
+PRODUCT = 'product'
+CITY = 'city'
+KINDS = (PRODUCT, CITY)
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+# Bulanık eşleşme için sorgu trigramlarının en az bu oranı adda bulunmalı
+FUZZY_THRESHOLD = 0.6
+
+_TURKISH_FOLD = str.maketrans({
+    'İ': 'i', 'I': 'i', 'ı': 'i',
+    'Ç': 'c', 'ç': 'c', 'Ğ': 'g', 'ğ': 'g', 'Ö': 'o', 'ö': 'o',
+    'Ş': 's', 'ş': 's', 'Ü': 'u', 'ü': 'u',
+    'Â': 'a', 'â': 'a', 'Î': 'i', 'î': 'i', 'Û': 'u', 'û': 'u',
+})
+_NON_WORD = re.compile(r'[^0-9a-z]+')
+
+
+def fold(text):
+    """Türkçe katlama + aksan temizleme; kelimeler tek boşlukla ayrılır"""
+    text = str(text).translate(_TURKISH_FOLD).lower()
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return _NON_WORD.sub(' ', text).strip()
+
+
+def trigrams(folded):
+    padded = f' {folded} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """
+    Değişmez arama indeksi; `entries` (metin, tür, ek bilgi) listesinden kurulur.
+
+    Kayıtlar (uzunluk, katlanmış metin) sırasıyla numaralanır; böylece eşit
+    öncelikli sonuçlarda kısa ad önce gelir ve sıralama sayı karşılaştırmasıdır.
+    """
+
+    def __init__(self, entries):
+        entries = list(entries)
+        folded = [fold(text) for text, _, _ in entries]
+        order = sorted(range(len(entries)), key=lambda i: (len(folded[i]), folded[i]))
+        self.entries = [entries[i] for i in order]
+        self._folded = [folded[i] for i in order]
+        self._spaced = [' ' + text for text in self._folded]
+        words = []
+        grams = defaultdict(list)
+        for position, text in enumerate(self._folded):
+            for word in set(text.split()):
+                words.append((word, position))
+            for gram in trigrams(text):
+                grams[gram].append(position)
+        words.sort()
+        self._words = words
+        self._word_keys = [word for word, _ in words]
+        # Trigram → artan sırada kayıt numaraları
+        self._grams = {gram: tuple(positions) for gram, positions in grams.items()}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _prefix(self, token):
+        start = bisect_left(self._word_keys, token)
+        found = set()
+        for word, position in self._words[start:]:
+            if not word.startswith(token):
+                break
+            found.add(position)
+        return sorted(found)
+
+    def _seed(self, token):
+        """Kelimenin aday listesi: kısa kelimede kelime başı, aksi halde en seyrek trigramı"""
+        if len(token) < 3:
+            return self._prefix(token)
+        postings = [self._grams.get(gram, ()) for gram in trigrams(token) if ' ' not in gram]
+        return min(postings, key=len)
+
+    def _matches(self, tokens):
+        """Tüm kelimeleri içeren kayıtlar, artan sırada (kısa kelimeler kelime başı olarak aranır)"""
+        seed = min((self._seed(token) for token in tokens), key=len)
+        checks = [(' ' + token) if len(token) < 3 else token for token in tokens]
+        return [position for position in seed if all(check in self._spaced[position] for check in checks)]
+
+    def _fuzzy(self, query, exclude):
+        grams = trigrams(query)
+        counts = Counter(chain.from_iterable(self._grams.get(gram, ()) for gram in grams))
+        minimum = FUZZY_THRESHOLD * len(grams)
+        scored = [(-common, position) for position, common in counts.items()
+                  if common >= minimum and position not in exclude]
+        scored.sort()
+        return [position for _, position in scored]
+
+    def _rank(self, positions, query, first, limit):
+        """Önce adın başı, sonra bir kelimenin başı, sonra alt dize eşleşmesi"""
+        tiers = ([], [], [])
+        first = ' ' + first
+        for position in positions:
+            if self._folded[position].startswith(query):
+                tiers[0].append(position)
+                if limit is not None and len(tiers[0]) >= limit:
+                    break
+            elif first in self._spaced[position]:
+                tiers[1].append(position)
+            else:
+                tiers[2].append(position)
+        return tiers[0] + tiers[1] + tiers[2]
+
+    def search(self, query, kind=None, limit=DEFAULT_LIMIT, fuzzy=True):
+        """
+        Sorguya uyan kayıtlar, en iyi eşleşme önce.
+
+        Args:
+            kind: 'product' / 'city' (None → tümü)
+            limit: En fazla sonuç (None → sınırsız)
+            fuzzy: Tam eşleşmeler limiti doldurmazsa yazım hatalı eşleşmeleri de ekle
+        """
+        folded = fold(query)
+        if not folded:
+            return []
+        tokens = folded.split()
+        positions = self._matches(tokens)
+        if kind is not None:
+            positions = [position for position in positions if self.entries[position][1] == kind]
+        ranked = self._rank(positions, folded, tokens[0], limit)
+        if fuzzy and (limit is None or len(ranked) < limit) and len(folded) >= 3:
+            ranked += [position for position in self._fuzzy(folded, set(positions))
+                       if kind is None or self.entries[position][1] == kind]
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [self.entries[position] for position in ranked]
+
+    def matching_texts(self, query, kind=None, fuzzy=False):
+        """Sorguya uyan metinler (filtreleme için, sırasız küme)"""
+        return {text for text, _, _ in self.search(query, kind, limit=None, fuzzy=fuzzy)}
+
+
+def build_index(products, shipping):
+    """Ürün adları (fabrikalarıyla) ve şehirlerden indeks kur"""
+    entries = []
+    if not products.empty:
+        factories = products.groupby('Urun_Adi', sort=True)['Fabrika'].agg(lambda values: sorted(set(values.dropna())))
+        entries += [(name, PRODUCT, {'factories': values}) for name, values in factories.items()]
+    if not shipping.empty:
+        entries += [(str(city), CITY, {}) for city in sorted(shipping['Sehir'].dropna().unique())]
+    return SearchIndex(entries)
+
+
+def search_index(snapshot):
+    """Snapshot (veri sürümü) başına bir kez kurulan arama indeksi"""
+    return snapshot.memo('search_index', lambda: build_index(snapshot.products, snapshot.shipping))
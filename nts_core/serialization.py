@@ -0,0 +1,117 @@
+"""
+API yanıtları için hızlı serileştirme ve sıkıştırma.
+
+orjson, msgpack ve brotli isteğe bağlıdır: kuruluysa kullanılır, değilse
+standart kütüphaneye (json, gzip) düşülür. DataFrame'ler `to_dict('records')`
+yerine doğrudan kolon dizilerinden dönüştürülür.
+"""
+import gzip
+import json
+import math
+from functools import lru_cache
+
+import numpy as np
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+MSGPACK_TYPES = (MSGPACK, 'application/x-msgpack')
+
+# Bu boyutun altındaki gövdeler sıkıştırılmaz (bayt)
+MIN_COMPRESS_BYTES = 1024
+
+
+@lru_cache(maxsize=None)
+def _optional(module):
+    """İsteğe bağlı modülü bir kez içe aktarmayı dene; yoksa None"""
+    try:
+        return __import__(module)
+    except ImportError:
+        return None
+
+
+def _default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"JSON'a çevrilemeyen tür: {type(value).__name__}")
+
+
+def json_dumps(obj):
+    """Nesneyi UTF-8 JSON baytlarına çevir (orjson varsa onunla); NaN → null"""
+    orjson = _optional('orjson')
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(_nan_to_none(obj), ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+def _nan_to_none(obj):
+    # Standart json NaN'ı geçersiz `NaN` olarak yazar; orjson ile aynı çıktı için null'a çevrilir
+    if isinstance(obj, float) and math.isnan(obj):
+        return None
+    if isinstance(obj, dict):
+        return {key: _nan_to_none(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_nan_to_none(value) for value in obj]
+    return obj
+
+
+def column_values(series):
+    """Kolonu Python değerleri listesine çevir; eksik değerler None olur"""
+    values = series.to_numpy()
+    if values.dtype.kind in 'fc' or values.dtype == object:
+        mask = series.isna().to_numpy()
+        if mask.any():
+            values = values.astype(object)
+            values[mask] = None
+    return values.tolist()
+
+
+def frame_payload(df, orient='records'):
+    """
+    DataFrame'i JSON'a hazır yapıya dönüştür.
+
+    Args:
+        orient: 'records' → [{kolon: değer}, ...]; 'columns' → {kolon: [değerler]}
+    """
+    columns = [str(column) for column in df.columns]
+    data = [column_values(df[column]) for column in df.columns]
+    if orient == 'columns':
+        return dict(zip(columns, data))
+    return [dict(zip(columns, row)) for row in zip(*data)]
+
+
+def available_media_types():
+    return (JSON,) + (MSGPACK_TYPES if _optional('msgpack') is not None else ())
+
+
+def negotiate_media_type(accept_mimetypes):
+    """Accept başlığına göre JSON veya (kuruluysa) MessagePack seç"""
+    best = accept_mimetypes.best_match(available_media_types(), default=JSON)
+    return MSGPACK if best in MSGPACK_TYPES else JSON
+
+
+def encode(obj, media_type=JSON):
+    if media_type == MSGPACK:
+        return _optional('msgpack').packb(obj, use_bin_type=True, default=_default)
+    return json_dumps(obj)
+
+
+def available_encodings():
+    return (('br',) if _optional('brotli') is not None else ()) + ('gzip',)
+
+
+def negotiate_encoding(accept_encodings, size):
+    """İstemcinin kabul ettiği en iyi sıkıştırma (br > gzip); gerek yoksa None"""
+    if size < MIN_COMPRESS_BYTES:
+        return None
+    for encoding in available_encodings():
+        if accept_encodings[encoding]:
+            return encoding
+    return None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return _optional('brotli').compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
@@ -0,0 +1,111 @@
+"""
+Üretim WSGI sunucusu (gunicorn / waitress isteğe bağlı).
+
+gunicorn varsa prefork çalışılır: uygulama ve veriler ana süreçte bir kez
+yüklenip ısıtılır (preload), işçiler fork ile bu belleği copy-on-write
+paylaşır. Isıtmadan sonra gc.freeze() ile yüklü nesneler çöp toplayıcının
+dışına alınır; aksi halde GC taramaları paylaşılan sayfaları kirletip
+kopyalanmalarına yol açar. Windows'ta (fork yok) veya gunicorn kurulu
+değilse waitress ile tek süreç, çok thread çalışılır.
+
+Birden çok işçide metrikler ortak klasörde birleştirilir (NTS_METRICS_DIR,
+verilmezse geçici klasör); `/metrics` tüm işçilerin toplamını döndürür.
+"""
+import gc
+import glob
+import logging
+import os
+import tempfile
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THREADS = 4
+DEFAULT_TIMEOUT = 60
+
+
+def default_workers():
+    return int(os.environ.get('NTS_WORKERS') or os.cpu_count() or 1)
+
+
+def default_threads():
+    return int(os.environ.get('NTS_THREADS') or DEFAULT_THREADS)
+
+
+def _metrics_dir():
+    """Çok süreçli metrik klasörü; önceki çalıştırmanın dosyaları temizlenir"""
+    directory = os.environ.get('NTS_METRICS_DIR')
+    if not directory:
+        return tempfile.mkdtemp(prefix='nts-metrics-')
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+        os.remove(path)
+    return directory
+
+
+def _gunicorn_available():
+    if os.name == 'nt':
+        return False
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def serve(app, host='0.0.0.0', port=5000, workers=None, threads=None, warm_up=None, timeout=DEFAULT_TIMEOUT):
+    """
+    `app`'i üretim sunucusuyla çalıştır (bloklar).
+
+    Args:
+        warm_up: Dinlemeye başlamadan önce ana süreçte bir kez çağrılır
+    """
+    workers = workers or default_workers()
+    threads = threads or default_threads()
+
+    def prepare():
+        if warm_up is not None:
+            warm_up()
+        # Ana sürecin (ısıtma) metrikleri bir kez yazılır; işçiler devraldıklarını sıfırlar
+        registry.flush(force=True)
+        gc.collect()
+        gc.freeze()
+        return app
+
+    if _gunicorn_available():
+        if workers > 1:
+            registry.enable_multiprocess(_metrics_dir())
+        _serve_gunicorn(prepare, host, port, workers, threads, timeout)
+        return
+    try:
+        from waitress import serve as waitress_serve
+    except ImportError:
+        raise RuntimeError("Üretim modu için gunicorn (Linux/macOS) veya waitress (Windows) kurulmalı")
+    if workers > 1:
+        logger.warning("gunicorn yok: waitress tek süreçle çalışır, %d işçi yerine %d thread kullanılıyor",
+                       workers, workers * threads)
+    waitress_serve(prepare(), host=host, port=port, threads=workers * threads)
+
+
+def _serve_gunicorn(prepare, host, port, workers, threads, timeout):
+    from gunicorn.app.base import BaseApplication
+
+    class PreloadedApplication(BaseApplication):
+        def load_config(self):
+            settings = {
+                'bind': f'{host}:{port}',
+                'workers': workers,
+                'threads': threads,
+                'worker_class': 'gthread' if threads > 1 else 'sync',
+                'preload_app': True,
+                'timeout': timeout,
+            }
+            for key, value in settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # preload_app: ana süreçte fork'tan önce bir kez çağrılır
+            return prepare()
+
+    PreloadedApplication().run()
@@ -0,0 +1,136 @@
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+
+
+def file_signature(path):
+    """Dosyanın (yol, mtime_ns, boyut) imzasını döndür; dosya yoksa None'lu imza."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return (path, None, None)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
+def _version_from_signatures(signatures):
+    raw = '|'.join(f"{path}:{mtime}:{size}" for path, mtime, size in signatures)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:12]
+
+
+def _timestamp_str(timestamp):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))
+
+
+@dataclass(frozen=True)
+class PricingSnapshot:
+    """
+    Tek bir veri sürümüne ait değişmez fiyatlandırma görüntüsü.
+
+    Snapshot oluşturulduktan sonra hiçbir zaman değiştirilmez; çağıranlar
+    `products` / `shipping` DataFrame'lerini yerinde değiştirmemeli, gerekirse
+    kopya üzerinde çalışmalıdır. Türetilmiş yapılar (indeksler vb.) `memo` ile
+    snapshot başına bir kez hesaplanır.
+    """
+    version: str
+    generation: int
+    products: object
+    shipping: object
+    rates: MappingProxyType
+    signatures: tuple
+    loaded_at: float
+    load_seconds: float
+    _memo: dict = field(default_factory=dict, repr=False, compare=False)
+    _memo_lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def memo(self, key, factory):
+        """`factory()` sonucunu bu snapshot için bir kez hesaplayıp sakla."""
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+        with self._memo_lock:
+            if key not in self._memo:
+                self._memo[key] = factory()
+            return self._memo[key]
+
+    def info(self):
+        """Yanıtlarda ve health kontrolünde gösterilecek sürüm bilgisi"""
+        return {
+            'data_version': self.version,
+            'generation': self.generation,
+            'loaded_at': _timestamp_str(self.loaded_at),
+            'load_ms': round(self.load_seconds * 1000, 2),
+        }
+
+
+class SnapshotStore:
+    """
+    Süreç genelinde paylaşılan snapshot tutucu (read-copy-update).
+
+    `get()` her çağrıda izlenen dosyaların mtime/boyut imzasını karşılaştırır;
+    değişiklik varsa yeni snapshot kilit altında oluşturulur ve referans tek
+    atamayla değiştirilir. Okuyucular kilit almaz; eline geçen snapshot
+    istek boyunca tutarlı kalır.
+    """
+
+    def __init__(self, builder, paths=(), signature_fn=None):
+        """
+        Args:
+            builder: (products_df, shipping_df, rates_dict) döndüren fonksiyon
+            paths: İzlenecek dosya yolları
+            signature_fn: Ek imza kaynağı (ör. SQLite veri kümesi sürümleri), demet döndürür
+        """
+        self._builder = builder
+        self._paths = tuple(paths)
+        self._signature_fn = signature_fn
+        self._current = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def signatures(self):
+        signatures = tuple(file_signature(path) for path in self._paths)
+        if self._signature_fn is not None:
+            signatures += tuple(self._signature_fn())
+        return signatures
+
+    def get(self):
+        """Güncel snapshot'ı döndür, dosyalar değiştiyse yeniden yükle."""
+        current = self._current
+        if current is not None and current.signatures == self.signatures():
+            return current
+        with self._lock:
+            # Kilidi beklerken başka bir thread yenilemiş olabilir
+            current = self._current
+            signatures = self.signatures()
+            if current is not None and current.signatures == signatures:
+                return current
+            snapshot = self._build(signatures)
+            self._current = snapshot
+            return snapshot
+
+    def peek(self):
+        """Dosya kontrolü yapmadan mevcut snapshot'ı döndür (yoksa None)."""
+        return self._current
+
+    def invalidate(self):
+        """Bir sonraki `get()` çağrısında yeniden yüklemeyi zorla."""
+        with self._lock:
+            self._current = None
+
+    def _build(self, signatures):
+        started = time.perf_counter()
+        products, shipping, rates = self._builder()
+        self._generation += 1
+        return PricingSnapshot(
+            version=_version_from_signatures(signatures),
+            generation=self._generation,
+            products=products,
+            shipping=shipping,
+            rates=MappingProxyType(dict(rates)),
+            signatures=signatures,
+            loaded_at=time.time(),
+            load_seconds=time.perf_counter() - started,
+        )
@@ -0,0 +1,715 @@
+"""
+Depolama katmanı: CSV/JSON dosyaları (varsayılan) veya gömülü SQLite.
+
+Backend `NTS_STORAGE` ortam değişkeniyle seçilir (`csv` / `sqlite`);
+SQLite veritabanı yolu `NTS_DB_PATH` (varsayılan: nts.db).
+
+Tek seferlik geçiş ve CSV uyumlu dışa aktarım:
+    python -m nts_core.storage migrate --db nts.db
+    python -m nts_core.storage export --db nts.db --out yedek/
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from . import history_parquet
+from .history_log import HistoryLog
+from .snapshot import file_signature
+from .write_coordinator import DatasetWriter, write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_COLUMNS = [
+    'Urun_Adi', 'Fabrika', 'NTS_Maliyet_TL', 'Kayit_Tarihi', 'Giris_Para_Birimi',
+    'Giris_Fiyat', 'Kur_USD', 'Kur_EUR', 'Kur_CHF', 'Kur_Tarihi'
+]
+SHIPPING_COLUMNS = ['Sehir', 'Firma', 'Fabrika', 'Arac_Tipi', 'Fiyat_TL_KG']
+CALC_COLUMNS = [
+    'timestamp', 'username', 'musteri', 'urun', 'sehir', 'fabrika', 'firma', 'arac',
+    'kar_marji', 'nts_tl', 'nakliye_tl', 'toplam_maliyet_tl',
+    'satis_tl_kg', 'satis_usd_kg', 'satis_eur_kg', 'satis_chf_kg',
+    'satis_tl_ton', 'satis_usd_ton', 'satis_eur_ton', 'satis_chf_ton',
+    'usd_kur', 'eur_kur', 'chf_kur', 'kur_tarihi', 'urun_kayit_tarihi'
+]
+# Mevcut geçmiş dosyalarında bayi_musteri kolonu sona eklenmiş durumda
+HISTORY_COLUMNS = CALC_COLUMNS + ['bayi_musteri']
+
+DEFAULT_FILES = {
+    'products': 'urun_fiyat_db.csv',
+    'shipping': 'lokasyonlar.csv',
+    'history': 'hesaplama_gecmisi.csv',
+    'history_parquet': 'hesaplama_gecmisi',  # NTS_HISTORY_FORMAT=parquet: aylık bölüm klasörü
+    'users': 'users.json',
+    'bayi_musterileri': 'bayi_musterileri.json',
+    'tcmb_history': 'tcmb_kur_gecmisi.json',
+    'tcmb_missing': 'tcmb_kur_eksik_gunler.json',
+    'history_rollups': 'hesaplama_ozetleri.json',
+    'product_audit': 'urun_degisiklik_kayitlari.json',
+}
+JSON_DATASETS = ('users', 'bayi_musterileri', 'tcmb_history', 'tcmb_missing', 'history_rollups', 'product_audit')
+PRODUCT_DATE_FORMAT = '%d.%m.%Y'
+# Geçmiş parça parça okunurken parça başına satır
+HISTORY_CHUNK_ROWS = 50_000
+
+
+def write_csv_atomic(df, path):
+    """CSV'yi geçici dosyaya yazıp os.replace ile yerine koy; okuyucular yarım dosya görmez"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            df.to_csv(f, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def products_for_csv(df):
+    """Ürün tablosunu CSV biçimine çevir (tarih kolonu gg.aa.yyyy metni)"""
+    if 'Kayit_Tarihi' in df.columns and pd.api.types.is_datetime64_any_dtype(df['Kayit_Tarihi']):
+        df = df.assign(Kayit_Tarihi=df['Kayit_Tarihi'].dt.strftime(PRODUCT_DATE_FORMAT))
+    return df
+
+
+# Geçmiş kaydını tanımlayan kolonlar (satır konumu dosya değiştikçe kayar; silme bunlarla eşlenir)
+HISTORY_KEY_COLUMNS = ['timestamp', 'username', 'musteri', 'bayi_musteri', 'urun', 'sehir', 'fabrika', 'firma', 'arac']
+
+
+def history_keys(df):
+    """Satır başına kayıt anahtarı; CSV/Parquet/SQLite ve ekran tablosunda aynı metne düşer"""
+    parts = [pd.to_datetime(df['timestamp'], errors='coerce').dt.strftime('%Y-%m-%d %H:%M:%S').fillna('')]
+    for column in HISTORY_KEY_COLUMNS[1:]:
+        values = df[column] if column in df.columns else pd.Series(None, index=df.index, dtype=object)
+        parts.append(values.astype('string').fillna(''))
+    return pd.Series(['\x1f'.join(row) for row in zip(*parts)], index=df.index, dtype=object)
+
+
+def drop_history_records(df, records):
+    """
+    `records`'taki kayıtları anahtarlarıyla `df`'den çıkar (her kayıt için bir eşleşme).
+
+    Returns:
+        tuple: (kalan tablo, silinen satır sayısı)
+    """
+    wanted = history_keys(records).value_counts()
+    keys = history_keys(df)
+    occurrence = keys.groupby(keys, sort=False).cumcount()
+    drop = keys.map(wanted).fillna(0).to_numpy() > occurrence.to_numpy()
+    return df[~drop], int(drop.sum())
+
+
+class _ChangeNotifier:
+    """Her yazmadan sonra kayıtlı dinleyicilere (ör. önbellekler) veri kümesi adını bildirir."""
+
+    def __init__(self):
+        self._listeners = []
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def _notify(self, dataset):
+        for callback in list(self._listeners):
+            try:
+                callback(dataset)
+            except Exception:
+                logger.exception("Depolama dinleyicisi başarısız: %s", dataset)
+
+
+class CsvStorage(_ChangeNotifier):
+    """Mevcut dosya düzeni: her veri kümesi ayrı bir CSV/JSON dosyası."""
+
+    name = 'csv'
+
+    def __init__(self, base_dir='.', files=None, history_format='csv'):
+        """
+        Args:
+            history_format: 'csv' (tek dosya) veya 'parquet' (aylık Parquet bölümleri + CSV kuyruğu)
+        """
+        super().__init__()
+        self.base_dir = base_dir
+        self.files = dict(DEFAULT_FILES, **(files or {}))
+        self.history_format = history_format
+        self._history_log = None
+        self._history_store = None
+        self._history_lock = threading.Lock()
+        self._writers = {}
+        self._writers_lock = threading.Lock()
+
+    def path(self, dataset):
+        return os.path.join(self.base_dir, self.files[dataset])
+
+    def writer(self, dataset):
+        """
+        Veri kümesinin tek yazıcısı (write_coordinator.DatasetWriter).
+
+        Tüm CSV/JSON yazmaları bu kuyruktan geçer: süreçler arası dosya kilidi
+        altında, eşzamanlı değişiklikler tek okuma + tek atomik yazmada birleşir.
+        """
+        writer = self._writers.get(dataset)
+        if writer is None:
+            with self._writers_lock:
+                writer = self._writers.get(dataset)
+                if writer is None:
+                    if dataset in JSON_DATASETS:
+                        load, save = (lambda: self.read_json(dataset)), write_json_atomic
+                    elif dataset == 'products':
+                        load, save = self._load_products_csv, write_csv_atomic
+                    else:
+                        load, save = (lambda: pd.read_csv(self.path(dataset))), write_csv_atomic
+                    writer = self._writers[dataset] = DatasetWriter(self.path(dataset), load, save)
+        return writer
+
+    def signature(self, datasets):
+        return tuple(file_signature(self.path(dataset)) for dataset in datasets)
+
+    # --- Ürünler ---
+    def read_products(self):
+        return pd.read_csv(self.path('products'))
+
+    def _load_products_csv(self):
+        path = self.path('products')
+        return pd.read_csv(path) if os.path.exists(path) else pd.DataFrame(columns=PRODUCT_COLUMNS)
+
+    def write_products(self, df):
+        """Tüm tabloyu değiştir (yalnızca gerçek tam yazmalar için; düzenlemeler update_products ile)"""
+        self.writer('products').replace(products_for_csv(df))
+        self._notify('products')
+
+    def update_products(self, fn):
+        """
+        `fn(güncel tablo) → yeni tablo` değişikliğini dosyanın güncel hâline uygula.
+
+        fn dosya kilidi altında çalışır; aradaki başka yazmalar kaybolmaz.
+        fn'in hatası çağırana iletilir ve dosya değişmez.
+        """
+        self.writer('products').update(lambda df: products_for_csv(fn(df)))
+        self._notify('products')
+
+    def append_products(self, rows):
+        """Satırları güncel dosyaya ekle; aynı anda gelen eklemeler tek yazmada birleşir"""
+        rows = products_for_csv(rows)
+        self.writer('products').update(lambda df: pd.concat([df, rows], ignore_index=True))
+        self._notify('products')
+
+    # --- Nakliye ---
+    def read_shipping(self):
+        return pd.read_csv(self.path('shipping'))
+
+    def write_shipping(self, df):
+        self.writer('shipping').replace(df)
+        self._notify('shipping')
+
+    def update_shipping(self, fn):
+        """`fn(güncel tablo) → yeni tablo`; update_products ile aynı kurallar"""
+        self.writer('shipping').update(fn)
+        self._notify('shipping')
+
+    # --- Hesaplama geçmişi (append-only, tek yazıcı) ---
+    def history_log(self):
+        if self._history_log is None:
+            with self._history_lock:
+                if self._history_log is None:
+                    self._history_log = HistoryLog(self.path('history'), HISTORY_COLUMNS)
+        return self._history_log
+
+    def history_store(self):
+        """
+        Aylık Parquet deposu; history_format='parquet' ve pyarrow kuruluysa, aksi halde None.
+
+        İlk kullanımda bölüm yoksa mevcut CSV geçmişi Parquet'e taşınır.
+        """
+        if self.history_format != 'parquet':
+            return None
+        if self._history_store is None:
+            if not history_parquet.available():
+                logger.warning("pyarrow kurulu değil; hesaplama geçmişi CSV olarak kalıyor")
+                self.history_format = 'csv'
+                return None
+            log = self.history_log()
+            with self._history_lock:
+                if self._history_store is None:
+                    store = history_parquet.PartitionedHistory(self.path('history_parquet'), log, HISTORY_COLUMNS)
+                    if not store.months():
+                        store.compact()
+                    self._history_store = store
+        return self._history_store
+
+    def ensure_history(self):
+        self.history_log().ensure()
+        self.history_store()
+
+    def read_history(self):
+        self.ensure_history()
+        if self.history_store() is None:
+            return pd.read_csv(self.path('history'))
+        chunks = [chunk for chunk in self.iter_history() if not chunk.empty]
+        return pd.concat(chunks) if chunks else pd.DataFrame(columns=HISTORY_COLUMNS)
+
+    def iter_history(self, chunksize=HISTORY_CHUNK_ROWS, filters=None, columns=None):
+        """
+        Geçmişi parça parça oku; index tüm geçmişteki satır sırasıdır (read_history ile aynı).
+
+        Args:
+            filters: `apply(chunk)` ve `columns()` sağlayan filtre (ör. HistoryFilter)
+            columns: Döndürülecek kolonlar (None → tümü)
+        """
+        self.ensure_history()
+        store = self.history_store()
+        if store is not None:
+            yield from store.iter_chunks(chunksize, filters, columns)
+            return
+        wanted = None if columns is None else set(columns) | set(filters.columns() if filters is not None else ())
+        with pd.read_csv(self.path('history'), chunksize=chunksize,
+                         usecols=None if wanted is None else (lambda column: column in wanted)) as reader:
+            for chunk in reader:
+                if filters is not None:
+                    chunk = filters.apply(chunk)
+                yield chunk if columns is None else chunk.reindex(columns=columns)
+
+    def append_history(self, record):
+        self.history_log().append(record)
+        store = self.history_store()
+        if store is not None:
+            store.maybe_compact()
+        self._notify('history')
+
+    def write_history(self, df):
+        store = self.history_store()
+        if store is not None:
+            store.rewrite(df)
+        else:
+            self.history_log().rewrite(df)
+        self._notify('history')
+
+    def update_history(self, fn):
+        """
+        `fn(güncel geçmiş) → yeni geçmiş`; yazıcı thread'inde, dosya kilidi altında uygulanır.
+
+        Okuma ile yazma arasında başka süreçlerin eklemeleri araya giremez.
+        """
+        self.ensure_history()
+        store = self.history_store()
+        if store is not None:
+            store.update(fn)
+        else:
+            log = self.history_log()
+            log.exclusive(lambda: log._rewrite(fn(pd.read_csv(log.path))))
+        self._notify('history')
+
+    # --- JSON belgeleri (users, bayi_musterileri, tcmb_history, tcmb_missing, history_rollups, product_audit) ---
+    def read_json(self, dataset):
+        path = self.path(dataset)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                try:
+                    return json.load(f)
+                except json.JSONDecodeError:
+                    return {}
+        return {}
+
+    def write_json(self, dataset, data):
+        self.writer(dataset).replace(data)
+        self._notify(dataset)
+
+    def put_json_item(self, dataset, key, value):
+        self.put_json_items(dataset, {key: value})
+
+    def put_json_items(self, dataset, items):
+        """Anahtarları dosyanın güncel hâline uygula (kilit altında oku-değiştir-yaz)"""
+        items = dict(items)
+        self.writer(dataset).update(lambda data: {**data, **items})
+        self._notify(dataset)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    Urun_Adi TEXT NOT NULL,
+    Fabrika TEXT NOT NULL,
+    NTS_Maliyet_TL REAL,
+    Kayit_Tarihi TEXT,
+    Giris_Para_Birimi TEXT,
+    Giris_Fiyat REAL,
+    Kur_USD REAL,
+    Kur_EUR REAL,
+    Kur_CHF REAL,
+    Kur_Tarihi TEXT
+);
+DROP INDEX IF EXISTS idx_products_lookup;
+
+CREATE TABLE IF NOT EXISTS shipping (
+    id INTEGER PRIMARY KEY,
+    Sehir TEXT NOT NULL,
+    Firma TEXT,
+    Fabrika TEXT,
+    Arac_Tipi TEXT,
+    Fiyat_TL_KG REAL
+);
+DROP INDEX IF EXISTS idx_shipping_city;
+
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT, username TEXT, musteri TEXT, urun TEXT, sehir TEXT,
+    fabrika TEXT, firma TEXT, arac TEXT, kar_marji REAL,
+    nts_tl REAL, nakliye_tl REAL, toplam_maliyet_tl REAL,
+    satis_tl_kg REAL, satis_usd_kg REAL, satis_eur_kg REAL, satis_chf_kg REAL,
+    satis_tl_ton REAL, satis_usd_ton REAL, satis_eur_ton REAL, satis_chf_ton REAL,
+    usd_kur REAL, eur_kur REAL, chf_kur REAL, kur_tarihi TEXT, urun_kayit_tarihi TEXT,
+    bayi_musteri TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history (timestamp);
+CREATE INDEX IF NOT EXISTS idx_history_musteri ON history (musteri, timestamp);
+CREATE INDEX IF NOT EXISTS idx_history_bayi_musteri ON history (bayi_musteri, timestamp);
+
+CREATE TABLE IF NOT EXISTS documents (
+    dataset TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (dataset, key)
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    dataset TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+"""
+
+# Sık kullanılan sorgular sabit metin olarak tutulur; sqlite3 bağlantı başına derlenmiş hallerini önbellekler
+_SQL_SELECT_PRODUCTS = (
+    "SELECT Urun_Adi, Fabrika, NTS_Maliyet_TL, strftime('%d.%m.%Y', Kayit_Tarihi) AS Kayit_Tarihi, "
+    "Giris_Para_Birimi, Giris_Fiyat, Kur_USD, Kur_EUR, Kur_CHF, Kur_Tarihi FROM products ORDER BY id"
+)
+_SQL_INSERT_PRODUCT = (
+    "INSERT INTO products (Urun_Adi, Fabrika, NTS_Maliyet_TL, Kayit_Tarihi, Giris_Para_Birimi, "
+    "Giris_Fiyat, Kur_USD, Kur_EUR, Kur_CHF, Kur_Tarihi) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_SQL_SELECT_SHIPPING = "SELECT Sehir, Firma, Fabrika, Arac_Tipi, Fiyat_TL_KG FROM shipping ORDER BY id"
+_SQL_INSERT_SHIPPING = "INSERT INTO shipping (Sehir, Firma, Fabrika, Arac_Tipi, Fiyat_TL_KG) VALUES (?, ?, ?, ?, ?)"
+_SQL_SELECT_HISTORY = f"SELECT {', '.join(HISTORY_COLUMNS)} FROM history ORDER BY id"
+_SQL_INSERT_HISTORY = (
+    f"INSERT INTO history ({', '.join(HISTORY_COLUMNS)}) VALUES ({', '.join('?' for _ in HISTORY_COLUMNS)})"
+)
+_SQL_SELECT_DOCUMENTS = "SELECT key, value FROM documents WHERE dataset = ?"
+_SQL_UPSERT_DOCUMENT = (
+    "INSERT INTO documents (dataset, key, value) VALUES (?, ?, ?) "
+    "ON CONFLICT (dataset, key) DO UPDATE SET value = excluded.value"
+)
+_SQL_BUMP_VERSION = (
+    "INSERT INTO meta (dataset, version) VALUES (?, 1) "
+    "ON CONFLICT (dataset) DO UPDATE SET version = version + 1"
+)
+_SQL_VERSIONS = "SELECT dataset, version FROM meta"
+
+
+def _none_if_missing(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value if value.strip() != '' else None
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _iso_dates(series):
+    """gg.aa.yyyy metin, ISO metin veya datetime kolonunu ISO (yyyy-mm-dd) metnine çevir"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        parsed = series
+    else:
+        text = series.astype('string')
+        parsed = pd.to_datetime(text, format=PRODUCT_DATE_FORMAT, errors='coerce')
+        parsed = parsed.fillna(pd.to_datetime(text, format='ISO8601', errors='coerce'))
+    return parsed.dt.strftime('%Y-%m-%d').astype(object).where(parsed.notna(), None)
+
+
+def _rows(df, columns):
+    """DataFrame'i eksik kolonları None ile tamamlanmış parametre demetlerine çevir"""
+    data = [df[column].tolist() if column in df.columns else [None] * len(df) for column in columns]
+    return [tuple(_none_if_missing(value) for value in row) for row in zip(*data)]
+
+
+# Fork ile devralınıp kullanılmayan bağlantılar; çöp toplayıcının kapatmaması için tutulur
+_INHERITED_CONNECTIONS = []
+
+
+class SqliteStorage(_ChangeNotifier):
+    """
+    Gömülü SQLite backend'i (WAL modu).
+
+    Her thread (ve süreç) kendi bağlantısını ilk kullanımda açar; WAL sayesinde
+    okuyucular yazıcıyı beklemez. Her yazma işlemi tek transaction'dır ve `meta`
+    tablosundaki veri kümesi sürümünü artırır; snapshot'lar bu sürümleri imza
+    olarak kullanır.
+
+    Bağlantılar süreç kimliğiyle eşlenir: gunicorn preload'da ana süreçte açılan
+    bağlantı fork sonrası işçide kullanılmaz (SQLite bağlantısı fork'u aşamaz).
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, db_path='nts.db'):
+        super().__init__()
+        self.db_path = db_path
+        self._local = threading.local()
+        conn = self._open()
+        try:
+            with conn:
+                conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    def _open(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False, cached_statements=256)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA foreign_keys=ON')
+        return conn
+
+    def _connect(self):
+        pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == pid:
+            return conn
+        if conn is not None:
+            # Fork'tan devralınan bağlantı kapatılmaz (kapatmak ana sürecin dosya kilitlerini bırakabilir)
+            _INHERITED_CONNECTIONS.append(conn)
+        conn = self._open()
+        self._local.conn, self._local.pid = conn, pid
+        return conn
+
+    def _read(self, sql, params=()):
+        return pd.read_sql_query(sql, self._connect(), params=params)
+
+    def versions(self):
+        return dict(self._connect().execute(_SQL_VERSIONS).fetchall())
+
+    def signature(self, datasets):
+        versions = self.versions()
+        return tuple((f"sqlite:{self.db_path}:{dataset}", versions.get(dataset, 0), None) for dataset in datasets)
+
+    def _write(self, dataset, statements):
+        conn = self._connect()
+        with conn:
+            for sql, params, many in statements:
+                if many:
+                    conn.executemany(sql, params)
+                else:
+                    conn.execute(sql, params)
+            conn.execute(_SQL_BUMP_VERSION, (dataset,))
+        self._notify(dataset)
+
+    def _update(self, dataset, select_sql, table, insert_sql, rows, fn):
+        """Oku-değiştir-yaz tek IMMEDIATE transaction'da: arada başka yazıcı giremez"""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            df = fn(pd.read_sql_query(select_sql, conn))
+            conn.execute(f'DELETE FROM {table}')
+            conn.executemany(insert_sql, rows(df))
+            conn.execute(_SQL_BUMP_VERSION, (dataset,))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        self._notify(dataset)
+
+    # --- Ürünler ---
+    @staticmethod
+    def _product_rows(df):
+        df = df.assign(Kayit_Tarihi=_iso_dates(df['Kayit_Tarihi'])) if 'Kayit_Tarihi' in df.columns else df
+        return _rows(df, PRODUCT_COLUMNS)
+
+    def read_products(self):
+        return self._read(_SQL_SELECT_PRODUCTS)
+
+    def write_products(self, df):
+        self._write('products', [
+            ('DELETE FROM products', (), False),
+            (_SQL_INSERT_PRODUCT, self._product_rows(df), True),
+        ])
+
+    def append_products(self, rows):
+        self._write('products', [(_SQL_INSERT_PRODUCT, self._product_rows(rows), True)])
+
+    def update_products(self, fn):
+        self._update('products', _SQL_SELECT_PRODUCTS, 'products', _SQL_INSERT_PRODUCT, self._product_rows, fn)
+
+    # --- Nakliye ---
+    def read_shipping(self):
+        return self._read(_SQL_SELECT_SHIPPING)
+
+    def write_shipping(self, df):
+        self._write('shipping', [
+            ('DELETE FROM shipping', (), False),
+            (_SQL_INSERT_SHIPPING, _rows(df, SHIPPING_COLUMNS), True),
+        ])
+
+    def update_shipping(self, fn):
+        self._update('shipping', _SQL_SELECT_SHIPPING, 'shipping', _SQL_INSERT_SHIPPING,
+                     lambda df: _rows(df, SHIPPING_COLUMNS), fn)
+
+    # --- Hesaplama geçmişi ---
+    def ensure_history(self):
+        pass
+
+    def read_history(self):
+        return self._read(_SQL_SELECT_HISTORY)
+
+    def iter_history(self, chunksize=HISTORY_CHUNK_ROWS, filters=None, columns=None):
+        """
+        Geçmişi parça parça oku; index tablodaki satır sırasıdır (read_history ile aynı).
+
+        Filtrenin eşitlik ve tarih koşulları WHERE'e taşınır (musteri/bayi_musteri/
+        timestamp indeksleri); kesin sonuç yine `filters.apply` ile alınır. Satırlar
+        yalnızca tüm tablo yeniden yazılarak silindiği için id'ler 1..n ardışıktır
+        ve filtreli okumada konum `id - 1`'dir.
+        """
+        wanted = HISTORY_COLUMNS
+        if columns is not None:
+            wanted = [column for column in HISTORY_COLUMNS
+                      if column in columns or (filters is not None and column in filters.columns())]
+        where, params = filters.sql_where() if filters is not None else ('', [])
+        if not where:
+            sql = _SQL_SELECT_HISTORY if columns is None else f"SELECT {', '.join(wanted)} FROM history ORDER BY id"
+            offset = 0
+            for chunk in pd.read_sql_query(sql, self._connect(), chunksize=chunksize):
+                chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+                offset += len(chunk)
+                if filters is not None:
+                    chunk = filters.apply(chunk)
+                yield chunk if columns is None else chunk.reindex(columns=columns)
+            return
+        sql = f"SELECT id, {', '.join(wanted)} FROM history WHERE {where} ORDER BY id"
+        for chunk in pd.read_sql_query(sql, self._connect(), params=params, chunksize=chunksize):
+            chunk.index = pd.Index(chunk.pop('id').to_numpy() - 1)
+            chunk = filters.apply(chunk)
+            yield chunk if columns is None else chunk.reindex(columns=columns)
+
+    def append_history(self, record):
+        self._write('history', [(_SQL_INSERT_HISTORY, _rows(pd.DataFrame([record]), HISTORY_COLUMNS)[0], False)])
+
+    def write_history(self, df):
+        self._write('history', [
+            ('DELETE FROM history', (), False),
+            (_SQL_INSERT_HISTORY, _rows(df, HISTORY_COLUMNS), True),
+        ])
+
+    def update_history(self, fn):
+        self._update('history', _SQL_SELECT_HISTORY, 'history', _SQL_INSERT_HISTORY,
+                     lambda df: _rows(df, HISTORY_COLUMNS), fn)
+
+    # --- JSON belgeleri ---
+    def read_json(self, dataset):
+        rows = self._connect().execute(_SQL_SELECT_DOCUMENTS, (dataset,)).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def write_json(self, dataset, data):
+        self._write(dataset, [
+            ('DELETE FROM documents WHERE dataset = ?', (dataset,), False),
+            (_SQL_UPSERT_DOCUMENT, [(dataset, key, json.dumps(value, ensure_ascii=False)) for key, value in data.items()], True),
+        ])
+
+    def put_json_item(self, dataset, key, value):
+        self._write(dataset, [(_SQL_UPSERT_DOCUMENT, (dataset, key, json.dumps(value, ensure_ascii=False)), False)])
+
+    def put_json_items(self, dataset, items):
+        self._write(dataset, [
+            (_SQL_UPSERT_DOCUMENT, [(dataset, key, json.dumps(value, ensure_ascii=False)) for key, value in items.items()], True),
+        ])
+
+    # --- Geçiş / dışa aktarım ---
+    def import_from(self, source):
+        """Başka bir backend'deki tüm verileri tek transaction'da bu veritabanına aktar"""
+        conn = self._connect()
+        with conn:
+            for table in ('products', 'shipping', 'history'):
+                conn.execute(f'DELETE FROM {table}')
+            conn.execute('DELETE FROM documents')
+            conn.executemany(_SQL_INSERT_PRODUCT, self._product_rows(_read_or_empty(source.read_products, PRODUCT_COLUMNS)))
+            conn.executemany(_SQL_INSERT_SHIPPING, _rows(_read_or_empty(source.read_shipping, SHIPPING_COLUMNS), SHIPPING_COLUMNS))
+            conn.executemany(_SQL_INSERT_HISTORY, _rows(_read_or_empty(source.read_history, HISTORY_COLUMNS), HISTORY_COLUMNS))
+            for dataset in JSON_DATASETS:
+                conn.executemany(_SQL_UPSERT_DOCUMENT, [
+                    (dataset, key, json.dumps(value, ensure_ascii=False))
+                    for key, value in source.read_json(dataset).items()
+                ])
+            for dataset in ('products', 'shipping', 'history') + JSON_DATASETS:
+                conn.execute(_SQL_BUMP_VERSION, (dataset,))
+        for dataset in ('products', 'shipping', 'history') + JSON_DATASETS:
+            self._notify(dataset)
+
+    def export_to(self, target):
+        """Tüm verileri hedef backend'e (ör. CsvStorage) mevcut dosya biçimleriyle yaz"""
+        target.write_products(self.read_products())
+        target.write_shipping(self.read_shipping())
+        target.write_history(self.read_history())
+        for dataset in JSON_DATASETS:
+            target.write_json(dataset, self.read_json(dataset))
+
+
+def _read_or_empty(reader, columns):
+    try:
+        return reader()
+    except (OSError, pd.errors.EmptyDataError):
+        return pd.DataFrame(columns=columns)
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """Ortam değişkenlerine göre süreç genelinde paylaşılan backend'i döndür"""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                if os.environ.get('NTS_STORAGE', 'csv').lower() == 'sqlite':
+                    _storage = SqliteStorage(os.environ.get('NTS_DB_PATH', 'nts.db'))
+                else:
+                    _storage = CsvStorage(history_format=os.environ.get('NTS_HISTORY_FORMAT', 'csv').lower())
+    return _storage
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='NTS depolama geçiş araçları')
+    sub = parser.add_subparsers(dest='command', required=True)
+    migrate = sub.add_parser('migrate', help='CSV/JSON dosyalarını SQLite veritabanına aktar')
+    migrate.add_argument('--db', default='nts.db')
+    migrate.add_argument('--source', default='.', help='CSV/JSON dosyalarının bulunduğu klasör')
+    export = sub.add_parser('export', help='SQLite veritabanını CSV/JSON dosyalarına aktar')
+    export.add_argument('--db', default='nts.db')
+    export.add_argument('--out', default='.', help='Çıktı klasörü')
+    compact = sub.add_parser('compact-history', help='CSV hesaplama geçmişini aylık Parquet bölümlerine taşı')
+    compact.add_argument('--source', default='.', help='Geçmiş dosyasının bulunduğu klasör')
+    args = parser.parse_args(argv)
+
+    if args.command == 'compact-history':
+        storage = CsvStorage(args.source, history_format='parquet')
+        store = storage.history_store()
+        if store is None:
+            parser.error('pyarrow kurulu değil')
+        moved = store.compact()
+        print(f"✅ {moved} kayıt taşındı; bölümler: {', '.join(store.months()) or '-'}")
+    elif args.command == 'migrate':
+        db = SqliteStorage(args.db)
+        db.import_from(CsvStorage(args.source))
+        print(f"✅ {args.source} → {args.db} aktarıldı: {db.versions()}")
+    else:
+        os.makedirs(args.out, exist_ok=True)
+        SqliteStorage(args.db).export_to(CsvStorage(args.out))
+        print(f"✅ {args.db} → {args.out} dışa aktarıldı")
+
+
+if __name__ == '__main__':
+    main()
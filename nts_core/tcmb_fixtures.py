@@ -0,0 +1,98 @@
+"""
+Çevrimdışı test için TCMB kur sunucusu taklidi.
+
+TCMB ile aynı URL düzenini (/YYYYMM/GGAAYYYY.xml) sunar. Klasör verilirse
+kayıtlı XML dosyaları, verilmezse tarihten türetilen sabit (deterministik)
+sentetik kurlar döner. Hafta sonları ve sabit resmi tatillerde 404 verir.
+"""
+import os
+import re
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Sabit tarihli resmi tatiller (ay, gün)
+FIXED_HOLIDAYS = {(1, 1), (4, 23), (5, 1), (5, 19), (7, 15), (8, 30), (10, 29)}
+
+_PATH_RE = re.compile(r'^/(?:kurlar/)?(\d{6})/(\d{2})(\d{2})(\d{4})\.xml$')
+
+
+def synthetic_xml(day):
+    """Tarihe bağlı, her çalıştırmada aynı olan TCMB biçimli kur XML'i"""
+    step = (day.toordinal() % 1000) / 100
+    rates = {'USD': 30.0 + step, 'EUR': 33.0 + step, 'CHF': 35.0 + step}
+    currencies = ''.join(
+        f'<Currency CrossOrder="{i}" Kod="{code}" CurrencyCode="{code}">'
+        f'<Unit>1</Unit><ForexBuying>{value - 0.05:.4f}</ForexBuying><ForexSelling>{value:.4f}</ForexSelling>'
+        f'</Currency>'
+        for i, (code, value) in enumerate(rates.items())
+    )
+    stamp = day.strftime('%d.%m.%Y')
+    return f'<?xml version="1.0" encoding="UTF-8"?><Tarih_Date Tarih="{stamp}" Date="{day:%m/%d/%Y}">{currencies}</Tarih_Date>'
+
+
+def _handler(directory):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # Keep-alive: istemcinin bağlantı havuzu gerçekten kullanılır
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            match = _PATH_RE.match(self.path)
+            if match is None:
+                return self._send(404, b'')
+            _, dd, mm, yyyy = match.groups()
+            try:
+                day = date(int(yyyy), int(mm), int(dd))
+            except ValueError:
+                return self._send(404, b'')
+
+            if directory is not None:
+                path = os.path.join(directory, day.strftime('%Y%m'), day.strftime('%d%m%Y') + '.xml')
+                if not os.path.exists(path):
+                    return self._send(404, b'')
+                with open(path, 'rb') as f:
+                    return self._send(200, f.read())
+            if day.weekday() >= 5 or (day.month, day.day) in FIXED_HOLIDAYS:
+                return self._send(404, b'')
+            return self._send(200, synthetic_xml(day).encode('utf-8'))
+
+        def _send(self, status, body):
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/xml')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def make_server(host='127.0.0.1', port=0, directory=None):
+    """Sunucuyu oluştur (port=0 → boş port); `server.server_address` ile adres alınır"""
+    return _Server((host, port), _handler(directory))
+
+
+def start_in_background(host='127.0.0.1', port=0, directory=None):
+    """Sunucuyu daemon thread'de başlat; (server, base_url) döndür"""
+    server = make_server(host, port, directory)
+    threading.Thread(target=server.serve_forever, name='tcmb-fixture-server', daemon=True).start()
+    return server, f"http://{server.server_address[0]}:{server.server_address[1]}"
+
+
+def serve(host='127.0.0.1', port=8765, directory=None):
+    server = make_server(host, port, directory)
+    kaynak = directory or 'sentetik kurlar'
+    print(f"🧪 TCMB fixture sunucusu: http://{host}:{server.server_address[1]} ({kaynak})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
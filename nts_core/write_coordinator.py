@@ -0,0 +1,181 @@
+"""
+Veri dosyaları için tek yazıcılı yazma koordinatörü.
+
+Her veri kümesinin kendi kuyruğu ve yazıcı thread'i vardır; Streamlit
+oturumları, API ve betiklerden gelen değişiklikler bu kuyrukta sıraya
+girer. Yazıcı, kuyrukta biriken değişiklikleri tek grupta işler
+(coalescing): dosyayı süreçler arası danışma kilidi (fcntl / msvcrt)
+altında bir kez okur, değişiklikleri sırayla uygular ve sonucu geçici
+dosya + os.replace ile tek seferde yazar. Okuyucular kilit almaz; her
+zaman tam bir önceki ya da yeni sürümü görür.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+def _thread_lock(path):
+    # Aynı süreçteki thread'ler de birbirini beklesin (kilit dosyası tanıtıcıları ayrı açılır)
+    with _thread_locks_guard:
+        lock = _thread_locks.get(path)
+        if lock is None:
+            lock = _thread_locks[path] = threading.Lock()
+        return lock
+
+
+@contextmanager
+def file_lock(path, poll=0.05):
+    """`path` için süreçler arası özel (exclusive) danışma kilidi; kilit dosyası `path.lock`"""
+    lock_path = os.path.abspath(path) + '.lock'
+    with _thread_lock(lock_path):
+        with open(lock_path, 'a+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        time.sleep(poll)
+                try:
+                    yield
+                finally:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def write_json_atomic(data, path):
+    """JSON'u geçici dosyaya yazıp os.replace ile yerine koy"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class _Mutation:
+    __slots__ = ('fn', 'replace', 'done', 'error')
+
+    def __init__(self, fn, replace):
+        self.fn = fn
+        self.replace = replace
+        self.done = threading.Event()
+        self.error = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+
+
+class DatasetWriter:
+    """
+    Tek veri kümesinin yazıcısı.
+
+    `update(fn)` mevcut değeri alıp yenisini döndüren bir değişiklik,
+    `replace(value)` değerin tamamen değiştirilmesidir. Bir gruptaki son
+    `replace` kendinden önceki değişiklikleri geçersiz kılar; bu durumda
+    dosya hiç okunmaz.
+    """
+
+    def __init__(self, path, load, save, max_batch=256):
+        """
+        Args:
+            path: Veri dosyası (kilit `path.lock` üzerinden alınır)
+            load: Dosyadaki güncel değeri döndüren fonksiyon
+            save: (değer, path) ile atomik yazan fonksiyon
+        """
+        self.path = path
+        self.max_batch = max_batch
+        self._load = load
+        self._save = save
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.stats = {'batches': 0, 'mutations': 0, 'loads': 0}
+
+    def update(self, fn, wait=True):
+        return self._submit(_Mutation(fn, False), wait)
+
+    def replace(self, value, wait=True):
+        return self._submit(_Mutation(lambda _: value, True), wait)
+
+    def _submit(self, mutation, wait):
+        self._ensure_thread()
+        self._queue.put(mutation)
+        if wait:
+            mutation.wait()
+        return mutation
+
+    def _ensure_thread(self):
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                name = f"nts-writer-{os.path.basename(self.path)}"
+                self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._apply(batch)
+
+    def _apply(self, batch):
+        last_replace = max((i for i, mutation in enumerate(batch) if mutation.replace), default=None)
+        try:
+            with file_lock(self.path):
+                if last_replace is None:
+                    value = self._load()
+                    self.stats['loads'] += 1
+                    pending = batch
+                else:
+                    value = batch[last_replace].fn(None)
+                    pending = batch[last_replace + 1:]
+                for mutation in pending:
+                    try:
+                        value = mutation.fn(value)
+                    except Exception as exc:
+                        # Hatalı değişiklik atlanır, diğerleri yazılır
+                        mutation.error = exc
+                self._save(value, self.path)
+            self.stats['batches'] += 1
+            self.stats['mutations'] += len(batch)
+        except Exception as exc:
+            logger.exception("Veri yazılamadı: %s", self.path)
+            for mutation in batch:
+                mutation.error = mutation.error or exc
+        for mutation in batch:
+            mutation.done.set()
@@ -1,5 +1,7 @@
 import pandas as pd
 
+from nts_core.storage import get_storage
+
 # Yeni Çalışkan Adana fiyatları
 yeni_fiyatlar = {
     'ADANA': 0.84, 'ADIYAMAN': 1.55, 'AFYON': 2.52, 'AGRI': 4.00, 'AKSARAY': 1.34,
@@ -24,27 +26,31 @@ yeni_fiyatlar = {
     'YOZGAT YERKÖY MADEN': 2.17, 'ZONGULDAK': 3.13
 }
 
-# CSV'yi oku
-df = pd.read_csv('lokasyonlar.csv')
+mesajlar = []
+
+
+def guncelle(df):
+    """Çalışkan + TR16 satırlarını nakliye tablosunun güncel hâlinde güncelle"""
+    for sehir, fiyat in yeni_fiyatlar.items():
+        mask = (df['Firma'] == 'CALISKAN') & (df['Fabrika'] == 'TR16') & (df['Sehir'] == sehir)
+        if mask.any():
+            df.loc[mask, 'Fiyat_TL_KG'] = fiyat
+            mesajlar.append(f"✓ {sehir}: {fiyat} TL güncellendi")
+        else:
+            # Yoksa ekle
+            new_row = pd.DataFrame([{
+                'Sehir': sehir,
+                'Firma': 'CALISKAN',
+                'Fabrika': 'TR16',
+                'Arac_Tipi': 'TIR',
+                'Fiyat_TL_KG': fiyat
+            }])
+            df = pd.concat([df, new_row], ignore_index=True)
+            mesajlar.append(f"+ {sehir}: {fiyat} TL eklendi")
+    return df
 
-# Çalışkan + TR16 satırlarını güncelle
-for sehir, fiyat in yeni_fiyatlar.items():
-    mask = (df['Firma'] == 'CALISKAN') & (df['Fabrika'] == 'TR16') & (df['Sehir'] == sehir)
-    if mask.any():
-        df.loc[mask, 'Fiyat_TL_KG'] = fiyat
-        print(f"✓ {sehir}: {fiyat} TL güncellendi")
-    else:
-        # Yoksa ekle
-        new_row = pd.DataFrame([{
-            'Sehir': sehir,
-            'Firma': 'CALISKAN',
-            'Fabrika': 'TR16',
-            'Arac_Tipi': 'TIR',
-            'Fiyat_TL_KG': fiyat
-        }])
-        df = pd.concat([df, new_row], ignore_index=True)
-        print(f"+ {sehir}: {fiyat} TL eklendi")
 
-# Kaydet
-df.to_csv('lokasyonlar.csv', index=False)
+# Oku-değiştir-yaz kilit altında (NTS_STORAGE: csv / sqlite); aradaki başka yazmalar korunur
+get_storage().update_shipping(guncelle)
+print('\n'.join(mesajlar))
 print("\n✅ Çalışkan Adana fiyatları güncellendi!")